@@ -0,0 +1,242 @@
+"""
+Benchmarks of the checks on synthetic boards, served by a fake GitHub in the same process.
+
+Each checker is run on boards of each size in a fresh process, once to time it and count
+its requests per phase and once more with tracemalloc for its peak memory. The results
+are compared with the baselines in baseline.json: a checker that makes more requests than
+its baseline, or takes or allocates more than the tolerance over it, is a regression.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 500 --checkers card
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[:0] = [REPOSITORY_DIR, os.path.join(REPOSITORY_DIR, "tests")]
+
+BASELINE_FILE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+SIZES = [500, 5000, 50000]
+# checker: the arguments it is run with, as the Jenkins jobs run it
+CHECKERS = {
+    "card": ["--no-cache", "--milestone"],
+    "release_notes_checker": ["--no-cache"],
+    "run_checks": ["--no-cache", "--milestone"],
+}
+TOLERANCE = 0.25
+
+
+def run_checker(checker, cards, trace_memory=False):
+    """
+    Run a checker on a synthetic board in the current directory.
+    Args:
+        checker: A name in CHECKERS
+        cards: The number of cards on the board
+        trace_memory: Whether to trace the peak memory, which slows the run down
+    Return:
+        A dictionary of the wall time, peak memory, requests and phases of the run
+    """
+    from synthetic_board import REPO, SyntheticBoard, SyntheticGithub
+
+    import card
+    import metrics
+    import release_notes_checker
+    import run_checks
+
+    board = SyntheticBoard(cards)
+    board.write_release_notes(
+        os.path.join(
+            release_notes_checker.RELEASE_NOTES_REPO_PATH,
+            release_notes_checker.RELEASE_NOTES_FOLDER,
+        )
+    )
+    with SyntheticGithub(board) as fake:
+        for module in (card, release_notes_checker, run_checks):
+            # made when the checker asks for it, so that it uses the shared session
+            module.get_IBEX_repo = lambda cache_dir=None: fake.github().get_repo(REPO)
+        # the release notes were written above rather than cloned
+        release_notes_checker.pull_or_clone_repository = lambda *args, **kwargs: None
+
+        argv = CHECKERS[checker]
+        sys.argv = [checker + ".py"] + argv
+        main = {
+            "card": lambda: card.main(argv),
+            "release_notes_checker": release_notes_checker.main,
+            "run_checks": lambda: run_checks.main(argv),
+        }[checker]
+
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            main()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        tracemalloc.stop()
+
+    report = metrics.RUN.report()
+    return {
+        "seconds": seconds,
+        "peak_mib": None if peak is None else peak / 2**20,
+        "requests": report["requests"],
+        "graphql_requests": report["graphql_requests"],
+        "phases": {
+            name: {"seconds": phase["seconds"], "requests": phase["requests"]}
+            for name, phase in report["phases"].items()
+        },
+    }
+
+
+def run_case(checker, cards, memory=True):
+    """Run a checker in fresh processes in a temporary directory."""
+    result = None
+    for trace_memory in [False, True] if memory else [False]:
+        with tempfile.TemporaryDirectory() as directory:
+            result_path = os.path.join(directory, "result.json")
+            command = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--case",
+                checker,
+                str(cards),
+            ]
+            command += ["--result", result_path] + (
+                ["--trace-memory"] if trace_memory else []
+            )
+            subprocess.run(
+                command, cwd=directory, check=True, stdout=subprocess.DEVNULL
+            )
+            with open(result_path) as f:
+                run = json.load(f)
+        if result is None:
+            result = run
+        else:
+            result["peak_mib"] = run["peak_mib"]
+    return result
+
+
+def compare(results, baselines, tolerance=TOLERANCE):
+    """
+    Find the regressions against the baselines. Only the total requests of a run are
+    compared, as phases that run concurrently, such as in run_checks.py, count each other's
+    requests.
+    Args:
+        results: A dictionary of "checker cards": result of run_checker
+        baselines: The same for the baselines
+        tolerance: The fraction over its baseline a time or peak memory may be
+    Return:
+        A list of messages describing each regression
+    """
+    regressions = []
+    for case, result in results.items():
+        baseline = baselines.get(case)
+        if baseline is None:
+            continue
+        if result["requests"] > baseline["requests"]:
+            regressions.append(
+                f"{case}: {result['requests']} requests, baseline {baseline['requests']}"
+            )
+        for key, unit in [("seconds", "s"), ("peak_mib", " MiB")]:
+            if result.get(key) is None or baseline.get(key) is None:
+                continue
+            if result[key] > baseline[key] * (1 + tolerance):
+                regressions.append(
+                    f"{case}: {result[key]:.2f}{unit} {key.replace('_mib', ' memory')}, "
+                    f"baseline {baseline[key]:.2f}{unit}"
+                )
+    return regressions
+
+
+def print_results(results, baselines):
+    print(f"{'case':<40} {'seconds':>9} {'peak MiB':>9} {'requests':>9} {'graphql':>8}")
+    for case, result in results.items():
+        baseline = baselines.get(case, {})
+        change = ""
+        if baseline.get("seconds"):
+            change = f"{result['seconds'] / baseline['seconds'] - 1:+.0%}"
+        peak = "" if result["peak_mib"] is None else f"{result['peak_mib']:.1f}"
+        print(
+            f"{case:<40} {result['seconds']:>9.2f} {peak:>9} {result['requests']:>9} "
+            f"{result['graphql_requests']:>8} {change}"
+        )
+        for name, phase in result["phases"].items():
+            print(
+                f"  {name:<38} {phase['seconds']:>9.2f} {'':>9} {phase['requests']:>9}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="benchmarks of the checks on synthetic boards"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=SIZES, help="numbers of cards"
+    )
+    parser.add_argument(
+        "--checkers", nargs="+", choices=list(CHECKERS), default=list(CHECKERS)
+    )
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="save the results as the baselines of the cases run",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help="the fraction over its baseline a time or peak memory may be",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="do not measure peak memory"
+    )
+    parser.add_argument(
+        "--case", nargs=2, metavar=("CHECKER", "CARDS"), help=argparse.SUPPRESS
+    )
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    parser.add_argument("--trace-memory", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        result = run_checker(args.case[0], int(args.case[1]), args.trace_memory)
+        with open(args.result, "w") as f:
+            json.dump(result, f)
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+
+    results = {}
+    for cards in args.sizes:
+        for checker in args.checkers:
+            results[f"{checker} {cards}"] = run_case(checker, cards, not args.no_memory)
+    print_results(results, baselines)
+
+    if args.update_baseline:
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
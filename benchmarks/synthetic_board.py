@@ -0,0 +1,502 @@
+"""
+Synthetic project boards of any size for benchmarking the checks.
+
+A SyntheticBoard is a reproducible board of issues spread over the columns in roughly the
+proportions of the IBEX board, with a mix of size, workflow and other labels, sprint
+milestones, label and comment histories, open pull requests and a release notes corpus.
+SyntheticGithub serves a board through the fake GitHub used by the tests, answering the
+GraphQL and REST requests the checks make.
+"""
+
+import datetime
+import json
+import os
+import random
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from fake_github import FakeGithub
+
+from board import PAGE_SIZE
+from utils import COLUMNS
+
+OWNER = "ISISComputingGroup"
+NAME = "IBEX"
+REPO = f"{OWNER}/{NAME}"
+PROJECT = "IBEX Project Board"
+ISSUE_URL = f"https://github.com/{REPO}/issues/{{}}"
+UPCOMING_CHANGES_FILE = "ReleaseNotes_Upcoming.md"
+
+# the share of the cards in each column, as on the IBEX board
+COLUMN_SHARES = [
+    (COLUMNS.BUCKET, 0.40),
+    (COLUMNS.READY, 0.14),
+    (COLUMNS.IN_PROGRESS, 0.10),
+    (COLUMNS.REVIEW, 0.08),
+    (COLUMNS.IMPEDED, 0.03),
+    (COLUMNS.COMPLETE, 0.10),
+    (COLUMNS.DONE, 0.15),
+]
+WORKFLOW_LABEL = {
+    COLUMNS.BUCKET: "bucket",
+    COLUMNS.READY: "ready",
+    COLUMNS.IN_PROGRESS: "in progress",
+    COLUMNS.REVIEW: "review",
+    COLUMNS.IMPEDED: "impeded",
+    COLUMNS.COMPLETE: "completed",
+}
+SIZES = ["1", "2", "3", "5", "8", "13"]
+# label: the share of cards in a sprint column that have it
+OTHER_LABELS = [
+    ("rework", 0.08),
+    ("added during sprint", 0.05),
+    ("support", 0.03),
+    ("HLM", 0.01),
+    ("Friday", 0.02),
+    ("no_release_notes", 0.10),
+]
+LOGINS = [f"developer{index}" for index in range(20)]
+# cards that are pull requests or notes rather than issues
+OTHER_CARD_SHARE = 0.02
+RELEASE_NOTE_LINKS_PER_FILE = 250
+
+
+def _timestamp(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SyntheticBoard:
+    """
+    A board, its repository and release notes, built from a seed so that two boards of the
+    same size and seed are identical.
+    """
+
+    def __init__(self, cards, seed=0, now=None):
+        """
+        Args:
+            cards: The number of cards on the board
+            seed: The seed of the random choices
+            now: The time the board is at, by default the current time
+        """
+        self.cards = cards
+        self.random = random.Random(seed)
+        self.now = now or datetime.datetime.now(datetime.UTC).replace(microsecond=0)
+        self.milestones = self._make_milestones()
+        self.items = []
+        self.issues = {}
+        self.columns = {}
+        self.histories = {}
+        self._make_cards()
+        self.milestone_issues = self._make_milestone_issues()
+        self.pulls = self._make_pulls()
+        self.release_notes = self._make_release_notes()
+
+    def _make_milestones(self):
+        """The current sprint, an old sprint left open and closed sprints before them."""
+        milestones = []
+        for index, (weeks_ago, state) in enumerate(
+            [(12, "CLOSED"), (9, "CLOSED"), (6, "CLOSED"), (3, "OPEN"), (0, "OPEN")]
+        ):
+            start = (self.now - datetime.timedelta(weeks=weeks_ago, days=7)).date()
+            milestones.append(
+                {
+                    "number": 100 + index,
+                    "title": f"SPRINT_{start:%Y_%m_%d}",
+                    "state": state,
+                    "dueOn": _timestamp(
+                        datetime.datetime.combine(start, datetime.time(), datetime.UTC)
+                        + datetime.timedelta(weeks=3)
+                    ),
+                    "description": json.dumps({"SP": max(10, self.cards // 20)}),
+                }
+            )
+        return milestones
+
+    @property
+    def current_milestone(self):
+        return self.milestones[-1]
+
+    def _milestone_of(self, column):
+        roll = self.random.random()
+        if column is COLUMNS.BUCKET:
+            return self.milestones[-2] if roll < 0.02 else None
+        if roll < 0.90:
+            return self.current_milestone
+        if roll < 0.95:
+            return self.milestones[-2]
+        if roll < 0.97:
+            return self.random.choice(self.milestones[:-2])
+        return None
+
+    def _labels_of(self, column):
+        labels = []
+        if column in WORKFLOW_LABEL and self.random.random() > 0.03:
+            labels.append(WORKFLOW_LABEL[column])
+        if column is COLUMNS.REVIEW and self.random.random() < 0.5:
+            labels.append("under review")
+        if column is COLUMNS.READY and self.random.random() < 0.01:
+            labels.append("proposal")
+        size_roll = self.random.random()
+        if column is not COLUMNS.BUCKET or size_roll < 0.5:
+            if size_roll > 0.04:
+                labels.append(self.random.choice(SIZES))
+            if size_roll > 0.99:
+                labels.append(self.random.choice(SIZES))
+        if column is not COLUMNS.BUCKET:
+            labels += [
+                label for label, share in OTHER_LABELS if self.random.random() < share
+            ]
+        return labels
+
+    def _assignees_of(self, column):
+        if column is COLUMNS.BUCKET or self.random.random() < 0.05:
+            return []
+        return self.random.sample(LOGINS, 1 if self.random.random() < 0.8 else 2)
+
+    def _history_of(self, number, labels):
+        """Label events for the issue's labels and a few comments, up to 40 days old."""
+        events = sorted(
+            (self.now - datetime.timedelta(days=self.random.uniform(0, 40)), label)
+            for label in labels
+        )
+        comments = sorted(
+            self.now - datetime.timedelta(days=self.random.uniform(0, 60))
+            for _ in range(self.random.randint(0, 5))
+        )
+        return {
+            "number": number,
+            "timelineItems": {
+                "nodes": [
+                    {"createdAt": _timestamp(moment), "label": {"name": label}}
+                    for moment, label in events
+                ]
+            },
+            "comments": {
+                "nodes": [{"updatedAt": _timestamp(moment)} for moment in comments]
+            },
+        }
+
+    def _make_cards(self):
+        columns = [column for column, _ in COLUMN_SHARES]
+        weights = [share for _, share in COLUMN_SHARES]
+        for index in range(self.cards):
+            number = 1000 + index
+            column = self.random.choices(columns, weights)[0]
+            # a few cards are yet to be given a column
+            status = None if self.random.random() < 0.005 else {"name": column.value}
+            if self.random.random() < OTHER_CARD_SHARE:
+                if self.random.random() < 0.5:
+                    content = {
+                        "__typename": "PullRequest",
+                        "number": number,
+                        "title": f"PR {number}",
+                    }
+                else:
+                    content = {"__typename": "DraftIssue", "title": f"Note {number}"}
+                self.items.append({"status": status, "content": content})
+                continue
+
+            labels = self._labels_of(column)
+            assignees = self._assignees_of(column)
+            content = {
+                "__typename": "Issue",
+                "number": number,
+                "title": f"Synthetic issue {number}",
+                "url": ISSUE_URL.format(number),
+                "state": "CLOSED" if column is COLUMNS.DONE else "OPEN",
+                "updatedAt": _timestamp(
+                    self.now - datetime.timedelta(hours=self.random.randint(0, 24 * 60))
+                ),
+                "labels": {"nodes": [{"name": label} for label in labels]},
+                "assignees": {"nodes": [{"login": login} for login in assignees]},
+                "milestone": self._milestone_of(column),
+            }
+            self.items.append({"status": status, "content": content})
+            self.issues[number] = content
+            self.columns[number] = column
+            self.histories[number] = self._history_of(number, labels)
+
+    def _make_milestone_issues(self):
+        """The issues in each milestone, including closed issues no longer on the board."""
+        milestone_issues = {milestone["number"]: [] for milestone in self.milestones}
+        self.closed_issues = {}
+        for issue in self.issues.values():
+            if issue["milestone"] is not None:
+                milestone_issues[issue["milestone"]["number"]].append(issue)
+        next_number = 1000 + self.cards
+        for number, issues in milestone_issues.items():
+            milestone = next(m for m in self.milestones if m["number"] == number)
+            for _ in range(len(issues) // 10):
+                issues.append(
+                    {
+                        "number": next_number,
+                        "title": f"Synthetic issue {next_number}",
+                        "url": ISSUE_URL.format(next_number),
+                        "state": "CLOSED",
+                        "updatedAt": _timestamp(self.now),
+                        "labels": {"nodes": []},
+                        "assignees": {"nodes": [{"login": self.random.choice(LOGINS)}]},
+                        "milestone": milestone,
+                    }
+                )
+                self.closed_issues[next_number] = issues[-1]
+                next_number += 1
+            # listed newest first, as the API lists them
+            issues.sort(key=lambda issue: issue["number"], reverse=True)
+        return milestone_issues
+
+    def _make_pulls(self):
+        """
+        Open pull requests: most tickets under review have one, and most of those add a
+        release note. A few are left open for tickets that are closed.
+        """
+        tickets = [n for n, column in self.columns.items() if column is COLUMNS.REVIEW]
+        tickets = [n for n in tickets if self.random.random() < 0.7]
+        done = [n for n, column in self.columns.items() if column is COLUMNS.DONE]
+        tickets += [n for n in done if self.random.random() < 0.02]
+        pulls = []
+        number = (
+            1000
+            + self.cards
+            + sum(len(issues) for issues in self.milestone_issues.values())
+        )
+        for ticket in tickets:
+            files = [
+                {
+                    "filename": f"src/module{ticket % 97}/file{index}.py",
+                    "patch": "@@ -1 +1 @@",
+                }
+                for index in range(self.random.randint(1, 40))
+            ]
+            if self.random.random() < 0.8:
+                files.insert(
+                    self.random.randint(0, len(files)),
+                    {
+                        "filename": f"release_notes/{UPCOMING_CHANGES_FILE}",
+                        "patch": "@@ -1 +1,2 @@\n"
+                        f"+- [Ticket {ticket}]({ISSUE_URL.format(ticket)}): Synthetic issue "
+                        f"{ticket}",
+                    },
+                )
+            pulls.append(
+                {
+                    "number": number,
+                    "title": f"Ticket{ticket}: Synthetic change",
+                    "body": f"Closes {ISSUE_URL.format(ticket)}",
+                    "state": "open",
+                    "files": files,
+                }
+            )
+            number += 1
+        # and pull requests that are not for a ticket
+        for _ in range(max(1, len(pulls) // 10)):
+            pulls.append(
+                {
+                    "number": number,
+                    "title": "Update dependencies",
+                    "body": None,
+                    "state": "open",
+                    "files": [{"filename": "requirements.txt", "patch": "@@ -1 +1 @@"}],
+                }
+            )
+            number += 1
+        return pulls
+
+    def _make_release_notes(self):
+        """
+        Release notes files of file name: text, linking most completed and done tickets and
+        twice as many older tickets.
+        """
+        links = [number % 1000 + 1 for number in range(2 * self.cards)]
+        upcoming = []
+        for number, column in self.columns.items():
+            if (
+                column in (COLUMNS.COMPLETE, COLUMNS.DONE)
+                and self.random.random() < 0.9
+            ):
+                if column is COLUMNS.COMPLETE:
+                    upcoming.append(number)
+                else:
+                    links.append(number)
+
+        def text(numbers):
+            return "".join(
+                f"- [Ticket {number}]({ISSUE_URL.format(number)}): Synthetic issue {number}\n"
+                for number in numbers
+            )
+
+        release_notes = {UPCOMING_CHANGES_FILE: text(upcoming)}
+        for index, start in enumerate(
+            range(0, len(links), RELEASE_NOTE_LINKS_PER_FILE)
+        ):
+            release_notes[f"ReleaseNotes_v{index // 4 + 1}.{index % 4}.0.md"] = text(
+                links[start : start + RELEASE_NOTE_LINKS_PER_FILE]
+            )
+        return release_notes
+
+    def write_release_notes(self, folder):
+        """Write the release notes files to a folder."""
+        os.makedirs(folder, exist_ok=True)
+        for name, text in self.release_notes.items():
+            with open(os.path.join(folder, name), "w") as f:
+                f.write(text)
+
+    def graphql(self, query, variables):
+        """Answer a GraphQL query of board.py or history.py, as a FakeGithub handler."""
+        if "projectsV2" in query:
+            field = {"options": [{"name": column.value} for column, _ in COLUMN_SHARES]}
+            project = {"id": "PVT_synthetic", "title": PROJECT, "field": field}
+            return {"repository": {"projectsV2": {"nodes": [project]}}}
+        if "items(" in query:
+            start = int(variables["cursor"] or 0)
+            end = start + PAGE_SIZE
+            page_info = {"hasNextPage": end < len(self.items), "endCursor": str(end)}
+            return {
+                "node": {
+                    "items": {"pageInfo": page_info, "nodes": self.items[start:end]}
+                }
+            }
+
+        repository = {}
+        errors = []
+        for alias, kind, number in re.findall(r"(i\d+): (\w+)\(number: (\d+)\)", query):
+            number = int(number)
+            if "timelineItems" in query:
+                node = self.histories.get(number)
+            elif kind == "issueOrPullRequest":
+                node = self._state_of(number)
+            else:
+                node = self.issues.get(number)
+            if node is None:
+                errors.append({"type": "NOT_FOUND", "path": ["repository", alias]})
+            repository[alias] = node
+        data = {"repository": repository}
+        return (data, errors) if errors else data
+
+    def _state_of(self, number):
+        issue = self.issues.get(number) or self.closed_issues.get(number)
+        return None if issue is None else {"number": number, "state": issue["state"]}
+
+
+class SyntheticGithub(FakeGithub):
+    """A FakeGithub serving a SyntheticBoard, with REST listings paged as GitHub pages them."""
+
+    def __init__(self, board):
+        super().__init__(graphql=board.graphql)
+        self.board = board
+        self.pulls = {pull["number"]: pull for pull in board.pulls}
+        # counted once rather than for every issue listed with the milestone
+        self.closed_counts = {
+            number: sum(issue["state"] == "CLOSED" for issue in issues)
+            for number, issues in board.milestone_issues.items()
+        }
+
+    def _milestone_json(self, milestone):
+        issues = self.board.milestone_issues[milestone["number"]]
+        closed = self.closed_counts[milestone["number"]]
+        return {
+            "url": f"{self.base_url}/repos/{REPO}/milestones/{milestone['number']}",
+            "number": milestone["number"],
+            "title": milestone["title"],
+            "state": milestone["state"].lower(),
+            "description": milestone["description"],
+            "due_on": milestone["dueOn"],
+            "open_issues": len(issues) - closed,
+            "closed_issues": closed,
+            "updated_at": _timestamp(self.board.now),
+        }
+
+    def _issue_json(self, issue):
+        assignees = [{"login": user["login"]} for user in issue["assignees"]["nodes"]]
+        return {
+            "url": f"{self.base_url}/repos/{REPO}/issues/{issue['number']}",
+            "html_url": issue["url"],
+            "number": issue["number"],
+            "title": issue["title"],
+            "state": issue["state"].lower(),
+            "labels": [{"name": label["name"]} for label in issue["labels"]["nodes"]],
+            "assignees": assignees,
+            "assignee": assignees[0] if assignees else None,
+            "milestone": None
+            if issue["milestone"] is None
+            else self._milestone_json(issue["milestone"]),
+            "updated_at": issue["updatedAt"],
+        }
+
+    def _pull_json(self, pull):
+        return {
+            "url": f"{self.base_url}/repos/{REPO}/pulls/{pull['number']}",
+            "number": pull["number"],
+            "title": pull["title"],
+            "body": pull["body"],
+            "state": pull["state"],
+        }
+
+    def _page(self, path, query, items, to_json):
+        """A page of a listing with the Link header GitHub gives it."""
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        last = max(1, -(-len(items) // per_page))
+        links = []
+        for rel, number in [("next", page + 1), ("last", last)]:
+            if page < last:
+                params = {key: values[0] for key, values in query.items()}
+                params["page"] = str(number)
+                links.append(
+                    '<{}{}?{}>; rel="{}"'.format(
+                        self.base_url,
+                        path,
+                        "&".join(f"{k}={v}" for k, v in params.items()),
+                        rel,
+                    )
+                )
+        body = [
+            to_json(item) for item in items[(page - 1) * per_page : page * per_page]
+        ]
+        return 200, body, {"Link": ", ".join(links)} if links else {}
+
+    def get(self, path, headers):
+        parts = urlsplit(path)
+        path, query = parts.path, parse_qs(parts.query)
+        repo_path = f"/repos/{REPO}"
+        if path == "/rate_limit":
+            return (
+                200,
+                {
+                    "resources": {
+                        "core": {"remaining": 5000},
+                        "graphql": {"remaining": 5000},
+                    }
+                },
+                {},
+            )
+        if path == repo_path:
+            return (
+                200,
+                {
+                    "url": self.base_url + repo_path,
+                    "full_name": REPO,
+                    "name": NAME,
+                    "owner": {"login": OWNER},
+                },
+                {},
+            )
+        if path == repo_path + "/milestones":
+            state = query.get("state", ["open"])[0]
+            milestones = [
+                m
+                for m in self.board.milestones
+                if state == "all" or m["state"].lower() == state
+            ]
+            return self._page(path, query, milestones, self._milestone_json)
+        if path == repo_path + "/issues" and "milestone" in query:
+            issues = self.board.milestone_issues.get(int(query["milestone"][0]), [])
+            return self._page(path, query, issues, self._issue_json)
+        if path == repo_path + "/pulls":
+            return self._page(path, query, self.board.pulls, self._pull_json)
+        match = re.fullmatch(repo_path + r"/pulls/(\d+)/files", path)
+        if match and int(match.group(1)) in self.pulls:
+            return self._page(
+                path, query, self.pulls[int(match.group(1))]["files"], dict
+            )
+        return None
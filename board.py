@@ -0,0 +1,418 @@
+"""
+Bulk loading of a project board through the GitHub GraphQL API.
+
+The REST project API needs a request per card to get its content and further lazy
+requests for labels, assignees and milestones. The GraphQL API returns all of this
+for 100 board items at a time.
+"""
+
+import datetime
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_SIZE = 100
+NO_STATUS = "No Status"
+
+# light-weight stand-ins for the PyGithub objects the checks use
+Label = namedtuple("Label", ["name"])
+User = namedtuple("User", ["login"])
+Milestone = namedtuple(
+    "Milestone", ["number", "title", "state", "due_on", "description"]
+)
+PullRequestCard = namedtuple("PullRequestCard", ["number", "title"])
+DraftCard = namedtuple("DraftCard", ["title"])
+
+PROJECT_QUERY = """
+query($owner: String!, $name: String!, $project: String!) {
+  repository(owner: $owner, name: $name) {
+    projectsV2(first: 20, query: $project) {
+      nodes {
+        id
+        title
+        field(name: "Status") {
+          ... on ProjectV2SingleSelectField { options { name } }
+        }
+      }
+    }
+  }
+}
+"""
+
+ISSUE_FIELDS = """
+number
+title
+url
+state
+updatedAt
+labels(first: 50) { nodes { name } }
+assignees(first: 20) { nodes { login } }
+milestone { number title state dueOn description }
+"""
+
+ITEMS_QUERY = f"""
+query($id: ID!, $cursor: String) {{
+  node(id: $id) {{
+    ... on ProjectV2 {{
+      items(first: {PAGE_SIZE}, after: $cursor) {{
+        pageInfo {{ hasNextPage endCursor }}
+        nodes {{
+          status: fieldValueByName(name: "Status") {{
+            ... on ProjectV2ItemFieldSingleSelectValue {{ name }}
+          }}
+          content {{
+            __typename
+            ... on Issue {{ ISSUE_FIELDS }}
+            ... on PullRequest {{ number title }}
+            ... on DraftIssue {{ title }}
+          }}
+        }}
+      }}
+    }}
+  }}
+}}
+"""
+
+ITEM_QUERY = """
+query($id: ID!) {
+  node(id: $id) {
+    ... on ProjectV2Item {
+      project { title }
+      status: fieldValueByName(name: "Status") {
+        ... on ProjectV2ItemFieldSingleSelectValue { name }
+      }
+      content {
+        __typename
+        ... on Issue { ISSUE_FIELDS }
+        ... on PullRequest { number title }
+        ... on DraftIssue { title }
+      }
+    }
+  }
+}
+""".replace("ISSUE_FIELDS", ISSUE_FIELDS)
+
+# these are labels that apply to a column i.e. there should
+# only be one such label on a ticket
+WORKFLOW_LABELS = [
+    "bucket",
+    "ready",
+    "in progress",
+    "review",
+    "completed",
+    "awaiting",
+    "impeded",
+]
+
+# the milestones of the issues on a board, so that issues in a milestone share one tuple
+_MILESTONES = {}
+
+
+class IssueSnapshot:
+    """
+    An issue as read from the API, with what the checks need of its labels and assignees
+    worked out once when it is built. It is immutable and never makes further requests.
+    """
+
+    _fields = (
+        "number",
+        "title",
+        "html_url",
+        "state",
+        "labels",
+        "assignees",
+        "milestone",
+        "updated_at",
+    )
+    __slots__ = _fields + (
+        "label_names",
+        "size_labels",
+        "size",
+        "in_rework",
+        "under_review",
+        "added_during_sprint",
+        "workflow_labels",
+        "assigned",
+    )
+
+    def __init__(
+        self, number, title, html_url, state, labels, assignees, milestone, updated_at
+    ):
+        label_names = frozenset(label.name for label in labels)
+        size_labels = tuple(label.name for label in labels if label.name.isdigit())
+        logins = {user.login for user in assignees}
+        values = {
+            "number": number,
+            "title": title,
+            "html_url": html_url,
+            "state": state,
+            "labels": tuple(labels),
+            "assignees": tuple(assignees),
+            "milestone": milestone and _MILESTONES.setdefault(milestone, milestone),
+            "updated_at": updated_at,
+            "label_names": label_names,
+            "size_labels": size_labels,
+            "size": int(size_labels[0]) if size_labels else None,
+            "in_rework": "rework" in label_names,
+            "under_review": "under review" in label_names,
+            "added_during_sprint": "added during sprint" in label_names,
+            "workflow_labels": label_names.intersection(WORKFLOW_LABELS),
+            # as utils.get_assigned, interned as most people are assigned to many issues
+            "assigned": sys.intern(",".join(logins)) if logins else "None",
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"IssueSnapshot is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"IssueSnapshot is immutable, cannot delete {name}")
+
+    @property
+    def assignee(self):
+        return self.assignees[0] if self.assignees else None
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other):
+        if not isinstance(other, IssueSnapshot):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __reduce__(self):
+        return IssueSnapshot, self._values()
+
+    def __repr__(self):
+        return "IssueSnapshot({})".format(
+            ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        )
+
+
+def parse_datetime(value):
+    """Parse a GitHub ISO 8601 timestamp, returning None for missing values."""
+    if value is None:
+        return None
+    return datetime.datetime.fromisoformat(value)
+
+
+def issue_from_graphql(node):
+    """Build an IssueSnapshot from the GraphQL fields in ISSUE_FIELDS."""
+    milestone = node.get("milestone")
+    if milestone is not None:
+        milestone = Milestone(
+            milestone["number"],
+            milestone["title"],
+            milestone["state"].lower(),
+            parse_datetime(milestone.get("dueOn")),
+            milestone.get("description"),
+        )
+    return IssueSnapshot(
+        number=node["number"],
+        title=node["title"],
+        html_url=node["url"],
+        state=node["state"].lower(),
+        labels=tuple(Label(label["name"]) for label in node["labels"]["nodes"]),
+        assignees=tuple(User(user["login"]) for user in node["assignees"]["nodes"]),
+        milestone=milestone,
+        updated_at=parse_datetime(node.get("updatedAt")),
+    )
+
+
+def content_from_graphql(content):
+    """Convert the content of a project item into an IssueSnapshot or card stand-in."""
+    if content is None or content["__typename"] == "DraftIssue":
+        return DraftCard(content["title"] if content else None)
+    if content["__typename"] == "PullRequest":
+        return PullRequestCard(content["number"], content["title"])
+    return issue_from_graphql(content)
+
+
+def find_project(repo, project_board_name):
+    """
+    Find a project linked to the repository by its exact name.
+    Return:
+        A tuple of (project node id, list of status column names in board order)
+    """
+    owner, name = repo.full_name.split("/")
+    _, data = repo.requester.graphql_query(
+        PROJECT_QUERY, {"owner": owner, "name": name, "project": project_board_name}
+    )
+    found_projects = [
+        project
+        for project in data["data"]["repository"]["projectsV2"]["nodes"]
+        if project["title"] == project_board_name
+    ]
+
+    if len(found_projects) != 1:
+        raise KeyError(f"{project_board_name} not found in IBEX repo")
+
+    project = found_projects[0]
+    print(f"## Checking project {project['title']} ##\n")
+
+    options = (project.get("field") or {}).get("options", [])
+    return project["id"], [option["name"] for option in options]
+
+
+def iter_items(repo, project_id, issue_fields=ISSUE_FIELDS):
+    """
+    Page through the items of a project.
+    Args:
+        repo: The repository the project is linked to
+        project_id: The project node id
+        issue_fields: The GraphQL fields to get for items that are issues
+    Return:
+        A generator of (column name, GraphQL content) for each item in board order
+    """
+    query = ITEMS_QUERY.replace("ISSUE_FIELDS", issue_fields)
+    cursor = None
+    while True:
+        _, data = repo.requester.graphql_query(
+            query, {"id": project_id, "cursor": cursor}
+        )
+        items = data["data"]["node"]["items"]
+        for item in items["nodes"]:
+            status = item["status"]["name"] if item.get("status") else NO_STATUS
+            yield status, item["content"]
+        if not items["pageInfo"]["hasNextPage"]:
+            break
+        cursor = items["pageInfo"]["endCursor"]
+
+
+def iter_issue_nodes(repo, numbers, fields, batch_size=50, workers=1, kind="issue"):
+    """
+    Query many issues by number using one GraphQL query per batch of issues.
+    Args:
+        repo: The repository the issues are in
+        numbers: The issue numbers
+        fields: The GraphQL fields to get for each issue, must include number
+        batch_size: The number of issues to request in each query
+        workers: The number of queries to make concurrently
+        kind: "issue", or "issueOrPullRequest" to also get pull requests by number
+    Return:
+        A generator of the GraphQL node of each number that is an issue, in batch order
+    """
+    owner, name = repo.full_name.split("/")
+    numbers = sorted(set(numbers))
+    query = (
+        "query($owner: String!, $name: String!) "
+        "{ repository(owner: $owner, name: $name) { %s } }"
+    )
+
+    def query_batch(batch):
+        aliases = "\n".join(
+            f"i{number}: {kind}(number: {number}) {{ {fields} }}" for number in batch
+        )
+        headers, data = repo.requester.requestJsonAndCheck(
+            "POST",
+            repo.requester.graphql_url,
+            input={
+                "query": query % aliases,
+                "variables": {"owner": owner, "name": name},
+            },
+        )
+        # a number that does not exist is null with a NOT_FOUND error, the rest are still returned
+        if any(error.get("type") != "NOT_FOUND" for error in data.get("errors", [])):
+            raise repo.requester.createException(400, headers, data)
+        repository = (data.get("data") or {}).get("repository") or {}
+        return [node for node in repository.values() if node is not None]
+
+    batches = [
+        numbers[start : start + batch_size]
+        for start in range(0, len(numbers), batch_size)
+    ]
+    with ThreadPoolExecutor(workers) as executor:
+        for nodes in executor.map(query_batch, batches):
+            yield from nodes
+
+
+def load_issues(repo, numbers, workers=1):
+    """
+    Get many issues in batched GraphQL queries.
+    Return:
+        A dictionary of issue number: IssueSnapshot
+    """
+    return {
+        node["number"]: issue_from_graphql(node)
+        for node in iter_issue_nodes(repo, numbers, ISSUE_FIELDS, workers=workers)
+    }
+
+
+def load_issue_states(repo, numbers, workers=1):
+    """
+    Get the state of many issues or pull requests in batched GraphQL queries.
+    Return:
+        A dictionary of number: "open" or "closed" for the numbers that exist
+    """
+    fields = "... on Issue { number state } ... on PullRequest { number state }"
+    return {
+        # as in the REST API, a merged pull request is closed
+        node["number"]: "open" if node["state"] == "OPEN" else "closed"
+        for node in iter_issue_nodes(
+            repo, numbers, fields, workers=workers, kind="issueOrPullRequest"
+        )
+    }
+
+
+def issue_from_rest(issue):
+    """Build an IssueSnapshot from a PyGithub issue from a listing, without further requests."""
+    milestone = issue.milestone
+    if milestone is not None:
+        milestone = Milestone(
+            milestone.number,
+            milestone.title,
+            milestone.state,
+            milestone.due_on,
+            milestone.description,
+        )
+    return IssueSnapshot(
+        number=issue.number,
+        title=issue.title,
+        html_url=issue.html_url,
+        state=issue.state,
+        labels=tuple(Label(label.name) for label in issue.labels),
+        assignees=tuple(User(user.login) for user in issue.assignees),
+        milestone=milestone,
+        updated_at=issue.updated_at,
+    )
+
+
+def snapshot_of(issue):
+    """The IssueSnapshot of a board issue, built from a PyGithub issue if it is one."""
+    return issue if isinstance(issue, IssueSnapshot) else issue_from_rest(issue)
+
+
+def load_item(repo, item_id):
+    """
+    Get a single project item, as when a webhook reports that it changed.
+    Return:
+        A tuple of (project title, column name, IssueSnapshot or card stand-in), None if
+        the item no longer exists
+    """
+    _, data = repo.requester.graphql_query(ITEM_QUERY, {"id": item_id})
+    item = data["data"]["node"]
+    if item is None:
+        return None
+    status = item["status"]["name"] if item.get("status") else NO_STATUS
+    return item["project"]["title"], status, content_from_graphql(item["content"])
+
+
+def load_board(repo, project_board_name):
+    """
+    Load every item on a project board in pages of PAGE_SIZE items.
+    Args:
+        repo: The repository the project is linked to
+        project_board_name: The name of the project to load
+    Return:
+        A dictionary of column name: list of IssueSnapshot, PullRequestCard or DraftCard,
+        with columns in board order
+    """
+    project_id, column_names = find_project(repo, project_board_name)
+    board = {name: [] for name in column_names}
+    for status, content in iter_items(repo, project_id):
+        board.setdefault(status, []).append(content_from_graphql(content))
+    return board
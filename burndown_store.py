@@ -0,0 +1,282 @@
+"""
+A date-indexed history of the daily burndown figures.
+
+card.py --data records the points and tickets in each column once a day, the day's totals
+and the current sprint. The burndown CSVs for the web page are exported from it. Rows are
+keyed by ISO date, so the days of a sprint are read with a range query on the key rather
+than by scanning the whole history.
+"""
+
+import csv
+import os
+import sqlite3
+from collections import namedtuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS column_counts (
+    date TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    tickets INTEGER NOT NULL,
+    PRIMARY KEY (date, column_name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_totals (
+    date TEXT PRIMARY KEY,
+    points_sum INTEGER NOT NULL,
+    points_added INTEGER NOT NULL,
+    tickets_sum INTEGER NOT NULL,
+    tickets_added INTEGER NOT NULL,
+    tickets_under_review INTEGER NOT NULL,
+    current_rework INTEGER NOT NULL,
+    completed_rework INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sprints (
+    title TEXT PRIMARY KEY,
+    start TEXT NOT NULL,
+    due TEXT,
+    target_points INTEGER
+);
+CREATE INDEX IF NOT EXISTS sprints_by_start ON sprints (start);
+"""
+
+# the column left out of the exported CSVs
+UNKNOWN_COLUMN = "Unknown"
+COMPLETE_COLUMN = "Complete"
+
+DailyTotals = namedtuple(
+    "DailyTotals",
+    [
+        "points_sum",
+        "points_added",
+        "tickets_sum",
+        "tickets_added",
+        "tickets_under_review",
+        "current_rework",
+        "completed_rework",
+    ],
+)
+Sprint = namedtuple("Sprint", ["title", "start", "due", "target_points"])
+
+POINTS_TOTALS = ["Points Sum", "Points Added", "Burndown"]
+TICKETS_TOTALS = [
+    "Under Review",
+    "Current Rework",
+    "Completed Rework",
+    "Tickets Sum",
+    "Tickets Added",
+    "Burndown",
+]
+
+
+class BurndownStore:
+    """The points and tickets in each board column per day, with the sprints they are in."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record_day(self, date, column_points, column_tickets, totals):
+        """
+        Record, or replace, the figures for a day.
+        Args:
+            date: The ISO date
+            column_points: A dictionary of column name: points
+            column_tickets: A dictionary of column name: tickets
+            totals: The DailyTotals
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM column_counts WHERE date = ?", (date,))
+            self.connection.executemany(
+                "INSERT INTO column_counts VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        date,
+                        name,
+                        column_points.get(name, 0),
+                        column_tickets.get(name, 0),
+                    )
+                    for name in sorted(set(column_points) | set(column_tickets))
+                ],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO daily_totals VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (date,) + tuple(totals),
+            )
+
+    def save_sprint(self, sprint):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sprints VALUES (?, ?, ?, ?)", sprint
+            )
+
+    def sprints(self):
+        """All sprints in order of their start."""
+        return [
+            Sprint(*row)
+            for row in self.connection.execute("SELECT * FROM sprints ORDER BY start")
+        ]
+
+    def sprint_on(self, date):
+        """The latest sprint started on or before a date, None if there isn't one."""
+        row = self.connection.execute(
+            "SELECT * FROM sprints WHERE start <= ? ORDER BY start DESC LIMIT 1",
+            (date,),
+        ).fetchone()
+        return None if row is None else Sprint(*row)
+
+    def is_empty(self):
+        return (
+            self.connection.execute("SELECT 1 FROM daily_totals LIMIT 1").fetchone()
+            is None
+        )
+
+    def _range(self, table, columns, start, end, order):
+        query = f"SELECT {columns} FROM {table} WHERE date >= ? AND date <= ? ORDER BY {order}"
+        return self.connection.execute(query, (start or "", end or "9999"))
+
+    def read_days(self, start=None, end=None):
+        """
+        Read the days between two ISO dates, inclusive.
+        Return:
+            A list of (date, {column name: (points, tickets)}, DailyTotals) in date order
+        """
+        counts = {}
+        for date, name, points, tickets in self._range(
+            "column_counts", "*", start, end, "date, column_name"
+        ):
+            counts.setdefault(date, {})[name] = (points, tickets)
+        return [
+            (row[0], counts.get(row[0], {}), DailyTotals(*row[1:]))
+            for row in self._range("daily_totals", "*", start, end, "date")
+        ]
+
+    @staticmethod
+    def _columns(days):
+        return sorted(
+            {name for _, counts, _ in days for name in counts} - {UNKNOWN_COLUMN}
+        )
+
+    def read_points(self, start=None, end=None):
+        """
+        The points in each column per day, as in burndown-points.csv.
+        Return:
+            The header and a list of rows
+        """
+        days = self.read_days(start, end)
+        columns = self._columns(days)
+        rows = []
+        for date, counts, totals in days:
+            completed = counts.get(COMPLETE_COLUMN, (0, 0))[0]
+            rows.append(
+                [date]
+                + [counts.get(name, (0, 0))[0] for name in columns]
+                + [
+                    totals.points_sum,
+                    totals.points_added,
+                    totals.points_sum - totals.points_added - completed,
+                ]
+            )
+        return ["Date"] + columns + POINTS_TOTALS, rows
+
+    def read_tickets(self, start=None, end=None):
+        """
+        The tickets in each column per day, as in burndown-tickets.csv.
+        Return:
+            The header and a list of rows
+        """
+        days = self.read_days(start, end)
+        columns = self._columns(days)
+        rows = []
+        for date, counts, totals in days:
+            completed = counts.get(COMPLETE_COLUMN, (0, 0))[1]
+            rows.append(
+                [date]
+                + [counts.get(name, (0, 0))[1] for name in columns]
+                + [
+                    totals.tickets_under_review,
+                    totals.current_rework,
+                    totals.completed_rework,
+                    totals.tickets_sum,
+                    totals.tickets_added,
+                    totals.tickets_sum - totals.tickets_added - completed,
+                ]
+            )
+        return ["Date"] + columns + TICKETS_TOTALS, rows
+
+    def export_csv(self, points_path, tickets_path):
+        """Write the burndown CSVs for the web page."""
+        for path, (header, rows) in (
+            (points_path, self.read_points()),
+            (tickets_path, self.read_tickets()),
+        ):
+            with open(path + ".tmp", "w", newline="") as f:
+                writer = csv.writer(f, lineterminator="\n")
+                writer.writerow(header)
+                writer.writerows(rows)
+            os.replace(path + ".tmp", path)
+
+    def import_csv(self, points_path, tickets_path):
+        """
+        Import the history from burndown CSVs written by earlier versions of card.py.
+        Rows that do not match their file's header are skipped.
+        """
+        points = _read_csv(points_path, len(POINTS_TOTALS))
+        tickets = _read_csv(tickets_path, len(TICKETS_TOTALS))
+        for date in sorted(points):
+            column_points, (points_sum, points_added, _) = points[date]
+            column_tickets, ticket_totals = tickets.get(
+                date, ({}, [0] * len(TICKETS_TOTALS))
+            )
+            (
+                under_review,
+                current_rework,
+                completed_rework,
+                tickets_sum,
+                tickets_added,
+                _,
+            ) = ticket_totals
+            self.record_day(
+                date,
+                column_points,
+                column_tickets,
+                DailyTotals(
+                    points_sum,
+                    points_added,
+                    tickets_sum,
+                    tickets_added,
+                    under_review,
+                    current_rework,
+                    completed_rework,
+                ),
+            )
+
+
+def _read_csv(path, num_totals):
+    """Read a burndown CSV into a dictionary of date: ({column: value}, [totals])."""
+    days = {}
+    if not os.path.exists(path):
+        return days
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return days
+        columns = header[1:-num_totals]
+        for row in reader:
+            if len(row) != len(header):
+                print(
+                    f"INFO: skipping {path} row that does not match its header: {row}"
+                )
+                continue
+            values = [int(value) for value in row[1:]]
+            days[row[0]] = (dict(zip(columns, values)), values[len(columns) :])
+    return days
@@ -3,26 +3,42 @@ project board scan
 """
 
 import argparse
-import datetime
+import contextlib
+import io
 import json
 import os
+import re
 import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from statistics import mode
 
-from github import Issue
+import cassette
+import metrics
+import rate_limit
+import rules
+from burndown_store import BurndownStore, DailyTotals, Sprint
+from history import BATCH_SIZE, get_histories
+from utils import (
+    COLUMNS,
+    HTTP_CACHE_DIR,
+    ThreadOutput,
+    get_assigned,
+    get_board,
+    get_IBEX_repo,
+    is_issue,
+)
 
-from utils import COLUMNS, get_assigned, get_IBEX_repo, get_project_columns
+DEFAULT_PROJECT = "IBEX Project Board"
 
-parser = argparse.ArgumentParser(description="projects")
-parser.add_argument("--project", dest="project", default="IBEX Project Board")
-parser.add_argument("--data", action="store_true")
-parser.add_argument("--milestone", action="store_true")
-args = parser.parse_args()
+BURNDOWN_HISTORY = "burndown.sqlite"
+BURNDOWN_POINTS_CSV = "burndown-points.csv"
+BURNDOWN_TICKETS_CSV = "burndown-tickets.csv"
+MILESTONE_JSON = "milestone.json"
+TICKETS_CSV = "tickets.csv"
 
-# these are labels that apply to a column i.e. there should
-# only be one such label on a ticket
-WORKFLOW_LABELS = ["bucket", "ready", "in progress", "review", "completed", "awaiting", "impeded"]
 POINTSUM_COLUMNS = [
     COLUMNS.READY,
     COLUMNS.IN_PROGRESS,
@@ -30,451 +46,475 @@ POINTSUM_COLUMNS = [
     COLUMNS.COMPLETE,
     COLUMNS.IMPEDED,
 ]
-ZERO_POINT_LABELS = {
-    "Good First Issue",
-    "HLM",
-    "Cryomagnet",
-    "Friday",
-    "Datastreaming",
-    "standdown",
-    "support",
-}
-NO_POINT_LABELS = {"support", "duplicate", "sub-ticket", "umbrella", "wontfix"}
-
-NUM_ERROR = 0
-NUM_WARNING = 0
-
-
-def print_error(*args, **kwargs):
-    global NUM_ERROR
-    print(*args, **kwargs)
-    NUM_ERROR += 1
-
-
-def print_warning(*args, **kwargs):
-    global NUM_WARNING
-    print(*args, **kwargs)
-    NUM_WARNING += 1
-
-
-def check_labels(labels, check, issue, present):
-    assigned = get_assigned(issue)
-    if present:
-        diff = set(check).difference(labels)
-        if len(diff) > 0:
-            print_error(
-                "ERROR: issue {} ({}) does NOT have the following required labels: {} (assigned: {})".format(
-                    issue.number, issue.title, ",".join(diff), assigned
-                )
-            )
-    if not present:
-        diff = labels.intersection(set(check))
-        if len(diff) > 0:
-            print_error(
-                "ERROR: issue {} ({}) has the following INVALID labels: {} (assigned: {})".format(
-                    issue.number, issue.title, ",".join(diff), assigned
-                )
-            )
-
-
-def check_column_label(labels, label, issue):
-    check_labels(labels, [label], issue, True)
-    no_labels = [x for x in WORKFLOW_LABELS if x != label]
-    check_labels(labels, no_labels, issue, False)
-
-
-def check_if_stale(issue, label_name, warn_days_allowed, error_days_allowed, assigned):
-    created = None
-    for event in issue.get_events():  # or get_timeline() and '
-        #        if event.event == 'moved_columns_in_project' and event.column_name == 'Review':
-        #            print(event.created_at)
-        if event.event == "labeled" and event.label.name == label_name:
-            created = event.created_at
-    if created is not None:
-        dur = datetime.datetime.now(datetime.UTC) - created
-        if dur > datetime.timedelta(error_days_allowed):
-            print_warning(
-                'ERROR: Issue {} ({}) has been in "{}" for {} days (assigned: {})'.format(
-                    issue.number, issue.title, label_name, dur.days, assigned
-                )
-            )
-        elif dur > datetime.timedelta(warn_days_allowed):
-            print_warning(
-                'WARNING: Issue {} ({}) has been in "{}" for {} days (assigned: {})'.format(
-                    issue.number, issue.title, label_name, dur.days, assigned
-                )
-            )
 
+# a board loaded for checking, with what was printed while loading it
+Board = namedtuple("Board", ["project", "prefix", "preamble", "contents"])
+# what the milestone audit and tickets.csv need of an issue in a milestone, with assignee
+# always None as assignees includes them
+MilestoneIssue = namedtuple(
+    "MilestoneIssue", ["number", "title", "state", "assignees", "assignee"]
+)
 
-def check_recent_comments(issue, error_days_allowed):
-    comments = issue.get_comments()
-    most_recent_comment = None
-    for comment in comments:
-        if most_recent_comment is None or comment.updated_at > most_recent_comment.updated_at:
-            most_recent_comment = comment
-    if most_recent_comment:
-        # time ago comment was made
-        days_ago = (datetime.datetime.now(datetime.UTC) - most_recent_comment.updated_at).days
 
-        if days_ago > error_days_allowed:
-            check_if_stale(issue, "impeded", error_days_allowed, error_days_allowed, assigned)
-    else:
-        check_if_stale(issue, "impeded", error_days_allowed, error_days_allowed, assigned)
-
-
-repo = get_IBEX_repo()
-columns = get_project_columns(repo, args.project)
-
-issue_size = {}
-issue_column = {}
-column_tickets = {}
-column_points = {}
-milestones = []
-
-tickets_under_review = 0
-points_under_review = 0
-current_rework = 0
-completed_rework = 0
-tickets_added_during_sprint = 0
-points_added_during_sprint = 0
-# all columns except Bucket should have sizes on tickets
-# and this size should not be 0
-for github_column in columns:
-    print(f'** Checking column "{github_column.name}"')
-    column = COLUMNS.from_value(github_column.name)
-
-    if column is COLUMNS.IGNORED:
-        print(f"Ignoring column {github_column.name}")
-        continue
-
-    total = 0
-    cards = github_column.get_cards()
-    column_tickets[column] = cards.totalCount
-
-    is_bucket = False
-    if column is COLUMNS.UNKNOWN:
-        is_bucket = True
-        print('INFO: unknown column "{}" - assuming like Bucket'.format(github_column.name))
-    if column is COLUMNS.BUCKET:
-        is_bucket = True
-
-    for card in cards:
-        content = card.get_content()
-        if isinstance(content, Issue.Issue):
-            issue = content
-            assigned = get_assigned(issue)
-            found_size = False
-            under_review = False
-            size = None
-            labels = set()
-            in_rework = False
-            added_during_sprint = False
-            in_progress = False
-            ready = False
-            for label in issue.labels:
-                labels.add(label.name)
-                if label.name == "under review":
-                    under_review = True
-                    tickets_under_review += 1
-                if label.name == "rework":
-                    in_rework = True
-                if label.name == "added during sprint":
-                    added_during_sprint = True
-                if label.name == "in progress":
-                    in_progress = True
-                if label.name == "ready":
-                    ready = True
-                if label.name.isdigit():
-                    if found_size:
-                        print_error(
-                            "ERROR: issue {} ({}) has multiple sizes (assigned: {})".format(
-                                issue.number, issue.title, assigned
-                            )
-                        )
-                    else:
-                        size = int(label.name)
-                        found_size = True
-            if size is None:
-                no_labels = NO_POINT_LABELS.intersection(labels)
-                if len(no_labels) > 0:
-                    print(
-                        "INFO: no size {} issue {} ({})".format(
-                            ",".join(no_labels), issue.number, issue.title
-                        )
-                    )
-                elif is_bucket:
-                    pass
-                else:
-                    print_error(
-                        "ERROR: no size for issue {} ({}) in {} (assigned: {})".format(
-                            issue.number, issue.title, column, assigned
-                        )
-                    )
-            elif size == 0:
-                zero_labels = ZERO_POINT_LABELS.intersection(labels)
-                if len(zero_labels) > 0:
-                    print("INFO: size 0 {} issue {}".format(",".join(zero_labels), issue.number))
-                else:
-                    print_error(
-                        "ERROR: size 0 not allowed for issue {} ({}) (assigned: {})".format(
-                            issue.number, issue.title, assigned
-                        )
-                    )
-            else:
-                if added_during_sprint:
-                    points_added_during_sprint += size
-                    tickets_added_during_sprint += 1
-                if under_review:
-                    points_under_review += size
-                total += size
-            if size is not None:
-                issue_size[issue.number] = size
-            issue_column[issue.number] = column
-            if is_bucket and issue.milestone is not None:
-                print_error(
-                    "ERROR: issue {} ({}) has milestone {} (assigned: {})".format(
-                        issue.number, issue.title, issue.milestone.title, get_assigned(issue)
-                    )
-                )
-            if not is_bucket and issue.milestone is None:
-                print_error(
-                    "ERROR: issue {} ({}) has no milestone (assigned: {})".format(
-                        issue.number, issue.title, assigned
-                    )
-                )
-            if not is_bucket and issue.milestone is not None and issue.milestone.state == "open":
-                milestones.append(issue.milestone.title)
-            if (issue.milestone is not None) and (issue.milestone.state == "closed"):
-                print_error(
-                    "ERROR: issue {} ({}) has a closed milestone (assigned: {})".format(
-                        issue.number, issue.title, assigned
-                    )
-                )
-            if column is COLUMNS.UNKNOWN:
-                check_labels(labels, ["rework"], issue, False)
-            if column is COLUMNS.BUCKET:
-                check_column_label(labels, "bucket", issue)
-            if column is COLUMNS.READY:
-                check_column_label(labels, "ready", issue)
-                check_labels(labels, ["proposal"], issue, False)
-                check_if_stale(issue, "rework", 7, 28, assigned)
-            if column is COLUMNS.IN_PROGRESS:
-                check_column_label(labels, "in progress", issue)
-                check_if_stale(issue, "in progress", 14, 2800, assigned)
-            if column is COLUMNS.REVIEW:
-                check_column_label(labels, "review", issue)
-                check_if_stale(issue, "review", 7, 28, assigned)
-                if "under review" in issue.labels:
-                    check_if_stale(issue, "under review", 7, 28, assigned)
-            # if column is COLUMNS.COMPLETE:
-            #    check_column_label(labels, 'completed', issue)
-            # if column is COLUMNS.DONE:
-            #     check_column_label(labels, 'completed', issue)
-            if column is COLUMNS.IMPEDED:
-                check_column_label(labels, "impeded", issue)
-                check_recent_comments(issue, 28)
-            if in_rework and column in [COLUMNS.READY, COLUMNS.IN_PROGRESS, COLUMNS.IMPEDED]:
-                current_rework += 1
-            if in_rework and column in [COLUMNS.REVIEW, COLUMNS.COMPLETE, COLUMNS.DONE]:
-                completed_rework += 1
-            #            if addigned != 'None' and column.name in [ 'Bucket' ]:
-            #                print_error("ERROR: issue {} cannot be assigned to {}".format(issue.number,assigned))
-            if assigned == "None" and column in [
-                COLUMNS.IN_PROGRESS,
-                COLUMNS.REVIEW,
-                COLUMNS.COMPLETE,
-            ]:
-                print_error(
-                    "ERROR: issue {} ({}) must be assigned to somebody".format(
-                        issue.number, issue.title
-                    )
-                )
-        else:
-            pr = card.get_content()
-            try:
-                print_error("ERROR: pullrequest {} not allowed".format(pr.number))
-            except AttributeError:
-                print_warning("WARNING: Card is present on board instead of IBEX issue")
-    print(
-        'INFO: column "{}" contains {} cards and {} points\n'.format(
-            column, cards.totalCount, total
-        )
+def add_arguments(parser):
+    parser.add_argument(
+        "--project",
+        dest="project",
+        action="append",
+        help=f"a board to check, may be given more than once to check several boards "
+        f"concurrently (default {DEFAULT_PROJECT})",
     )
-    column_points[column] = total
-
-print("INFO: number of issues under review = {}".format(tickets_under_review))
-print("INFO: number of points under review = {}".format(points_under_review))
-print("INFO: number of issues still requiring rework = {}".format(current_rework))
-print("INFO: number of issues with completed rework = {}".format(completed_rework))
-print("INFO: number of issues added during sprint = {}".format(tickets_added_during_sprint))
-print("")
-
-open_milestones = repo.get_milestones(state="open")
-current_milestone_title = mode(milestones)
-for milestone in open_milestones:
-    if milestone.title == current_milestone_title:
-        current_milestone = milestone
-print(
-    "INFO: Current milestone is {} and has {} open and {} closed issues".format(
-        current_milestone.title, current_milestone.open_issues, current_milestone.closed_issues
+    parser.add_argument("--data", action="store_true")
+    parser.add_argument("--milestone", action="store_true")
+    parser.add_argument(
+        "--backend",
+        choices=["graphql", "rest"],
+        default="graphql",
+        help="graphql bulk loads a projects (v2) board, rest loads a classic board card by card",
+    )
+    parser.add_argument(
+        "--store",
+        help="SQLite snapshot of the board to sync incrementally and check against, with the "
+        "graphql backend only",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="number of concurrent requests when fetching card contents and issue histories",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not use or update the cache of API responses",
+    )
+    parser.add_argument(
+        "--skip-rule",
+        action="append",
+        default=[],
+        choices=[r.name for r in rules.RULES],
+        help="do not check this rule, may be given more than once",
+    )
+    parser.add_argument(
+        "--history",
+        default=BURNDOWN_HISTORY,
+        help="SQLite history of the daily burndown figures that --data records to",
     )
-)
-
-try:
-    ms_dict = json.loads(current_milestone.description.split("\n")[0])
-except:
-    ms_dict = {}
-    ms_dict["SP"] = 0
-
-ms_dict["DUE"] = current_milestone.due_on.isoformat()
-
-print("INFO: Current milestone target {SP} SP and is due on {DUE}".format(**ms_dict))
-
-# format is SPRINT_YY_MM_DD
-try:
-    ms_parts = current_milestone.title.split("_")
-    ms_dict["START"] = "-".join(ms_parts[1:])
-except:
-    ms_dict["START"] = "1970-01-01"
 
-with open("milestone.json", "w") as f:
-    json.dump(ms_dict, f)
 
-for milestone in open_milestones:
-    if milestone.title != current_milestone_title and milestone.title in milestones:
-        milestone_issues = repo.get_issues(milestone=milestone, state="all")
-        for issue in milestone_issues:
-            if issue.number in issue_column:
-                print_error(
-                    "ERROR: issue {} ({}) ({}, assigned: {}) has old milestone {}".format(
-                        issue.number, issue.title, issue.state, get_assigned(issue), milestone.title
+def check_arguments(parser, args):
+    """Reject a snapshot store with the REST backend, which loads a classic board without one."""
+    if args.store and args.backend == "rest":
+        parser.error("--store cannot be used with --backend rest")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="projects")
+    add_arguments(parser)
+    metrics.add_arguments(parser)
+    cassette.add_arguments(parser)
+    rate_limit.add_arguments(parser)
+    args = parser.parse_args(argv)
+    check_arguments(parser, args)
+    cassette.check_arguments(parser, args)
+    return args
+
+
+def projects(args):
+    return args.project or [DEFAULT_PROJECT]
+
+
+def output_prefix(project, index):
+    """
+    The prefix of the output files of a board, so that boards checked together do not
+    overwrite each other's files. The first board keeps the plain file names.
+    """
+    if index == 0:
+        return ""
+    return re.sub(r"[^a-z0-9]+", "-", project.lower()).strip("-") + "-"
+
+
+def output_path(path, prefix):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, prefix + name)
+
+
+class MilestoneCache:
+    """
+    The repository milestones and their issues, read once and shared by the boards checked
+    in a run.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.lock = threading.Lock()
+        self.open_milestones = None
+        self.issues = {}
+
+    def get_open_milestones(self):
+        with self.lock:
+            if self.open_milestones is None:
+                self.open_milestones = list(self.repo.get_milestones(state="open"))
+            return self.open_milestones
+
+    def get_issues(self, milestone):
+        """
+        The issues in a milestone.
+        Return:
+            A list of MilestoneIssue, in the order the API lists them
+        """
+        with self.lock:
+            if milestone.number not in self.issues:
+                self.issues[milestone.number] = [
+                    MilestoneIssue(
+                        issue.number, issue.title, issue.state, issue.assignees, None
                     )
-                )
-
-if args.milestone:
-    milestone_issues = repo.get_issues(milestone=current_milestone, state="all")
-    for issue in milestone_issues:
-        if issue.number not in issue_column:
-            print_error(
-                "ERROR: issue {} ({}) ({}, assigned: {}) has current milestone but is not on board".format(
-                    issue.number, issue.title, issue.state, get_assigned(issue)
-                )
-            )
-
-print("")
-
-points_sum = 0
-for x in sorted(column_points.keys()):
-    print("INFO: Points in column {} = {}".format(x, column_points[x]))
-    if x in POINTSUM_COLUMNS:
-        points_sum += column_points[x]
-
-tickets_sum = 0
-for x in sorted(column_tickets.keys()):
-    if x in POINTSUM_COLUMNS:
-        tickets_sum += column_tickets[x]
-
-print("\nINFO: Workflow columns are: {}".format(",".join(str(x) for x in POINTSUM_COLUMNS)))
-print("INFO: Total points in workflow columns = {}".format(points_sum))
-print("INFO: Total tickets in workflow columns = {}".format(tickets_sum))
+                    for issue in self.repo.get_issues(milestone=milestone, state="all")
+                ]
+            return self.issues[milestone.number]
 
-if NUM_ERROR > 0:
-    print("\nINFO: There are {} errors\n".format(NUM_ERROR))
 
-if NUM_WARNING > 0:
-    print("\nINFO: There are {} warnings\n".format(NUM_WARNING))
+def print_summary(report, stats):
+    report.info(f"INFO: number of issues under review = {stats.tickets_under_review}")
+    report.info(f"INFO: number of points under review = {stats.points_under_review}")
+    report.info(
+        f"INFO: number of issues still requiring rework = {stats.current_rework}"
+    )
+    report.info(
+        f"INFO: number of issues with completed rework = {stats.completed_rework}"
+    )
+    report.info(
+        f"INFO: number of issues added during sprint = {stats.tickets_added_during_sprint}"
+    )
+    report.info("")
+
+
+@metrics.timed("milestone audit")
+def audit_milestones(repo, report, stats, check_current, milestones=None, prefix=""):
+    """
+    Check the milestones of the issues on the board and write milestone.json.
+    Args:
+        repo: The repository
+        report: The Report to print to
+        stats: The BoardStats of the board
+        check_current: Whether to check that all issues in the current milestone are on the board
+        milestones: The MilestoneCache shared with other boards, if any
+        prefix: The prefix of the board's output files
+    Return:
+        The current milestone and Sprint
+    """
+    milestones = milestones or MilestoneCache(repo)
+    open_milestones = milestones.get_open_milestones()
+    current_milestone_title = mode(stats.milestones)
+    for milestone in open_milestones:
+        if milestone.title == current_milestone_title:
+            current_milestone = milestone
+    report.info(
+        f"INFO: Current milestone is {current_milestone.title} and has "
+        f"{current_milestone.open_issues} open and {current_milestone.closed_issues} closed issues"
+    )
 
-if not args.data:
-    sys.exit(NUM_ERROR)
+    try:
+        ms_dict = json.loads(current_milestone.description.split("\n")[0])
+    except:
+        ms_dict = {}
+        ms_dict["SP"] = 0
 
-ts = date.today().isoformat()
+    ms_dict["DUE"] = current_milestone.due_on.isoformat()
 
-with open("issue-size-{}.json".format(ts), "w") as f:
-    f.write(json.dumps(issue_size))
+    report.info(
+        "INFO: Current milestone target {SP} SP and is due on {DUE}".format(**ms_dict)
+    )
 
-with open("issue-column-{}.json".format(ts), "w") as f:
-    f.write(json.dumps({number: column.value for number, column in issue_column.items()}))
+    # format is SPRINT_YY_MM_DD
+    try:
+        ms_parts = current_milestone.title.split("_")
+        ms_dict["START"] = "-".join(ms_parts[1:])
+    except:
+        ms_dict["START"] = "1970-01-01"
+
+    with open(prefix + MILESTONE_JSON, "w") as f:
+        json.dump(ms_dict, f)
+
+    # the board has the milestone of every issue on it, so older milestones are not paged
+    # through; issues are reported newest first, as the issue listing orders them
+    board_milestones = {}
+    for number in sorted(stats.issues, reverse=True):
+        issue = stats.issues[number]
+        if issue.milestone is not None:
+            board_milestones.setdefault(issue.milestone.title, []).append(issue)
+    for milestone in open_milestones:
+        if (
+            milestone.title != current_milestone_title
+            and milestone.title in stats.milestones
+        ):
+            for issue in board_milestones.get(milestone.title, []):
+                report.error(
+                    f"ERROR: issue {issue.number} ({issue.title}) ({issue.state}, assigned: "
+                    f"{get_assigned(issue)}) has old milestone {milestone.title}"
+                )
 
-if not os.path.exists("burndown-points.csv"):
-    with open("burndown-points.csv", "w") as f:
-        f.write(
-            "Date,{},Points Sum,Points Added,Burndown\n".format(
-                ",".join(
-                    [x.value for x in sorted(column_points.keys()) if x is not COLUMNS.UNKNOWN]
+    if check_current:
+        for issue in milestones.get_issues(current_milestone):
+            if issue.number not in stats.issue_column:
+                report.error(
+                    f"ERROR: issue {issue.number} ({issue.title}) ({issue.state}, assigned: "
+                    f"{get_assigned(issue)}) has current milestone but is not on board"
                 )
-            )
+    sprint = Sprint(
+        current_milestone.title, ms_dict["START"], ms_dict["DUE"], ms_dict["SP"]
+    )
+    return current_milestone, sprint
+
+
+def print_totals(report, stats):
+    """
+    Print the points and tickets in the workflow columns.
+    Return:
+        The points and tickets in the workflow columns
+    """
+    points_sum = 0
+    for x in sorted(stats.column_points.keys()):
+        report.info(f"INFO: Points in column {x} = {stats.column_points[x]}")
+        if x in POINTSUM_COLUMNS:
+            points_sum += stats.column_points[x]
+
+    tickets_sum = 0
+    for x in sorted(stats.column_tickets.keys()):
+        if x in POINTSUM_COLUMNS:
+            tickets_sum += stats.column_tickets[x]
+
+    report.info(
+        "\nINFO: Workflow columns are: {}".format(
+            ",".join(str(x) for x in POINTSUM_COLUMNS)
         )
-
-if not os.path.exists("burndown-tickets.csv"):
-    with open("burndown-tickets.csv", "w") as f:
+    )
+    report.info(f"INFO: Total points in workflow columns = {points_sum}")
+    report.info(f"INFO: Total tickets in workflow columns = {tickets_sum}")
+    return points_sum, tickets_sum
+
+
+@metrics.timed("write data")
+def write_data(
+    stats, milestone_issues, sprint, points_sum, tickets_sum, history, prefix=""
+):
+    """
+    Write the day's issue sizes and columns, record the day in the burndown history,
+    export the burndown CSVs from it and write tickets.csv, all with the board's prefix.
+    """
+    ts = date.today().isoformat()
+    points_csv = prefix + BURNDOWN_POINTS_CSV
+    tickets_csv = prefix + BURNDOWN_TICKETS_CSV
+
+    with open(f"{prefix}issue-size-{ts}.json", "w") as f:
+        f.write(json.dumps(stats.issue_size))
+
+    with open(f"{prefix}issue-column-{ts}.json", "w") as f:
         f.write(
-            "Date,{},Under Review,Current Rework,Completed Rework,Tickets Sum,Tickets Added,Burndown\n".format(
-                ",".join(
-                    [x.value for x in sorted(column_tickets.keys()) if x is not COLUMNS.UNKNOWN]
-                )
+            json.dumps(
+                {number: column.value for number, column in stats.issue_column.items()}
             )
         )
 
-with open("burndown-points.csv", "a") as f:
-    if COLUMNS.COMPLETE in column_points:
-        completed = column_points[COLUMNS.COMPLETE]
-    else:
-        completed = 0
-    f.write(
-        "{},{},{},{},{}\n".format(
+    with BurndownStore(history) as store:
+        if store.is_empty():
+            # carry over the history kept in the CSVs before there was a store
+            store.import_csv(points_csv, tickets_csv)
+        store.record_day(
             ts,
-            ",".join(
-                [
-                    str(column_points[x])
-                    for x in sorted(column_points.keys())
-                    if x is not COLUMNS.UNKNOWN
-                ]
+            {column.value: points for column, points in stats.column_points.items()},
+            {column.value: tickets for column, tickets in stats.column_tickets.items()},
+            DailyTotals(
+                points_sum=points_sum,
+                points_added=stats.points_added_during_sprint,
+                tickets_sum=tickets_sum,
+                tickets_added=stats.tickets_added_during_sprint,
+                tickets_under_review=stats.tickets_under_review,
+                current_rework=stats.current_rework,
+                completed_rework=stats.completed_rework,
             ),
-            points_sum,
-            points_added_during_sprint,
-            points_sum - points_added_during_sprint - completed,
         )
-    )
+        store.save_sprint(sprint)
+        store.export_csv(points_csv, tickets_csv)
 
-with open("burndown-tickets.csv", "a") as f:
-    if COLUMNS.COMPLETE in column_tickets:
-        completed = column_tickets[COLUMNS.COMPLETE]
+    with open(prefix + TICKETS_CSV, "w") as f:
+        f.write("Number,Title,Assigned,Points,Column\n")
+        for issue in milestone_issues:
+            # the board's copy of an issue is as fresh as the checks
+            issue = stats.issues.get(issue.number, issue)
+            if issue.number in stats.issue_column:
+                column = stats.issue_column[issue.number]
+            else:
+                column = "Unknown"
+            if issue.number in stats.issue_size:
+                size = stats.issue_size[issue.number]
+            else:
+                size = 0
+            f.write(
+                f'{issue.number},"{issue.title}","{get_assigned(issue)}",{size},{column}\n'
+            )
+
+
+def estimate_requests(repo, board, missing_histories, args, milestones):
+    """
+    Estimate the requests checking a loaded board will make.
+    Args:
+        repo: The repository
+        board: The board from get_board
+        missing_histories: The issues whose history is still to be fetched
+        args: Parsed arguments including those from add_arguments
+        milestones: The MilestoneCache the board is checked with
+    Return:
+        A dictionary of rate limit resource: number of requests
+    """
+    costs = {"core": 0, "graphql": 0}
+    if args.backend == "rest":
+        # a page of events and a page of comments for each issue at least
+        costs["core"] += 2 * len(missing_histories)
     else:
-        completed = 0
-    f.write(
-        "{},{},{},{},{},{},{},{}\n".format(
-            ts,
-            ",".join(
-                [
-                    str(column_tickets[x])
-                    for x in sorted(column_tickets.keys())
-                    if x is not COLUMNS.UNKNOWN
-                ]
-            ),
-            tickets_under_review,
-            current_rework,
-            completed_rework,
-            tickets_sum,
-            tickets_added_during_sprint,
-            tickets_sum - tickets_added_during_sprint - completed,
+        costs["graphql"] += -(-len(missing_histories) // BATCH_SIZE)
+    if milestones.open_milestones is None:
+        costs["core"] += 1
+    if args.milestone or args.data:
+        # the issues of the current milestone, which are mostly on the board
+        in_milestones = sum(
+            1
+            for contents in board.values()
+            for content in contents
+            if is_issue(content) and content.milestone is not None
+        )
+        costs["core"] += max(1, -(-in_milestones // repo.requester.per_page))
+    return costs
+
+
+def check(
+    repo, board, args, report, milestones=None, prefix="", histories=None, checked=None
+):
+    """
+    Check a board, print the totals and, with --data, write the day's data files.
+    Args:
+        repo: The repository
+        board: The board from get_board
+        args: Parsed arguments including those from add_arguments
+        report: The Report to print to
+        milestones: The MilestoneCache shared with other boards, if any
+        prefix: The prefix of the board's output files
+        histories: A dictionary of issue number: IssueHistory kept between checks, to which
+            the histories that are not already in it are added
+        checked: A dictionary of issue number: CheckedIssue kept between checks of the board
+    Return:
+        The exit code, the number of errors unless writing data
+    """
+    active_rules = rules.active_rules(args.skip_rule)
+
+    # only fetch what the active rules need, then check everything in one pass in board order
+    needs = rules.plan(board, active_rules)
+    histories = {} if histories is None else histories
+    missing = [
+        issue for issue in needs.get("history", []) if issue.number not in histories
+    ]
+    milestones = milestones or MilestoneCache(repo)
+    if rate_limit.scheduling():
+        rate_limit.check_budget(
+            estimate_requests(repo, board, missing, args, milestones),
+            "the board checks",
         )
+    with metrics.phase("histories"):
+        histories.update(get_histories(repo, missing, args.backend, args.workers))
+
+    stats = rules.check_board(board, histories, report, active_rules, checked)
+    print_summary(report, stats)
+
+    current_milestone, sprint = audit_milestones(
+        repo, report, stats, args.milestone, milestones, prefix
     )
+    report.info("")
 
-with open("tickets.csv", "w") as f:
-    f.write("Number,Title,Assigned,Points,Column\n")
-    for issue in milestone_issues:
-        if issue.number in issue_column:
-            column = issue_column[issue.number]
-        else:
-            column = "Unknown"
-        if issue.number in issue_size:
-            size = issue_size[issue.number]
-        else:
-            size = 0
-        f.write(
-            '{},"{}","{}",{},{}\n'.format(
-                issue.number, issue.title, get_assigned(issue), size, column
-            )
+    points_sum, tickets_sum = print_totals(report, stats)
+
+    if report.num_errors > 0:
+        report.info(f"\nINFO: There are {report.num_errors} errors\n")
+
+    if report.num_warnings > 0:
+        report.info(f"\nINFO: There are {report.num_warnings} warnings\n")
+
+    if not args.data:
+        return report.num_errors
+
+    write_data(
+        stats,
+        milestones.get_issues(current_milestone),
+        sprint,
+        points_sum,
+        tickets_sum,
+        output_path(args.history, prefix),
+        prefix,
+    )
+    return 0
+
+
+def load_boards(repo, args):
+    """
+    Load the boards to check concurrently.
+    Args:
+        repo: The repository
+        args: Parsed arguments including those from add_arguments
+    Return:
+        A list of Board in the order the projects were given
+    """
+    stdout = ThreadOutput(sys.stdout)
+
+    def load(index, project):
+        with stdout.capture() as preamble, metrics.phase("project lookup"):
+            contents = get_board(repo, project, args.backend, args.store, args.workers)
+        return Board(
+            project, output_prefix(project, index), preamble.getvalue(), contents
         )
 
-sys.exit(0)
+    names = projects(args)
+    with contextlib.redirect_stdout(stdout), ThreadPoolExecutor(len(names)) as executor:
+        return list(executor.map(load, range(len(names)), names))
+
+
+def check_boards(repo, boards, args):
+    """
+    Check boards concurrently, sharing the milestones between them.
+    Args:
+        repo: The repository
+        boards: The Boards from load_boards
+        args: Parsed arguments including those from add_arguments
+    Return:
+        A list of (the board's report, exit code) in board order
+    """
+    milestones = MilestoneCache(repo)
+
+    def check_board(board):
+        output = io.StringIO()
+        exit_code = check(
+            repo, board.contents, args, rules.Report(output), milestones, board.prefix
+        )
+        return output.getvalue(), exit_code
+
+    with ThreadPoolExecutor(len(boards)) as executor:
+        return list(executor.map(check_board, boards))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cassette.start(args)
+    rate_limit.start(args)
+    repo = get_IBEX_repo(None if args.no_cache else HTTP_CACHE_DIR)
+    metrics.start("card", args, repo)
+    try:
+        boards = load_boards(repo, args)
+        results = check_boards(repo, boards, args)
+    except rate_limit.RateLimitExhausted as e:
+        print(f"ERROR: {e}")
+        return 1
+    for board, (output, _) in zip(boards, results):
+        sys.stdout.write(board.preamble + output)
+    return sum(exit_code for _, exit_code in results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,6 @@ export PYTHONPATH=/home/isissupport/card
 
 . /home/isissupport/card/venv/bin/activate
 
-## check default ibex project board
-python3 /home/isissupport/card/card.py --milestone
-
-python3 /home/isissupport/card/release_notes_checker.py
-
-## check other boards
-#python3 /home/isissupport/card/card.py --project="Reflectometry"
+## check default ibex project board and release notes
+## other boards can be checked in the same run with more --project arguments, e.g. --project="Reflectometry"
+python3 /home/isissupport/card/run_checks.py --milestone --summary - --release-notes-output -
@@ -13,17 +13,19 @@ day=`date +%d`
 daily_dir=/isis/www/ibex/daily/$year/$month/$day
 mkdir -p ${daily_dir}
 
-## check default ibex project board
-python3 /home/isissupport/card/card.py --milestone --data > summary.txt
+## check default ibex project board and release notes, writing summary.txt and release_notes_check.txt
+python3 /home/isissupport/card/run_checks.py --milestone --data --store board.sqlite --report checks-report.json --prometheus checks.prom
 
-## check release notes
-python3 /home/isissupport/card/release_notes_checker.py > release_notes_check.txt
-
-## make burndown graph
-python3 /home/isissupport/card/make_fig.py
+## make burndown dashboard, the daily pages sharing the plotly.js in /isis/www/ibex
+## (burndown-points.html is rewritten as a redirect to burndown.html)
+python3 /home/isissupport/card/make_fig.py --report make-fig-report.json --prometheus make_fig.prom --dashboard /isis/www/ibex ${daily_dir}
 
 ## update web files
-cp -f release_notes_check.txt summary.txt tickets.csv burndown-tickets.csv burndown-points.csv burndown-points.html /isis/www/ibex
-cp release_notes_check.txt summary.txt tickets.csv burndown-tickets.csv burndown-points.csv burndown-points.html ${daily_dir}
+cp -f release_notes_check.txt summary.txt tickets.csv burndown-tickets.csv burndown-points.csv /isis/www/ibex
+cp release_notes_check.txt summary.txt tickets.csv burndown-tickets.csv burndown-points.csv ${daily_dir}
+cp checks-report.json make-fig-report.json ${daily_dir}
 mv issue-column-${ts}.json ${daily_dir}/issue-column.json
 mv issue-size-${ts}.json ${daily_dir}/issue-size.json
+
+## add the day to the compacted archive of the daily folders
+python3 /home/isissupport/card/issue_archive.py --archive issue_archive ingest /isis/www/ibex/daily
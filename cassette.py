@@ -0,0 +1,159 @@
+"""
+Recording and replaying of the GitHub API traffic of a run.
+
+With --record every request a run makes is written with the response it got to a gzip
+compressed cassette when the run ends. With --replay the requests of a run are answered
+from a cassette without a token or network, so that a slow or odd run can be repeated,
+timed and profiled on another machine. The response cache is not used while recording or
+replaying, so that the cassette holds every response in full.
+"""
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import client
+from http_cache import WIRE_HEADERS
+
+
+def request_key(request):
+    """What identifies a request in a cassette: its method, URL, media type and body."""
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    return "\n".join(
+        [
+            request.method,
+            request.url,
+            request.headers.get("Accept", ""),
+            hashlib.sha256(body).hexdigest(),
+        ]
+    )
+
+
+class UnrecordedRequest(requests.exceptions.RequestException):
+    """A request being replayed that is not in the cassette."""
+
+
+class RecordingAdapter(client.LayeredAdapter):
+    """Keeps every request sent and the response to it, to be saved as a cassette."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.lock = threading.Lock()
+        self.interactions = []
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        interaction = {
+            "key": request_key(request),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in WIRE_HEADERS
+            },
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        with self.lock:
+            self.interactions.append(interaction)
+        return response
+
+    def save(self):
+        with self.lock:
+            data = json.dumps({"interactions": self.interactions}).encode()
+        with gzip.open(self.path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class ReplayAdapter(client.LayeredAdapter):
+    """
+    Answers requests from a cassette without sending them.
+    A request made several times gets its recorded responses in the order they were
+    recorded, and the last of them again if it is made more often than when recording.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        with gzip.open(path, "rb") as f:
+            interactions = json.load(f)["interactions"]
+        self.lock = threading.Lock()
+        self.recorded = {}
+        for interaction in interactions:
+            self.recorded.setdefault(interaction["key"], []).append(interaction)
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            recorded = self.recorded.get(request_key(request))
+            if not recorded:
+                raise UnrecordedRequest(
+                    f"{request.method} {request.url} is not in the cassette",
+                    request=request,
+                )
+            interaction = recorded.pop(0) if len(recorded) > 1 else recorded[0]
+
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction["reason"]
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response._content = base64.b64decode(interaction["body"])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+
+def add_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--record",
+        metavar="CASSETTE",
+        help="record the GitHub API traffic of the run to a file",
+    )
+    group.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        help="answer GitHub API requests from a recorded file instead of the network",
+    )
+
+
+def check_arguments(parser, args):
+    """
+    Reject a snapshot store with recording or replaying, as the requests that sync a store
+    depend on the local snapshot, so a replay elsewhere would not make the recorded ones.
+    """
+    if (args.record or args.replay) and getattr(args, "store", None):
+        parser.error("--store cannot be used with --record or --replay")
+
+
+def start(args):
+    """
+    Start recording or replaying if asked to, before the repository is got.
+    Args:
+        args: Parsed arguments including those from add_arguments
+    """
+    client.install()
+    if args.record:
+        recorder = client.add_layer(RecordingAdapter(args.record))
+        atexit.register(recorder.save)
+    elif args.replay:
+        client.add_layer(ReplayAdapter(args.replay))
+
+
+def in_use():
+    return client.find_layer(RecordingAdapter) is not None or replaying()
+
+
+def replaying():
+    return client.find_layer(ReplayAdapter) is not None
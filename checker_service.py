@@ -0,0 +1,416 @@
+"""
+A long-running checker that keeps the checks up to date from GitHub webhooks.
+
+The boards, milestones, open PRs and release notes index are read once, as run_checks.py
+reads them, and kept in memory. GitHub webhook deliveries for issues, issue comments,
+project items, pull requests and pushes are then taken on a local HTTP endpoint. Each
+delivery refreshes only what it is about, such as the one issue that was labelled, and only
+the issues that changed are checked against the rules again. summary.txt and
+release_notes_check.txt are rewritten in place after each delivery.
+
+    python checker_service.py serve --port 8080 --secret SECRET
+    python checker_service.py post http://127.0.0.1:8080 delivery.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import hmac
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from git import GitError
+from github import GithubException
+
+import card
+import cassette
+import metrics
+import rate_limit
+import release_notes_checker
+import rules
+from board import load_issues, load_item
+from snapshot_store import SnapshotStore
+from utils import HTTP_CACHE_DIR, get_IBEX_repo, get_pr_info, is_issue
+
+RELEASE_NOTES_BRANCH = "master"
+# issue actions that can change which issues are in a milestone, or their states
+MILESTONE_ACTIONS = {
+    "opened",
+    "closed",
+    "reopened",
+    "milestoned",
+    "demilestoned",
+    "deleted",
+    "transferred",
+}
+
+REMOVED_ITEM_QUERY = """
+query($project: ID!, $content: ID!) {
+  project: node(id: $project) { ... on ProjectV2 { title } }
+  content: node(id: $content) { ... on Issue { number } ... on PullRequest { number } }
+}
+"""
+
+
+def signature(secret, body):
+    """The X-Hub-Signature-256 header GitHub sends with a delivery signed with a secret."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def replace_file(path, text):
+    """Rewrite an output file so that a reader never sees it partly written, "-" for stdout."""
+    if path == "-":
+        sys.stdout.write(text)
+        return
+    with open(path + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def _card_number(content):
+    return getattr(content, "number", None)
+
+
+class CheckerService:
+    """The checks of run_checks.py, kept up to date from webhook deliveries."""
+
+    def __init__(self, repo, args):
+        """
+        Args:
+            repo: The repository
+            args: Parsed arguments including those of card.add_arguments, --summary and
+                --release-notes-output
+        """
+        self.repo = repo
+        self.args = args
+        self.lock = threading.Lock()
+        # kept between checks, and forgotten for an issue when a delivery says it changed
+        self.histories = {}
+        self.known_states = {}
+        with ThreadPoolExecutor(1) as executor:
+            release_notes = executor.submit(
+                release_notes_checker.update_release_notes, not cassette.replaying()
+            )
+            self.boards = card.load_boards(repo, args)
+            with metrics.phase("open PRs"):
+                self.pulls = self._load_pulls()
+            self.release_notes = release_notes.result()
+        self.milestones = self._milestone_cache()
+        self.checked = [{} for _ in self.boards]
+        self.write()
+
+    def _milestone_cache(self):
+        return card.MilestoneCache(self.repo)
+
+    def _load_pulls(self):
+        """The open PRs as a dictionary of number: (title, body, release notes changes)."""
+        pulls = list(self.repo.get_pulls(state="open"))
+        with ThreadPoolExecutor(self.args.workers) as executor:
+            infos = executor.map(
+                lambda pr: get_pr_info(pr, release_notes_checker.UPCOMING_CHANGES_FILE),
+                pulls,
+            )
+            return {pr.number: info for pr, info in zip(pulls, infos)}
+
+    def prs(self):
+        """The open PRs in the order GitHub lists them, newest first."""
+        return [self.pulls[number] for number in sorted(self.pulls, reverse=True)]
+
+    def write(self):
+        """Check the boards and release notes and rewrite the outputs."""
+        for board, checked in zip(self.boards, self.checked):
+            output = io.StringIO()
+            card.check(
+                self.repo,
+                board.contents,
+                self.args,
+                rules.Report(output),
+                self.milestones,
+                board.prefix,
+                self.histories,
+                checked,
+            )
+            summary = self.args.summary
+            if summary != "-":
+                summary = card.output_path(summary, board.prefix)
+            replace_file(summary, board.preamble + output.getvalue())
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            print(self.boards[0].preamble, end="")
+            release_notes_checker.check(
+                self.repo,
+                self.boards[0].contents,
+                self.prs(),
+                self.release_notes,
+                self.args.store,
+                self.known_states,
+            )
+        replace_file(self.args.release_notes_output, output.getvalue())
+
+    def handle(self, event, payload):
+        """
+        Apply a webhook delivery and, if it changed anything, rewrite the outputs.
+        Args:
+            event: The X-GitHub-Event header of the delivery
+            payload: The JSON payload of the delivery
+        Return:
+            Whether the delivery was one the checks depend on
+        """
+        with self.lock, metrics.phase(f"webhook {event}"):
+            handled = self._apply(event, payload)
+            if handled:
+                self.write()
+            return handled
+
+    def _apply(self, event, payload):
+        if event in ("issues", "issue_comment"):
+            issue = payload["issue"]
+            if "pull_request" in issue:
+                # comments on pull requests are delivered as issue comments
+                return False
+            self.histories.pop(issue["number"], None)
+            self.known_states.pop(issue["number"], None)
+            if event == "issues":
+                self._refresh_issue(issue["number"])
+                if payload["action"] in MILESTONE_ACTIONS:
+                    self.milestones = self._milestone_cache()
+            return True
+        if event == "projects_v2_item":
+            return self._refresh_item(payload["projects_v2_item"], payload["action"])
+        if event == "project_card":
+            # a classic board has no query for the column of one card, so it is read again
+            self.boards = card.load_boards(self.repo, self.args)
+            self.checked = [{} for _ in self.boards]
+            return True
+        if event == "pull_request":
+            number = payload["pull_request"]["number"]
+            if payload["action"] == "closed":
+                self.pulls.pop(number, None)
+            else:
+                self.pulls[number] = get_pr_info(
+                    self.repo.get_pull(number),
+                    release_notes_checker.UPCOMING_CHANGES_FILE,
+                )
+            return True
+        if (
+            event == "push"
+            and payload.get("ref") == f"refs/heads/{RELEASE_NOTES_BRANCH}"
+        ):
+            # the clone was brought up to date at start, so the moved branch is pulled anew
+            self.release_notes = release_notes_checker.update_release_notes(
+                not cassette.replaying(), force=True
+            )
+            return True
+        return False
+
+    def _refresh_issue(self, number):
+        """
+        Get an issue again and put it in place of the old one on every board it is on, and in
+        the snapshot if there is one, which the checks read issue states from.
+        """
+        issue = load_issues(self.repo, [number]).get(number)
+        if issue is not None and self.args.store is not None:
+            with SnapshotStore(self.args.store) as store:
+                store.save_issues([issue])
+        for board in self.boards:
+            for contents in board.contents.values():
+                for index, content in enumerate(contents):
+                    if is_issue(content) and content.number == number:
+                        if issue is None:
+                            del contents[index]
+                        else:
+                            contents[index] = issue
+                        break
+
+    def _board(self, project):
+        for board in self.boards:
+            if board.project == project:
+                return board
+        return None
+
+    def _refresh_item(self, item, action):
+        """Move, add or remove the card of a project item on the board it is on."""
+        loaded = None if action == "deleted" else load_item(self.repo, item["node_id"])
+        if loaded is None:
+            _, data = self.repo.requester.graphql_query(
+                REMOVED_ITEM_QUERY,
+                {
+                    "project": item["project_node_id"],
+                    "content": item["content_node_id"],
+                },
+            )
+            project = (data["data"]["project"] or {}).get("title")
+            number = (data["data"]["content"] or {}).get("number")
+            board = self._board(project)
+            if board is None or number is None:
+                return False
+            self._remove_card(board, number)
+            return True
+
+        project, column, content = loaded
+        board = self._board(project)
+        number = _card_number(content)
+        if board is None or (number is None and action != "created"):
+            # a note on the board has nothing to find it by once it is edited
+            return False
+        if number is not None:
+            for name, contents in board.contents.items():
+                for index, old in enumerate(contents):
+                    if _card_number(old) == number:
+                        if name == column:
+                            # still in the same column, so it keeps its place
+                            contents[index] = content
+                            return True
+                        del contents[index]
+                        break
+        board.contents.setdefault(column, []).append(content)
+        return True
+
+    def _remove_card(self, board, number):
+        for contents in board.contents.values():
+            contents[:] = [
+                content for content in contents if _card_number(content) != number
+            ]
+
+
+def make_server(service, host, port, secret=None):
+    """
+    An HTTP server taking webhook deliveries for a service.
+    Args:
+        secret: The webhook secret deliveries must be signed with, None to not check
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def respond(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if secret is not None and not hmac.compare_digest(
+                signature(secret, body), self.headers.get("X-Hub-Signature-256", "")
+            ):
+                self.respond(401, {"message": "bad signature"})
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.respond(400, {"message": "payload is not JSON"})
+                return
+            event = self.headers.get("X-GitHub-Event", "")
+            try:
+                handled = service.handle(event, payload)
+            except KeyError as e:
+                self.respond(400, {"message": f"payload has no {e}"})
+                return
+            except (GithubException, requests.RequestException, GitError, OSError) as e:
+                # GitHub or the release notes clone could not be read, so the delivery is
+                # refused for GitHub to show as failed and for it to be redelivered
+                print(f"ERROR: cannot handle {event} delivery: {e}")
+                self.respond(500, {"message": str(e)})
+                return
+            self.respond(200, {"handled": handled})
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def post_deliveries(url, paths, secret=None):
+    """
+    Post recorded webhook deliveries to a service as GitHub would, for testing.
+    Args:
+        url: The URL of the service
+        paths: Files each holding {"event": X-GitHub-Event, "payload": the payload}
+        secret: The webhook secret to sign the deliveries with, if any
+    Return:
+        The number of deliveries that failed
+    """
+    failed = 0
+    for path in paths:
+        with open(path) as f:
+            delivery = json.load(f)
+        body = json.dumps(delivery["payload"]).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "X-GitHub-Event": delivery["event"],
+        }
+        if secret is not None:
+            headers["X-Hub-Signature-256"] = signature(secret, body)
+        response = requests.post(url, data=body, headers=headers)
+        print(f"INFO: {path}: {response.status_code} {response.text}")
+        failed += not response.ok
+    return failed
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        description="checks kept up to date from GitHub webhooks"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser(
+        "serve", help="check the boards and take webhook deliveries"
+    )
+    card.add_arguments(serve)
+    serve.add_argument(
+        "--summary", default="summary.txt", help="where to write the board checks"
+    )
+    serve.add_argument(
+        "--release-notes-output",
+        default="release_notes_check.txt",
+        help="where to write the release notes checks",
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument(
+        "--secret",
+        default=os.environ.get("GITHUB_WEBHOOK_SECRET"),
+        help="the webhook secret (default the GITHUB_WEBHOOK_SECRET environment variable)",
+    )
+    metrics.add_arguments(serve)
+    cassette.add_arguments(serve)
+    rate_limit.add_arguments(serve)
+    post = commands.add_parser(
+        "post", help="post recorded webhook deliveries to a service"
+    )
+    post.add_argument("url")
+    post.add_argument("deliveries", nargs="+", help="files of recorded deliveries")
+    post.add_argument("--secret")
+    return parser
+
+
+def main(argv=None):
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.command == "post":
+        return post_deliveries(args.url, args.deliveries, args.secret)
+    card.check_arguments(parser, args)
+    cassette.check_arguments(parser, args)
+
+    cassette.start(args)
+    rate_limit.start(args)
+    repo = get_IBEX_repo(None if args.no_cache else HTTP_CACHE_DIR)
+    metrics.start("checker_service", args, repo)
+    service = CheckerService(repo, args)
+    server = make_server(service, args.host, args.port, args.secret)
+    print(f"INFO: taking webhook deliveries on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+The HTTP transport used for every request PyGithub makes.
+
+PyGithub normally gives each Github object its own requests session. Here all of them
+share one session so that transport adapters mounted on it (for example the response
+cache in http_cache.py) see every REST and GraphQL request.
+"""
+
+import requests
+from github.GithubRetry import GithubRetry
+from github.Requester import (
+    HTTPRequestsConnectionClass,
+    HTTPSRequestsConnectionClass,
+    Requester,
+)
+
+SESSION = requests.Session()
+# having Session.auth set disables falling back to the .netrc file, as PyGithub does
+SESSION.auth = Requester.noopAuth
+
+
+class LayeredAdapter(requests.adapters.BaseAdapter):
+    """
+    A transport adapter that wraps the adapter mounted before it.
+    Subclasses override send and call super().send to pass a request on.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.inner = None
+
+    def send(self, request, **kwargs):
+        return self.inner.send(request, **kwargs)
+
+    def close(self):
+        self.inner.close()
+
+
+def add_layer(adapter):
+    """Mount a LayeredAdapter on top of the adapters already on the shared session."""
+    adapter.inner = SESSION.get_adapter("https://")
+    SESSION.mount("https://", adapter)
+    SESSION.mount("http://", adapter)
+    return adapter
+
+
+def find_layer(adapter_class):
+    """Get the mounted LayeredAdapter of the specified class, or None if not mounted."""
+    adapter = SESSION.get_adapter("https://")
+    while isinstance(adapter, LayeredAdapter):
+        if isinstance(adapter, adapter_class):
+            return adapter
+        adapter = adapter.inner
+    return None
+
+
+def set_base_retry(retry):
+    """Set how the adapter under the layers retries requests, a urllib3 Retry."""
+    adapter = SESSION.get_adapter("https://")
+    while isinstance(adapter, LayeredAdapter):
+        adapter = adapter.inner
+    adapter.max_retries = retry
+
+
+def reset_layers():
+    """Remove every LayeredAdapter from the shared session."""
+    base = requests.adapters.HTTPAdapter(max_retries=GithubRetry())
+    SESSION.mount("https://", base)
+    SESSION.mount("http://", base)
+
+
+reset_layers()
+
+
+class _SharedSessionMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session.close()
+        self.session = SESSION
+
+    def close(self):
+        # the session outlives the connection objects PyGithub creates and closes
+        pass
+
+
+class SharedHTTPConnection(_SharedSessionMixin, HTTPRequestsConnectionClass):
+    pass
+
+
+class SharedHTTPSConnection(_SharedSessionMixin, HTTPSRequestsConnectionClass):
+    pass
+
+
+def install():
+    """Route the requests of every Github object through the shared session."""
+    Requester.injectConnectionClasses(SharedHTTPConnection, SharedHTTPSConnection)
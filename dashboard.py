@@ -0,0 +1,116 @@
+"""
+The burndown dashboard: figures saved as JSON and drawn by one shared copy of plotly.js.
+
+fig.write_html embeds the whole plotly.js bundle, several MB, in every page it writes.
+Here each figure is written as JSON next to a small page that fetches and draws them with
+a copy of plotly.js named by its version. That copy is written once, for the pages of every
+daily folder to share, and as its name changes with the version it can be cached for good.
+Every file is also written gzip compressed with a .gz suffix, for web servers that serve
+those in place of compressing the file on each request.
+"""
+
+import gzip
+import json
+import os
+
+import plotly
+from plotly.offline import get_plotlyjs
+
+PLOTLY_JS = f"plotly-{plotly.__version__}.min.js"
+PAGE = "burndown.html"
+# the self-contained page written before the dashboard, which links may still point at
+OLD_PAGE = "burndown-points.html"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_src}"></script>
+</head>
+<body>
+{divs}
+<script>
+{names}.forEach(function (name) {{
+  fetch(name + ".json")
+    .then(function (response) {{ return response.json(); }})
+    .then(function (figure) {{
+      Plotly.newPlot(name, figure.data, figure.layout, {{responsive: true}});
+    }});
+}});
+</script>
+</body>
+</html>
+"""
+
+REDIRECT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta http-equiv="refresh" content="0; url={page}">
+<link rel="canonical" href="{page}">
+</head>
+<body>
+<a href="{page}">{page}</a>
+</body>
+</html>
+"""
+
+
+def write_compressed(path, data):
+    """
+    Write a file and a gzip compressed copy of it with a .gz suffix.
+    Args:
+        path: The file to write
+        data: The bytes to write
+    """
+    # no timestamp in the header, so unchanged files compress to the same bytes
+    for target, content in ((path, data), (path + ".gz", gzip.compress(data, mtime=0))):
+        with open(target + ".tmp", "wb") as f:
+            f.write(content)
+        os.replace(target + ".tmp", target)
+
+
+def write_plotly_js(directory):
+    """
+    Write the plotly.js bundle to a directory, unless this version is already there.
+    Return:
+        The path of the bundle
+    """
+    path = os.path.join(directory, PLOTLY_JS)
+    if not (os.path.exists(path) and os.path.exists(path + ".gz")):
+        os.makedirs(directory, exist_ok=True)
+        write_compressed(path, get_plotlyjs().encode())
+    return path
+
+
+def write_dashboard(directory, figures, plotly_js, title="Sprint burndown"):
+    """
+    Write figures as JSON and a page drawing them, with OLD_PAGE redirecting to it.
+    Args:
+        directory: The directory to write to
+        figures: A dictionary of name: plotly figure, in the order they are drawn; each is
+            written to name.json
+        plotly_js: The path of the bundle from write_plotly_js, which the page refers to
+            relative to the directory
+        title: The title of the page
+    Return:
+        The path of the page
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name, fig in figures.items():
+        write_compressed(
+            os.path.join(directory, name + ".json"), fig.to_json().encode()
+        )
+    page = PAGE_TEMPLATE.format(
+        title=title,
+        plotly_src=os.path.relpath(plotly_js, directory).replace(os.sep, "/"),
+        divs="\n".join(f'<div id="{name}"></div>' for name in figures),
+        names=json.dumps(list(figures)),
+    )
+    path = os.path.join(directory, PAGE)
+    write_compressed(path, page.encode())
+    write_compressed(
+        os.path.join(directory, OLD_PAGE), REDIRECT_TEMPLATE.format(page=PAGE).encode()
+    )
+    return path
@@ -0,0 +1,104 @@
+"""
+Label and comment history of issues, as used by the staleness checks.
+
+The history of many issues is fetched in one GraphQL query instead of paging through
+the events and comments of each issue separately.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from board import iter_issue_nodes, parse_datetime
+
+BATCH_SIZE = 50
+HISTORY_DEPTH = 100
+
+# last_labeled: dictionary of label name: time that label was last added
+# last_activity: time the most recent comment was made or edited, None if no comments
+IssueHistory = namedtuple("IssueHistory", ["last_labeled", "last_activity"])
+
+HISTORY_FIELDS = f"""
+number
+timelineItems(itemTypes: [LABELED_EVENT], last: {HISTORY_DEPTH}) {{
+  nodes {{ ... on LabeledEvent {{ createdAt label {{ name }} }} }}
+}}
+comments(last: {HISTORY_DEPTH}) {{ nodes {{ updatedAt }} }}
+"""
+
+
+def make_history(labeled_events, comment_times):
+    """
+    Build an IssueHistory.
+    Args:
+        labeled_events: iterable of (label name, time labeled) in chronological order
+        comment_times: iterable of times comments were last updated
+    """
+    last_labeled = {}
+    for label_name, created_at in labeled_events:
+        last_labeled[label_name] = created_at
+    return IssueHistory(last_labeled, max(comment_times, default=None))
+
+
+def history_from_issue(issue):
+    """Get the history of a PyGithub issue, reading its events and comments once."""
+    return make_history(
+        (
+            (event.label.name, event.created_at)
+            for event in issue.get_events()
+            if event.event == "labeled"
+        ),
+        (comment.updated_at for comment in issue.get_comments()),
+    )
+
+
+def history_from_graphql(node):
+    """Build an IssueHistory from the GraphQL fields in HISTORY_FIELDS."""
+    return make_history(
+        (
+            (event["label"]["name"], parse_datetime(event["createdAt"]))
+            for event in node["timelineItems"]["nodes"]
+            if event
+        ),
+        (parse_datetime(comment["updatedAt"]) for comment in node["comments"]["nodes"]),
+    )
+
+
+def load_histories(repo, numbers, batch_size=BATCH_SIZE, workers=1):
+    """
+    Get the history of many issues using one GraphQL query per batch of issues.
+    Only the last HISTORY_DEPTH labeled events and comments of each issue are read.
+    Args:
+        repo: The repository the issues are in
+        numbers: The issue numbers to get the history for
+        batch_size: The number of issues to request in each query
+        workers: The number of queries to make concurrently
+    Return:
+        A dictionary of issue number: IssueHistory
+    """
+    return {
+        node["number"]: history_from_graphql(node)
+        for node in iter_issue_nodes(repo, numbers, HISTORY_FIELDS, batch_size, workers)
+    }
+
+
+def get_histories(repo, issues, backend="graphql", workers=1):
+    """
+    Get the history of the specified board issues.
+    Args:
+        repo: The repository the issues are in
+        issues: The issues to get the history for
+        backend: "graphql" to batch the requests, "rest" to read the events and comments of
+            each issue
+        workers: The number of issues or batches to fetch concurrently
+    Return:
+        A dictionary of issue number: IssueHistory
+    """
+    if backend == "rest":
+        with ThreadPoolExecutor(workers) as executor:
+            return {
+                issue.number: history
+                for issue, history in zip(
+                    issues, executor.map(history_from_issue, issues)
+                )
+            }
+    return load_histories(repo, [issue.number for issue in issues], workers=workers)
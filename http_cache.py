@@ -0,0 +1,188 @@
+"""
+An on-disk cache of GitHub API responses using conditional requests.
+
+Cached GET responses are revalidated with If-None-Match / If-Modified-Since. GitHub
+answers 304 Not Modified when nothing has changed, which does not count against the
+rate limit, and the body is then served from disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from client import LayeredAdapter
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+# headers that describe the current request rather than the cached content
+FRESH_HEADERS = (
+    "date",
+    "x-ratelimit-limit",
+    "x-ratelimit-remaining",
+    "x-ratelimit-reset",
+    "x-ratelimit-used",
+)
+# headers that describe the encoded body on the wire rather than the decoded body stored
+WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class ResponseCache:
+    """
+    Stores response bodies with their validators in a directory.
+    Entries are evicted least recently used first once the directory is larger than
+    max_bytes, and entries older than max_age seconds are removed when the cache is opened.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.sizes = {}
+        now = time.time()
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(".json"):
+                continue
+            key = entry.name[: -len(".json")]
+            if now - entry.stat().st_mtime > max_age:
+                self._remove(key)
+            else:
+                self.sizes[key] = self._size(key)
+        self._evict()
+
+    @staticmethod
+    def key(request):
+        """The cache key for a request: its URL, accepted media type and credentials."""
+        parts = [
+            request.method,
+            request.url,
+            request.headers.get("Accept", ""),
+            request.headers.get("Authorization", ""),
+        ]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key + extension)
+
+    def _size(self, key):
+        return sum(
+            os.path.getsize(self._path(key, extension))
+            for extension in (".json", ".body")
+            if os.path.exists(self._path(key, extension))
+        )
+
+    def _remove(self, key):
+        for extension in (".json", ".body"):
+            try:
+                os.remove(self._path(key, extension))
+            except FileNotFoundError:
+                pass
+        self.sizes.pop(key, None)
+
+    def _evict(self):
+        total = sum(self.sizes.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(
+            self.sizes, key=lambda k: os.path.getmtime(self._path(k, ".json"))
+        ):
+            total -= self.sizes[key]
+            self._remove(key)
+            if total <= self.max_bytes:
+                break
+
+    def get(self, key):
+        """Get (metadata, body) for a key, or None if it is not cached."""
+        with self.lock:
+            try:
+                with open(self._path(key, ".json")) as f:
+                    meta = json.load(f)
+                with open(self._path(key, ".body"), "rb") as f:
+                    body = f.read()
+            except (FileNotFoundError, ValueError):
+                return None
+            # mark as recently used
+            os.utime(self._path(key, ".json"))
+        return meta, body
+
+    def put(self, key, response):
+        """Store a response that has a validator."""
+        meta = {
+            "url": response.url,
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in WIRE_HEADERS
+            },
+        }
+        with self.lock:
+            for extension, content in (
+                (".body", response.content),
+                (".json", json.dumps(meta).encode()),
+            ):
+                temp_path = self._path(key, extension + ".tmp")
+                with open(temp_path, "wb") as f:
+                    f.write(content)
+                os.replace(temp_path, self._path(key, extension))
+            self.sizes[key] = self._size(key)
+            self._evict()
+
+
+class CachingAdapter(LayeredAdapter):
+    """Makes GET requests conditional on a cached response and serves 304s from the cache."""
+
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        key = self.cache.key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            headers = CaseInsensitiveDict(cached[0]["headers"])
+            if "ETag" in headers:
+                request.headers["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self.hits += 1
+            return self.cached_response(request, response, *cached)
+        self.misses += 1
+        if response.status_code == 200 and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        ):
+            self.cache.put(key, response)
+        return response
+
+    @staticmethod
+    def cached_response(request, not_modified, meta, body):
+        """Build the response to return from a cache entry and the 304 that validated it."""
+        response = requests.Response()
+        response.status_code = meta["status"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        for name in FRESH_HEADERS:
+            if name in not_modified.headers:
+                response.headers[name] = not_modified.headers[name]
+        response._content = body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = not_modified.connection
+        return response
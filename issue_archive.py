@@ -0,0 +1,263 @@
+"""
+A compact archive of the daily issue-column and issue-size files.
+
+card_day.sh keeps an issue-column.json and issue-size.json for every day in the daily
+web folders. The archive holds the same data as fixed-width binary records that are
+memory mapped, so a question such as when a ticket entered Review reads only the
+records it needs rather than opening every daily file.
+
+Each day is a run of (issue, column code, size) records sorted by issue. A day with
+the same board state as the day before points at the same run instead of storing it
+again. New days are appended as they arrive.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+
+import numpy as np
+
+RECORD = np.dtype([("issue", "<i4"), ("column", "u1"), ("size", "<i2")])
+DAY = np.dtype([("day", "<i4"), ("offset", "<i8"), ("count", "<i8")])
+
+RECORDS_FILE = "records.bin"
+DAYS_FILE = "days.bin"
+COLUMNS_FILE = "columns.json"
+# the size recorded for an issue without one
+NO_SIZE = -1
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def _to_ordinal(day):
+    return (day - EPOCH).days
+
+
+def _from_ordinal(ordinal):
+    return EPOCH + datetime.timedelta(days=int(ordinal))
+
+
+class IssueArchive:
+    """The column and size of every issue on the board, day by day."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self._path(COLUMNS_FILE)) as f:
+                self.columns = json.load(f)
+        except FileNotFoundError:
+            self.columns = []
+        self._map()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _map_file(self, name, dtype):
+        path = self._path(name)
+        # a partly written record at the end is left out until it is overwritten
+        count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if count == 0:
+            return np.zeros(0, dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+    def _map(self):
+        self.days = self._map_file(DAYS_FILE, DAY)
+        self.records = self._map_file(RECORDS_FILE, RECORD)
+
+    def _append(self, name, array, count):
+        with open(
+            self._path(name), "r+b" if os.path.exists(self._path(name)) else "wb"
+        ) as f:
+            f.seek(count * array.dtype.itemsize)
+            f.truncate()
+            f.write(array.tobytes())
+
+    @property
+    def last_day(self):
+        """The last day in the archive, None if it is empty."""
+        return _from_ordinal(self.days["day"][-1]) if len(self.days) else None
+
+    def dates(self):
+        return [_from_ordinal(day) for day in self.days["day"]]
+
+    def _column_code(self, name):
+        if name not in self.columns:
+            self.columns.append(name)
+        return self.columns.index(name)
+
+    def _segment(self, index):
+        day = self.days[index]
+        return self.records[day["offset"] : day["offset"] + day["count"]]
+
+    def add_day(self, day, issue_column, issue_size):
+        """
+        Add a day to the end of the archive.
+        Args:
+            day: The date, after the last day in the archive
+            issue_column: A dictionary of issue number: column name, as in issue-column.json
+            issue_size: A dictionary of issue number: size, as in issue-size.json
+        Return:
+            False if the day is already in the archive, otherwise True
+        """
+        if self.last_day is not None and day <= self.last_day:
+            return False
+        sizes = {int(number): size for number, size in issue_size.items()}
+        records = np.array(
+            sorted(
+                (
+                    int(number),
+                    self._column_code(column),
+                    sizes.get(int(number), NO_SIZE),
+                )
+                for number, column in issue_column.items()
+            ),
+            dtype=RECORD,
+        )
+
+        if len(self.days) and np.array_equal(records, self._segment(-1)):
+            # unchanged since the day before, so share its records
+            offset, count = self.days[-1]["offset"], self.days[-1]["count"]
+        else:
+            offset, count = len(self.records), len(records)
+            self._append(RECORDS_FILE, records, len(self.records))
+            temp_path = self._path(COLUMNS_FILE + ".tmp")
+            with open(temp_path, "w") as f:
+                json.dump(self.columns, f)
+            os.replace(temp_path, self._path(COLUMNS_FILE))
+
+        # the day is only in the archive once its entry is written
+        self._append(
+            DAYS_FILE,
+            np.array([(_to_ordinal(day), offset, count)], dtype=DAY),
+            len(self.days),
+        )
+        self._map()
+        return True
+
+    def _record(self, segment, number):
+        index = np.searchsorted(segment["issue"], number)
+        if index < len(segment) and segment["issue"][index] == number:
+            return segment[index]
+        return None
+
+    def _describe(self, record):
+        size = int(record["size"])
+        return self.columns[record["column"]], None if size == NO_SIZE else size
+
+    def board_on(self, day):
+        """
+        The board on a day.
+        Return:
+            A dictionary of issue number: (column name, size), None if the day is not archived
+        """
+        index = np.searchsorted(self.days["day"], _to_ordinal(day))
+        if index == len(self.days) or self.days["day"][index] != _to_ordinal(day):
+            return None
+        return {
+            int(record["issue"]): self._describe(record)
+            for record in self._segment(index)
+        }
+
+    def issue_history(self, number):
+        """
+        The column and size of an issue on each day it was on the board.
+        Return:
+            A list of (date, column name, size) in date order
+        """
+        history = []
+        found = {}
+        for index, day in enumerate(self.days):
+            # days sharing records share the answer
+            key = int(day["offset"]), int(day["count"])
+            if key not in found:
+                found[key] = self._record(self._segment(index), number)
+            record = found[key]
+            if record is not None:
+                history.append((_from_ordinal(day["day"]), *self._describe(record)))
+        return history
+
+    def column_changes(self, number):
+        """
+        The days an issue moved column.
+        Return:
+            A list of (date, column name) for the first day in each column
+        """
+        changes = []
+        for day, column, _ in self.issue_history(number):
+            if not changes or changes[-1][1] != column:
+                changes.append((day, column))
+        return changes
+
+
+def ingest_daily_folders(archive, root):
+    """
+    Add the days in a daily web folder (root/YYYY/MM/DD) that are newer than the archive.
+    Return:
+        The number of days added
+    """
+    added = 0
+    for path in sorted(glob.glob(os.path.join(root, "[0-9]*", "[0-9]*", "[0-9]*"))):
+        try:
+            year, month, day = (
+                int(part) for part in os.path.relpath(path, root).split(os.sep)
+            )
+            date = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        column_file = os.path.join(path, "issue-column.json")
+        if (
+            archive.last_day is not None and date <= archive.last_day
+        ) or not os.path.exists(column_file):
+            continue
+        with open(column_file) as f:
+            issue_column = json.load(f)
+        try:
+            with open(os.path.join(path, "issue-size.json")) as f:
+                issue_size = json.load(f)
+        except FileNotFoundError:
+            issue_size = {}
+        added += archive.add_day(date, issue_column, issue_size)
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="archive of daily issue columns and sizes"
+    )
+    parser.add_argument(
+        "--archive", default="issue_archive", help="the archive directory"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser(
+        "ingest", help="add new days from the daily web folders"
+    )
+    ingest.add_argument("root", help="the folder holding YYYY/MM/DD folders")
+    history = commands.add_parser(
+        "history", help="print the days an issue moved column"
+    )
+    history.add_argument("issue", type=int)
+    board = commands.add_parser("board", help="print the board on a day")
+    board.add_argument("day", type=datetime.date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    archive = IssueArchive(args.archive)
+    if args.command == "ingest":
+        print(f"INFO: added {ingest_daily_folders(archive, args.root)} days")
+    elif args.command == "history":
+        for day, column in archive.column_changes(args.issue):
+            print(f"{day.isoformat()} {column}")
+    else:
+        issues = archive.board_on(args.day)
+        if issues is None:
+            print(f"INFO: {args.day.isoformat()} is not in the archive")
+            return 1
+        for number, (column, size) in sorted(issues.items()):
+            print(f"{number} {column} {size}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,78 +2,411 @@
 generate graph
 """
 
+import argparse
 import datetime
 import json
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
-## spreadsheet of sprint daily values
-df = pd.read_csv("burndown-points.csv")
-
-## target sprint storypoints saved by card.py
-try:
-    with open("milestone.json") as f:
-        ms_dict = json.load(f)
-    target_sp = ms_dict["SP"]
-    due_on = datetime.datetime.fromisoformat(ms_dict["DUE"]).date()
-    start_on = datetime.datetime.fromisoformat(ms_dict["START"]).date()
-except:
-    target_sp = 0
-    due_on = datetime.datetime.now().date()
-    start_on = datetime.datetime.fromisoformat("1970-01-01").date()
-
-## sprint length and number of days so far
-## will cange to calculate using spriunt end date on milestone
-ntot = 28
-start_index = 0
-while datetime.date.fromisoformat(df["Date"][start_index]) < start_on:
-    start_index = start_index + 1
-first_day = datetime.date.fromisoformat(df["Date"][start_index])
-ntot = (due_on - first_day).days + 1
-
-## completed burndown
-ncurr = len(df["Date"][start_index:])
-burndown = df["Complete"].values[start_index:]
-burndown = np.full((ncurr), target_sp) - burndown
-last_val = burndown[ncurr - 1]
-burndown = np.append(burndown, np.full((ntot - ncurr), last_val))
-
-## review + completed burndown
-rev = df["Review"].values[start_index:]
-last_val = rev[ncurr - 1]
-rev = np.append(rev, np.full((ntot - ncurr), last_val))
-burndown_rev = burndown - rev
-
-## date axis
-last_day = datetime.date.fromisoformat(df["Date"][start_index + ncurr - 1])
-dates = df["Date"][start_index:]
-for i in range(1, ntot - ncurr + 1):
-    dates = np.append(dates, [(last_day + datetime.timedelta(days=i)).isoformat()])
-
-## ideal burndown axis
-if target_sp > 0:
-    initial = target_sp
-else:
-    initial = df["Points Sum"][start_index]
-rate = initial / (ntot - 1.0)
-ideal = []
-for i in range(ntot):
-    ideal.append(initial - i * rate)
-
-## create graph
-fig = go.Figure(
-    go.Scatter(x=dates, y=burndown, name="Completed", line_color="red", mode="lines+markers"),
-    layout_yaxis_title="Points",
-)
-# layout_title_text='Sprint Burndown'
-fig.add_scatter(x=dates, y=ideal, name="Completed (Ideal)", line_color="green", mode="lines")
-fig.add_scatter(
-    x=dates,
-    y=burndown_rev,
-    name="Review + Completed",
-    line=dict(color="blue", width=1, dash="dash"),
+import dashboard
+import metrics
+from burndown_store import BurndownStore
+
+# the lines of a sprint burndown graph, one value per day of the sprint
+Burndown = namedtuple("Burndown", ["dates", "completed", "review_completed", "ideal"])
+# the bands of simulated points left from the last recorded day to the due date, and the
+# chance of completing the sprint on each day it was completed on in a simulation
+Forecast = namedtuple(
+    "Forecast",
+    [
+        "dates",
+        "low",
+        "median",
+        "high",
+        "completion_dates",
+        "completion_chances",
+        "chance_by_due",
+        "p50",
+        "p90",
+        "trials",
+    ],
 )
-fig.update_layout(showlegend=True)
-fig.write_html("burndown-points.html")
+# the percentiles of the points left drawn as the forecast band and its middle
+FORECAST_PERCENTILES = [10, 50, 90]
+TRIALS = 20000
+
+
+def read_milestone(path="milestone.json"):
+    """
+    Read the target sprint storypoints, due date and start date saved by card.py.
+    """
+    try:
+        with open(path) as f:
+            ms_dict = json.load(f)
+        target_sp = ms_dict["SP"]
+        due_on = datetime.datetime.fromisoformat(ms_dict["DUE"]).date()
+        start_on = datetime.datetime.fromisoformat(ms_dict["START"]).date()
+    except:
+        target_sp = 0
+        due_on = datetime.datetime.now().date()
+        start_on = datetime.datetime.fromisoformat("1970-01-01").date()
+    return target_sp, due_on, start_on
+
+
+def initial_points(df, target_sp, total="Points Sum"):
+    """The points a sprint burns down from: its target, or the first day's total without one."""
+    return target_sp if target_sp > 0 else df[total].iloc[0]
+
+
+def compute_burndown(df, target_sp, due_on, total="Points Sum"):
+    """
+    Compute the burndown of a sprint, extending the last recorded day to the due date.
+    Args:
+        df: The daily points from the first day of the sprint, with Date, Complete,
+            Review and total columns
+        target_sp: The target story points of the sprint, 0 if not set
+        due_on: The date the sprint is due
+        total: The column of the total to burn down from without a target
+    Return:
+        The Burndown
+    """
+    dates = df["Date"].to_numpy()
+    ncurr = len(dates)
+    first_day = np.datetime64(dates[0], "D")
+    ntot = max(int((np.datetime64(due_on, "D") - first_day).astype(int)) + 1, ncurr)
+    pad = ntot - ncurr
+
+    ## completed burndown, and review + completed burndown
+    initial = initial_points(df, target_sp, total)
+    completed = np.full(ncurr, initial) - df["Complete"].to_numpy()
+    completed = np.concatenate([completed, np.full(pad, completed[-1])])
+    review = df["Review"].to_numpy()
+    review = np.concatenate([review, np.full(pad, review[-1])])
+
+    ## date axis
+    last_day = np.datetime64(dates[-1], "D")
+    extra_days = np.datetime_as_string(last_day + np.arange(1, pad + 1), unit="D")
+    dates = np.concatenate([dates.astype(str), extra_days])
+
+    ## ideal burndown axis
+    ideal = initial - np.arange(ntot) * (initial / (ntot - 1.0))
+
+    return Burndown(dates, completed, completed - review, ideal)
+
+
+def make_figure(burndown, units="Points", forecast=None):
+    fig = go.Figure(
+        go.Scatter(
+            x=burndown.dates,
+            y=burndown.completed,
+            name="Completed",
+            line_color="red",
+            mode="lines+markers",
+        ),
+        layout_yaxis_title=units,
+    )
+    # layout_title_text='Sprint Burndown'
+    fig.add_scatter(
+        x=burndown.dates,
+        y=burndown.ideal,
+        name="Completed (Ideal)",
+        line_color="green",
+        mode="lines",
+    )
+    fig.add_scatter(
+        x=burndown.dates,
+        y=burndown.review_completed,
+        name="Review + Completed",
+        line=dict(color="blue", width=1, dash="dash"),
+    )
+    if forecast is not None:
+        add_forecast(fig, forecast)
+    fig.update_layout(showlegend=True)
+    return fig
+
+
+def add_forecast(fig, forecast):
+    """Draw the bands of a forecast and the chance of completing on each day on a figure."""
+    fig.add_scatter(
+        x=forecast.dates,
+        y=forecast.high,
+        line=dict(color="red", width=0),
+        mode="lines",
+        hoverinfo="skip",
+        showlegend=False,
+    )
+    fig.add_scatter(
+        x=forecast.dates,
+        y=forecast.low,
+        name=f"Forecast ({FORECAST_PERCENTILES[0]}-{FORECAST_PERCENTILES[-1]}%)",
+        line=dict(color="red", width=0),
+        mode="lines",
+        fill="tonexty",
+        fillcolor="rgba(255, 0, 0, 0.15)",
+    )
+    fig.add_scatter(
+        x=forecast.dates,
+        y=forecast.median,
+        name="Forecast (median)",
+        line=dict(color="red", width=1, dash="dot"),
+        mode="lines",
+    )
+    fig.add_bar(
+        x=forecast.completion_dates,
+        y=forecast.completion_chances * 100,
+        name="Chance of completing on day",
+        marker_color="grey",
+        opacity=0.4,
+        yaxis="y2",
+    )
+    fig.update_layout(
+        yaxis2=dict(
+            title="Chance of completing (%)",
+            overlaying="y",
+            side="right",
+            rangemode="tozero",
+            showgrid=False,
+        ),
+        legend=dict(x=1.08),
+    )
+
+
+def write_figure(burndown, path, forecast=None):
+    make_figure(burndown, forecast=forecast).write_html(path)
+    return path
+
+
+def completed_deltas(store):
+    """
+    The points completed on each recorded day of the sprints in the history, the change
+    in the points in the Complete column from the day before.
+    """
+    deltas = []
+    for sprint in store.sprints():
+        try:
+            start_on = datetime.date.fromisoformat(sprint.start)
+            due_on = datetime.datetime.fromisoformat(sprint.due).date()
+        except (TypeError, ValueError):
+            continue
+        df = read_sprint(store, start_on, due_on)
+        if "Complete" in df:
+            deltas.append(np.diff(df["Complete"].to_numpy()))
+    return np.concatenate(deltas) if deltas else np.array([], dtype=int)
+
+
+def forecast_sprint(df, target_sp, due_on, deltas, trials=TRIALS, seed=0):
+    """
+    Forecast when a sprint will be completed by simulating the days left many times over,
+    each day completing points drawn from those completed on a past day. The trials are
+    simulated all at once, as one array of trials by days, up to a sprint length past the
+    due date.
+    Args:
+        df: The daily points from the first day of the sprint, as for compute_burndown
+        target_sp: The target story points of the sprint, 0 if not set
+        due_on: The date the sprint is due
+        deltas: The points completed on past days, from completed_deltas; the days of the
+            sprint so far are drawn from if there are none, as in a history without sprints
+        trials: The number of sprints to simulate
+        seed: The seed of the draws, so that a day's forecast is the same when run again
+    Return:
+        The Forecast, None without a past day to draw from
+    """
+    if len(deltas) == 0:
+        deltas = np.diff(df["Complete"].to_numpy())
+    if len(deltas) == 0 or trials <= 0:
+        return None
+    remaining = initial_points(df, target_sp) - df["Complete"].iloc[-1]
+    last_day = np.datetime64(df["Date"].iloc[-1], "D")
+    days_left = max(int((np.datetime64(due_on, "D") - last_day).astype(int)), 0)
+    horizon = days_left + len(df) + days_left
+
+    rng = np.random.default_rng(seed)
+    done = np.cumsum(rng.choice(deltas, size=(trials, horizon)), axis=1)
+    left = np.concatenate([np.full((trials, 1), remaining), remaining - done], axis=1)
+    # the days after the last recorded day each trial completed on, horizon + 1 if it didn't
+    completed = left <= 0
+    finish = np.where(completed.any(axis=1), completed.argmax(axis=1), horizon + 1)
+
+    low, median, high = np.percentile(
+        np.clip(left[:, : days_left + 1], 0, None), FORECAST_PERCENTILES, axis=0
+    )
+    chances = np.bincount(finish, minlength=horizon + 2)[: horizon + 1] / trials
+    (days,) = np.nonzero(chances)
+
+    def finish_date(q):
+        day = int(np.quantile(finish, q, method="higher"))
+        return None if day > horizon else str(last_day + day)
+
+    return Forecast(
+        np.datetime_as_string(last_day + np.arange(days_left + 1), unit="D"),
+        low,
+        median,
+        high,
+        np.datetime_as_string(last_day + days, unit="D"),
+        chances[days],
+        float(np.mean(finish <= days_left)),
+        finish_date(0.5),
+        finish_date(0.9),
+        trials,
+    )
+
+
+def write_forecast(forecast, path="milestone.json"):
+    """Add the numbers of a forecast to the milestone saved by card.py."""
+    try:
+        with open(path) as f:
+            ms_dict = json.load(f)
+    except (OSError, ValueError):
+        ms_dict = {}
+    ms_dict["FORECAST"] = {
+        "TRIALS": forecast.trials,
+        "CHANCE_BY_DUE": round(forecast.chance_by_due, 3),
+        "P50": forecast.p50,
+        "P90": forecast.p90,
+    }
+    with open(path + ".tmp", "w") as f:
+        json.dump(ms_dict, f)
+    os.replace(path + ".tmp", path)
+
+
+def read_sprint(store, start_on, due_on=None, tickets=False):
+    """Read the daily points, or tickets, of a sprint from the history into a DataFrame."""
+    read = store.read_tickets if tickets else store.read_points
+    header, rows = read(start_on.isoformat(), due_on and due_on.isoformat())
+    return pd.DataFrame(rows, columns=header)
+
+
+def tickets_burndown(df, due_on):
+    """The burndown of the tickets of a sprint, from the tickets on its first day."""
+    return compute_burndown(df, df["Tickets Sum"].iloc[0], due_on, "Tickets Sum")
+
+
+def write_dashboard(directories, plotly_dir, figures):
+    """
+    Write the burndown dashboard to each directory, with the pages referring to one copy
+    of plotly.js in plotly_dir.
+    """
+    plotly_js = dashboard.write_plotly_js(plotly_dir)
+    return [
+        dashboard.write_dashboard(directory, figures, plotly_js)
+        for directory in directories
+    ]
+
+
+def sprint_burndowns(store):
+    """
+    Compute the burndown of every sprint in the history.
+    Return:
+        A list of (sprint title, Burndown) for the sprints with recorded days
+    """
+    burndowns = []
+    for sprint in store.sprints():
+        try:
+            start_on = datetime.date.fromisoformat(sprint.start)
+            due_on = datetime.datetime.fromisoformat(sprint.due).date()
+        except (TypeError, ValueError):
+            print(f"INFO: skipping sprint {sprint.title} without a start and due date")
+            continue
+        df = read_sprint(store, start_on, due_on)
+        if len(df) > 0:
+            burndowns.append(
+                (sprint.title, compute_burndown(df, sprint.target_points, due_on))
+            )
+    return burndowns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="burndown graph")
+    parser.add_argument(
+        "--history",
+        default="burndown.sqlite",
+        help="SQLite history of the daily burndown figures",
+    )
+    parser.add_argument(
+        "--all-sprints",
+        metavar="DIRECTORY",
+        help="write the burndown of every sprint in the history to this directory",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of processes rendering sprints",
+    )
+    parser.add_argument(
+        "--dashboard",
+        metavar="DIRECTORY",
+        nargs="+",
+        help="write the points and tickets burndowns as figure JSON and a page drawing them "
+        "to these directories, with burndown-points.html redirecting to it",
+    )
+    parser.add_argument(
+        "--plotly-dir",
+        help="where to write the plotly.js the dashboard pages share (default the first "
+        "--dashboard directory)",
+    )
+    parser.add_argument(
+        "--trials",
+        type=int,
+        default=TRIALS,
+        help="sprints to simulate to forecast the current sprint's completion, 0 for none",
+    )
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    metrics.start("make_fig", args)
+
+    if args.all_sprints:
+        with metrics.phase("load data"), BurndownStore(args.history) as store:
+            burndowns = sprint_burndowns(store)
+        os.makedirs(args.all_sprints, exist_ok=True)
+        # sprints are independent, so render them in parallel
+        with (
+            metrics.phase("figure render"),
+            ProcessPoolExecutor(args.workers) as executor,
+        ):
+            paths = [
+                os.path.join(args.all_sprints, f"burndown-points-{title}.html")
+                for title, _ in burndowns
+            ]
+            list(executor.map(write_figure, [b for _, b in burndowns], paths))
+        return 0
+
+    target_sp, due_on, start_on = read_milestone()
+
+    ## sprint daily values, read from the first day of the sprint on
+    with metrics.phase("load data"), BurndownStore(args.history) as store:
+        df = read_sprint(store, start_on)
+        tickets_df = (
+            read_sprint(store, start_on, tickets=True) if args.dashboard else None
+        )
+        deltas = completed_deltas(store)
+
+    burndown = compute_burndown(df, target_sp, due_on)
+    with metrics.phase("forecast"):
+        forecast = forecast_sprint(df, target_sp, due_on, deltas, args.trials)
+        if forecast is not None:
+            write_forecast(forecast)
+    with metrics.phase("figure render"):
+        if args.dashboard:
+            figures = {
+                "burndown-points": make_figure(burndown, forecast=forecast),
+                "burndown-tickets": make_figure(
+                    tickets_burndown(tickets_df, due_on), "Tickets"
+                ),
+            }
+            write_dashboard(
+                args.dashboard, args.plotly_dir or args.dashboard[0], figures
+            )
+        else:
+            write_figure(burndown, "burndown-points.html", forecast)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
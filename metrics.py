@@ -0,0 +1,260 @@
+"""
+Timing and GitHub API cost of each phase of a run.
+
+Phases are timed with the phase context manager or the timed decorator. Requests are
+counted by a transport layer under PyGithub, including the requests PyGithub makes
+behind the scenes to complete lazily loaded objects when an attribute is read.
+At exit a JSON run report and a Prometheus textfile can be written, and the run can be
+profiled with cProfile.
+"""
+
+import atexit
+import contextlib
+import cProfile
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+
+import requests
+from github import GithubException
+from github.GithubObject import CompletableGithubObject
+
+import client
+
+PROMETHEUS_PREFIX = "project_board"
+
+
+class CountingAdapter(client.LayeredAdapter):
+    """Counts requests and remembers the latest rate limit headers."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.graphql_requests = 0
+        self.rate_limit_remaining = {}
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        with self.lock:
+            self.requests += 1
+            if request.url.endswith("/graphql"):
+                self.graphql_requests += 1
+            resource = response.headers.get("X-RateLimit-Resource", "core")
+            if "X-RateLimit-Remaining" in response.headers:
+                self.rate_limit_remaining[resource] = int(
+                    response.headers["X-RateLimit-Remaining"]
+                )
+        return response
+
+
+class RunMetrics:
+    """The phases of one run and the requests made in each."""
+
+    def __init__(self, script):
+        self.script = script
+        self.started = datetime.datetime.now(datetime.UTC)
+        self.start_time = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.lazy_completions = {}
+        self.rate_limit = {}
+        self.counter = client.find_layer(CountingAdapter) or client.add_layer(
+            CountingAdapter()
+        )
+
+    def add_phase(self, name, seconds, requests):
+        with self.lock:
+            phase = self.phases.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "requests": 0}
+            )
+            phase["calls"] += 1
+            phase["seconds"] += seconds
+            phase["requests"] += requests
+
+    def add_lazy_completion(self, class_name):
+        with self.lock:
+            self.lazy_completions[class_name] = (
+                self.lazy_completions.get(class_name, 0) + 1
+            )
+
+    def record_rate_limit(self, repo, when):
+        """Record the remaining rate limit; reading /rate_limit does not count against it."""
+        try:
+            _, data = repo.requester.requestJsonAndCheck("GET", "/rate_limit")
+        except (GithubException, requests.RequestException) as e:
+            print(f"INFO: cannot read rate limit {when} run: {e}")
+            return
+        self.rate_limit[when] = {
+            resource: values["remaining"]
+            for resource, values in data["resources"].items()
+        }
+
+    def report(self):
+        return {
+            "script": self.script,
+            "started": self.started.isoformat(),
+            "seconds": time.perf_counter() - self.start_time,
+            "requests": self.counter.requests,
+            "graphql_requests": self.counter.graphql_requests,
+            "lazy_completions": dict(self.lazy_completions),
+            "rate_limit": dict(self.rate_limit),
+            "phases": dict(self.phases),
+        }
+
+    def prometheus(self):
+        """The report in the Prometheus textfile exposition format."""
+        report = self.report()
+        script = self.script
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(
+                    '{}="{}"'.format(
+                        key, str(label).replace("\\", "\\\\").replace('"', '\\"')
+                    )
+                    for key, label in [("script", script)] + labels
+                )
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {value}")
+
+        metric("run_seconds", "Wall time of the run", [([], report["seconds"])])
+        metric(
+            "run_requests",
+            "GitHub requests made by the run",
+            [([], report["requests"])],
+        )
+        metric(
+            "run_graphql_requests",
+            "GitHub GraphQL requests made by the run",
+            [([], report["graphql_requests"])],
+        )
+        metric(
+            "lazy_completions",
+            "Requests made by PyGithub to complete lazily loaded objects",
+            [
+                ([("class", name)], count)
+                for name, count in report["lazy_completions"].items()
+            ],
+        )
+        metric(
+            "rate_limit_remaining",
+            "Remaining GitHub rate limit",
+            [
+                ([("when", when), ("resource", resource)], remaining)
+                for when, resources in report["rate_limit"].items()
+                for resource, remaining in resources.items()
+            ],
+        )
+        metric(
+            "phase_seconds",
+            "Wall time spent in each phase",
+            [
+                ([("phase", name)], phase["seconds"])
+                for name, phase in report["phases"].items()
+            ],
+        )
+        metric(
+            "phase_requests",
+            "GitHub requests made in each phase",
+            [
+                ([("phase", name)], phase["requests"])
+                for name, phase in report["phases"].items()
+            ],
+        )
+        return "\n".join(lines) + "\n"
+
+
+RUN = None
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Time a phase of the run and count the requests made during it."""
+    if RUN is None:
+        yield
+        return
+    requests = RUN.counter.requests
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        RUN.add_phase(
+            name, time.perf_counter() - start, RUN.counter.requests - requests
+        )
+
+
+def timed(name):
+    """Decorator that records every call of a function as the named phase."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+_original_complete = CompletableGithubObject._complete
+
+
+def _counting_complete(self, *args, **kwargs):
+    if RUN is not None:
+        RUN.add_lazy_completion(type(self).__name__)
+    return _original_complete(self, *args, **kwargs)
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--report", help="write a JSON report of phase timings and API cost"
+    )
+    parser.add_argument(
+        "--prometheus", help="write the report as a Prometheus textfile"
+    )
+    parser.add_argument("--profile", help="write cProfile statistics to this file")
+
+
+def start(script, args, repo=None):
+    """
+    Start recording a run; the report and profile are written when the process exits.
+    Args:
+        script: The name of the script being run
+        args: Parsed arguments including those from add_arguments
+        repo: A repository to read the rate limit through, if any
+    """
+    global RUN
+    RUN = RunMetrics(script)
+    CompletableGithubObject._complete = _counting_complete
+    if repo is not None:
+        RUN.record_rate_limit(repo, "before")
+
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    @atexit.register
+    def finish():
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if repo is not None:
+            RUN.record_rate_limit(repo, "after")
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(RUN.report(), f, indent=2)
+        if args.prometheus:
+            # write then rename so the node exporter never reads a partial file
+            with open(args.prometheus + ".tmp", "w") as f:
+                f.write(RUN.prometheus())
+            os.replace(args.prometheus + ".tmp", args.prometheus)
+
+    return RUN
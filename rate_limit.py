@@ -0,0 +1,263 @@
+"""
+Scheduling of GitHub API requests within the rate limits.
+
+GitHub allows each token a number of requests an hour for each resource (core for the REST
+API, graphql for the GraphQL API), and every response says how many are left in
+X-RateLimit-Remaining and when the limit resets in X-RateLimit-Reset. Making too many
+requests too quickly also trips secondary limits, which are answered with 403 or 429 and
+usually a Retry-After. RateLimitScheduler is a transport layer that keeps track of both: it
+holds every request while a Retry-After is in force and retries the refused request, waits
+for the reset when the limit has run out if the reset is near, and otherwise stops the run
+with RateLimitExhausted. Requests waiting for a free slot are sent in priority order.
+
+Before the bulk of a run, check_budget compares an estimate of the requests it will make
+with what is left, so that a run that cannot finish fails at the start with a clear report
+instead of part way through.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import heapq
+import itertools
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import requests
+from urllib3.util import Retry
+
+import cassette
+import client
+
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# how long GitHub asks for a secondary limit to be left alone if it does not say
+SECONDARY_LIMIT_WAIT = 60
+
+Budget = namedtuple("Budget", ["limit", "remaining", "reset"])
+
+_PRIORITY = contextvars.ContextVar("rate_limit_priority", default=NORMAL)
+
+
+@contextlib.contextmanager
+def priority(level):
+    """Send the requests made in the block in this thread with a priority: HIGH, NORMAL or LOW."""
+    token = _PRIORITY.set(level)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class RateLimitExhausted(requests.exceptions.RequestException):
+    """The rate limit left cannot cover the requests a run has to make."""
+
+
+def resource_of(request):
+    """The rate limit resource a request counts against."""
+    return "graphql" if urlsplit(request.url).path.endswith("/graphql") else "core"
+
+
+def _time_of(reset):
+    return datetime.datetime.fromtimestamp(reset, datetime.UTC).strftime("%H:%M:%S UTC")
+
+
+class RateLimitScheduler(client.LayeredAdapter):
+    """Paces requests within the primary and secondary rate limits."""
+
+    def __init__(self, reserve=0, max_wait=300, max_concurrency=8, max_retries=3):
+        """
+        Args:
+            reserve: The requests of each resource to leave for other users of the token
+            max_wait: The longest, in seconds, to wait for a limit to reset before failing
+            max_concurrency: The number of requests to have in flight at once
+            max_retries: The number of times to retry a request refused by a secondary limit
+        """
+        super().__init__()
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.condition = threading.Condition()
+        self.budgets = {}
+        self.paused_until = 0.0
+        self.active = 0
+        self.queue = []
+        self.tickets = itertools.count()
+        self.clock = time.time
+        self.sleep = time.sleep
+
+    def send(self, request, **kwargs):
+        if urlsplit(request.url).path.endswith("/rate_limit"):
+            # reading the rate limit does not count against it
+            return super().send(request, **kwargs)
+        resource = resource_of(request)
+        self._acquire()
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._wait_for(resource)
+                response = super().send(request, **kwargs)
+                self.update(response)
+                wait = self._retry_wait(response, resource)
+                if wait is None or attempt == self.max_retries:
+                    return response
+                with self.condition:
+                    self.paused_until = max(self.paused_until, self.clock() + wait)
+        finally:
+            self._release()
+
+    def _acquire(self):
+        """Wait for a slot, going ahead of requests with a lower priority."""
+        entry = (_PRIORITY.get(), next(self.tickets))
+        with self.condition:
+            heapq.heappush(self.queue, entry)
+            self.condition.wait_for(
+                lambda: self.active < self.max_concurrency and self.queue[0] == entry
+            )
+            heapq.heappop(self.queue)
+            self.active += 1
+            self.condition.notify_all()
+
+    def _release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def update(self, response):
+        """Note the rate limit a response reports."""
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers or "X-RateLimit-Reset" not in headers:
+            return
+        resource = headers.get("X-RateLimit-Resource", "core")
+        with self.condition:
+            self.budgets[resource] = Budget(
+                int(headers.get("X-RateLimit-Limit", 0)),
+                int(headers["X-RateLimit-Remaining"]),
+                int(headers["X-RateLimit-Reset"]),
+            )
+
+    def _exhausted(self, resource, budget, needed):
+        return RateLimitExhausted(
+            f"{needed} {resource} requests are needed but {budget.remaining} are left (less a "
+            f"reserve of {self.reserve}) until the rate limit resets at {_time_of(budget.reset)}, "
+            f"more than {self.max_wait} seconds away"
+        )
+
+    def _wait_for(self, resource):
+        """Wait while a secondary limit is in force or the primary limit has run out."""
+        with self.condition:
+            now = self.clock()
+            wait = self.paused_until - now
+            budget = self.budgets.get(resource)
+            if budget is not None:
+                if budget.remaining <= self.reserve and budget.reset > now:
+                    if budget.reset - now > self.max_wait:
+                        raise self._exhausted(resource, budget, 1)
+                    wait = max(wait, budget.reset - now)
+                # counted now, as requests in flight are not in the last response's headers
+                self.budgets[resource] = budget._replace(remaining=budget.remaining - 1)
+        if wait > 0:
+            self.sleep(wait)
+
+    def _retry_wait(self, response, resource):
+        """How long to wait to retry a request refused by a rate limit, None if it wasn't."""
+        if response.status_code not in (403, 429):
+            return None
+        if "Retry-After" in response.headers:
+            return float(response.headers["Retry-After"])
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            budget = self.budgets.get(
+                response.headers.get("X-RateLimit-Resource", resource)
+            )
+            if budget is None:
+                return None
+            wait = budget.reset - self.clock()
+            if wait > self.max_wait:
+                raise self._exhausted(resource, budget, 1)
+            return max(wait, 0)
+        if b"secondary rate limit" in response.content.lower():
+            return SECONDARY_LIMIT_WAIT
+        return None
+
+    def check_budget(self, costs, what):
+        """
+        Fail fast if the rate limit left cannot cover the requests planned.
+        Args:
+            costs: A dictionary of resource: the number of requests planned
+            what: What the requests are for, for the report
+        """
+        with self.condition:
+            now = self.clock()
+            for resource, cost in sorted(costs.items()):
+                budget = self.budgets.get(resource)
+                if (
+                    budget is None
+                    or budget.reset <= now
+                    or budget.reset - now <= self.max_wait
+                ):
+                    # unknown, or it resets soon enough to wait for
+                    continue
+                if budget.remaining - self.reserve < cost:
+                    raise RateLimitExhausted(
+                        f"not enough rate limit for {what}: "
+                        + str(self._exhausted(resource, budget, cost))
+                    )
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--rate-limit-reserve",
+        type=int,
+        default=0,
+        help="GitHub requests of each kind to leave unused for other users of the token",
+    )
+    parser.add_argument(
+        "--rate-limit-wait",
+        type=int,
+        default=300,
+        help="the longest in seconds to wait for the rate limit to reset before failing",
+    )
+
+
+def start(args):
+    """
+    Schedule requests within the rate limits, in place of PyGithub's retries of requests
+    refused by a rate limit, before the repository is got.
+    Args:
+        args: Parsed arguments including those from add_arguments
+    """
+    client.install()
+    if cassette.replaying():
+        # nothing is sent to GitHub
+        return
+    # the transport still retries server errors, but rate limits are left to the scheduler
+    client.set_base_retry(
+        Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=list(range(500, 600)),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"GET", "POST"},
+            raise_on_status=False,
+        )
+    )
+    client.add_layer(
+        RateLimitScheduler(
+            reserve=args.rate_limit_reserve, max_wait=args.rate_limit_wait
+        )
+    )
+
+
+def scheduling():
+    """Whether requests are being scheduled by a RateLimitScheduler."""
+    return client.find_layer(RateLimitScheduler) is not None
+
+
+def check_budget(costs, what):
+    """Fail fast if the rate limit left cannot cover the requests planned, when scheduling."""
+    scheduler = client.find_layer(RateLimitScheduler)
+    if scheduler is not None:
+        scheduler.check_budget(costs, what)
@@ -1,7 +1,16 @@
+import argparse
+import asyncio
 import sys
 
-import regex as re
+import regex
 
+import card
+import cassette
+import metrics
+import rate_limit
+from board import load_issue_states
+from release_notes_index import load_index
+from snapshot_store import SnapshotStore
 from utils import *
 
 RELEASE_NOTES_REPO_PATH = "release_notes_repo"
@@ -11,26 +20,24 @@ UPCOMING_CHANGES_FILE = "ReleaseNotes_Upcoming.md"
 
 LABELS_TO_IGNORE = ["no_release_notes", "HLM"]
 
+TITLE_TICKET = regex.compile(r"(?i:Ticket |Ticket|#)\K\d+")
+# the first number after the last slash, e.g. the number of an issue URL
+TRAILING_NUMBER = regex.compile(r"([0-9]+)(?=[^\/]*$)")
 
-def check_review_in_prs(repository, column_dict):
-    in_error = False
-    pull_or_clone_repository(
-        RELEASE_NOTES_REPO_PATH, "https://github.com/ISISComputingGroup/IBEX.git"
-    )
-    all_release_notes_text = get_text_with_extension(
-        os.path.join(RELEASE_NOTES_REPO_PATH, RELEASE_NOTES_FOLDER), "md"
-    )
-    prs = get_all_info_for_PRs(repository, UPCOMING_CHANGES_FILE)
 
-    for ticket in get_issues_from_cards(column_dict[COLUMNS.REVIEW]):
+@metrics.timed("rule check_review_in_prs")
+def check_review_in_prs(column_dict, prs, release_notes):
+    in_error = False
+    references = TicketReferences(prs)
+    for ticket in column_dict[COLUMNS.REVIEW]:
         ticket_labels = set([label.name for label in ticket.labels])
         if ticket_labels.intersection(LABELS_TO_IGNORE):
             continue
         ticket_number = ticket.number
-        ticket_in_title, ticket_anywhere = ticket_mentioned_in_pr(ticket_number, prs)
-        if not ticket_in_title:
+        mention = ticket_mentioned_in_pr(ticket_number, references)
+        if not mention.in_title:
             in_error = True
-            if ticket.html_url in all_release_notes_text:
+            if ticket.html_url in release_notes:
                 print(
                     f"ERROR: issue {ticket_number} has merged release notes but is still in review (assigned: {get_assigned(ticket)})"
                 )
@@ -38,7 +45,7 @@ def check_review_in_prs(repository, column_dict):
                 print(
                     f"ERROR: issue {ticket_number} is not mentioned in the title of any open PRs modifying release notes (assigned: {get_assigned(ticket)})"
                 )
-        if not ticket_mentioned_in_pr(ticket_number, prs):
+        if not mention:
             in_error = True
             print(
                 f"ERROR: issue {ticket_number} has no PR modifying release notes ({ticket.html_url}, assigned: {get_assigned(ticket)})"
@@ -46,54 +53,94 @@ def check_review_in_prs(repository, column_dict):
     return in_error
 
 
-def check_for_dangling_release_notes(repository):
+def ticket_of_pr(pr):
+    """
+    The ticket a release notes PR is for: a ticket number in its title, otherwise
+    a number in its body, or None.
+    """
+    match = TITLE_TICKET.search(pr[0])
+    if match is None and pr[1]:
+        match = TRAILING_NUMBER.search(pr[1]) or TITLE_TICKET.search(pr[1])
+    return None if match is None else int(match.group())
+
+
+def get_issue_states(repository, numbers, board=None, store=None, known=None):
+    """
+    Get the state of issues, from the board or snapshot where the issue is already known
+    and otherwise in batched queries.
+    Args:
+        known: A dictionary of number: state kept between checks, to which the states that
+            are queried are added
+    Return:
+        A dictionary of number: state for the numbers that exist
+    """
+    numbers = set(numbers)
+    states = {}
+    if board is not None:
+        for contents in board.values():
+            for content in contents:
+                if is_issue(content) and content.number in numbers:
+                    states[content.number] = content.state
+    if store is not None:
+        with SnapshotStore(store) as snapshot:
+            states.update(snapshot.issue_states(numbers - set(states)))
+    if known is not None:
+        states.update(
+            {
+                number: known[number]
+                for number in numbers - set(states)
+                if number in known
+            }
+        )
+    queried = load_issue_states(repository, numbers - set(states))
+    if known is not None:
+        known.update(queried)
+    states.update(queried)
+    return states
+
+
+@metrics.timed("rule check_for_dangling_release_notes")
+def check_for_dangling_release_notes(
+    repository, prs, board=None, store=None, known_states=None
+):
     """
     A release note is considered dangling release note when its corresponding issue is closed.
     Returns: error or not
     """
     in_error = False
-    prs = get_all_info_for_PRs(repository, UPCOMING_CHANGES_FILE)
-    regex_list = [r"(?i:Ticket |Ticket|#)\K\d+", r"([0-9]+)(?=[^\/]*$)"]
-    for pr in prs:
-        ticket_number = (
-            re.search(regex_list[0], pr[0]).group() if re.search(regex_list[0], pr[0]) else None
-        )
-        if not ticket_number and pr[1]:
-            for regex in regex_list:
-                if re.search(regex, pr[1]):
-                    ticket_number = re.search(regex, pr[1]).group()
-        if ticket_number:
-            try:
-                if repository.get_issue(int(ticket_number)).state == "closed":
-                    in_error = True
-                    print(
-                        f"ERROR: issue {ticket_number} is closed but its associated Release note PR titled "
-                        f'"{pr[0]}" is open'
-                    )
-            except:
-                print(f"INFO: cannot find issue {ticket_number}")
-                pass
+    tickets = [(pr, ticket_of_pr(pr)) for pr in prs]
+    states = get_issue_states(
+        repository,
+        {number for _, number in tickets if number is not None},
+        board,
+        store,
+        known_states,
+    )
+    for pr, ticket_number in tickets:
+        if ticket_number is None:
+            continue
+        if ticket_number not in states:
+            print(f"INFO: cannot find issue {ticket_number}")
+        elif states[ticket_number] == "closed":
+            in_error = True
+            print(
+                f"ERROR: issue {ticket_number} is closed but its associated Release note PR titled "
+                f'"{pr[0]}" is open'
+            )
 
     return in_error
 
 
-def check_complete_in_a_file(column_dict):
+@metrics.timed("rule check_complete_in_a_file")
+def check_complete_in_a_file(column_dict, release_notes):
     in_error = False
-    pull_or_clone_repository(
-        RELEASE_NOTES_REPO_PATH, "https://github.com/ISISComputingGroup/IBEX.git"
-    )
-
-    done_tickets = get_issues_from_cards(column_dict[COLUMNS.COMPLETE])
-
-    all_release_notes_text = get_text_with_extension(
-        os.path.join(RELEASE_NOTES_REPO_PATH, RELEASE_NOTES_FOLDER), "md"
-    )
+    done_tickets = column_dict[COLUMNS.COMPLETE]
 
     for ticket in done_tickets:
         ticket_labels = set([label.name for label in ticket.labels])
         if ticket_labels.intersection(LABELS_TO_IGNORE):
             continue
-        if ticket.html_url not in all_release_notes_text:
+        if ticket.html_url not in release_notes:
             in_error = True
             print(
                 f"ERROR: issue {ticket.number} merged but not linked in release notes (assigned: {get_assigned(ticket)})"
@@ -101,15 +148,89 @@ def check_complete_in_a_file(column_dict):
     return in_error
 
 
-def main():
-    project_board_repository = get_IBEX_repo()
-    columns = get_project_columns(project_board_repository, "IBEX Project Board")
-    column_dict = sort_cards_into_columns(columns)
-    in_error = check_for_dangling_release_notes(project_board_repository)
-    in_error |= check_review_in_prs(project_board_repository, column_dict)
-    in_error |= check_complete_in_a_file(column_dict)
+def update_release_notes(update=True, force=False):
+    """
+    Bring the clone of the release notes up to date and index them.
+    Args:
+        update: False to index the clone as it is, without the network, as when replaying
+        force: True to check the remote even if it was already brought up to date
+    Return:
+        The ReleaseNotesIndex
+    """
+    if update:
+        with metrics.phase("release notes clone"):
+            pull_or_clone_repository(
+                RELEASE_NOTES_REPO_PATH,
+                "https://github.com/ISISComputingGroup/IBEX.git",
+                sparse_paths=[RELEASE_NOTES_FOLDER],
+                force=force,
+            )
+    with metrics.phase("release notes index"):
+        return load_index(RELEASE_NOTES_REPO_PATH, RELEASE_NOTES_FOLDER)
+
+
+def check(repository, board, prs, release_notes, store=None, known_states=None):
+    """
+    Run the release notes checks.
+    Args:
+        repository: The repository
+        board: The board from get_board
+        prs: The open PRs from get_all_info_for_PRs
+        release_notes: The ReleaseNotesIndex
+        store: The SQLite snapshot of the board, if any, to look issue states up in
+        known_states: A dictionary of number: state of issues that are not on the board,
+            kept between checks so that they are only queried once
+    Return:
+        Whether any check is in error
+    """
+    column_dict = sort_board_into_columns(board)
+    in_error = check_for_dangling_release_notes(
+        repository, prs, board, store, known_states
+    )
+    in_error |= check_review_in_prs(column_dict, prs, release_notes)
+    in_error |= check_complete_in_a_file(column_dict, release_notes)
     return in_error
 
 
+def main():
+    parser = argparse.ArgumentParser(description="release notes")
+    parser.add_argument("--project", dest="project", default="IBEX Project Board")
+    parser.add_argument("--backend", choices=["graphql", "rest"], default="graphql")
+    parser.add_argument("--store")
+    parser.add_argument("--no-cache", action="store_true")
+    metrics.add_arguments(parser)
+    cassette.add_arguments(parser)
+    rate_limit.add_arguments(parser)
+    args = parser.parse_args()
+    card.check_arguments(parser, args)
+    cassette.check_arguments(parser, args)
+
+    cassette.start(args)
+    rate_limit.start(args)
+    project_board_repository = get_IBEX_repo(None if args.no_cache else HTTP_CACHE_DIR)
+    metrics.start("release_notes_checker", args, project_board_repository)
+    try:
+        with metrics.phase("project lookup"):
+            board = get_board(
+                project_board_repository, args.project, args.backend, args.store
+            )
+        with metrics.phase("open PRs"):
+            prs = asyncio.run(
+                get_all_info_for_PRs_async(
+                    project_board_repository, UPCOMING_CHANGES_FILE
+                )
+            )
+    except rate_limit.RateLimitExhausted as e:
+        print(f"ERROR: {e}")
+        return 1
+    return check(
+        project_board_repository,
+        board,
+        prs,
+        update_release_notes(not cassette.replaying()),
+        args.store,
+    )
+
+
 if __name__ == "__main__":
     sys.exit(main())
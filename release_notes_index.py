@@ -0,0 +1,160 @@
+"""
+An index of the issues linked from the release notes.
+
+The issue URLs and ticket numbers in every release notes file are parsed once and
+mapped to the file and version they appear in. The index is saved to disk keyed by the
+commit of the release notes repository, and later runs only re-index the files changed
+since that commit.
+"""
+
+import glob
+import json
+import os
+import re
+
+from git import GitCommandError, InvalidGitRepositoryError, NoSuchPathError, Repo
+
+INDEX_FILE = "release_notes_index.json"
+INDEX_FORMAT = 1
+
+ISSUE_URL = re.compile(r"https://github\.com/[\w.-]+/[\w.-]+/issues/\d+")
+TICKET_NUMBER = re.compile(r"(?:/issues/|(?i:ticket)\s*#?|#)(\d+)")
+
+
+def version_of(file_name):
+    """The version a release notes file is for, e.g. v12.0.1 for ReleaseNotes_v12.0.1.md"""
+    name = os.path.splitext(os.path.basename(file_name))[0]
+    return name.split("_", 1)[1] if "_" in name else name
+
+
+def index_text(text):
+    """Get the sorted issue URLs and ticket numbers mentioned in some text."""
+    urls = sorted(set(ISSUE_URL.findall(text)))
+    tickets = sorted({int(number) for number in TICKET_NUMBER.findall(text)})
+    return {"urls": urls, "tickets": tickets}
+
+
+class ReleaseNotesIndex:
+    """Where issues are mentioned in the release notes."""
+
+    def __init__(self, commit, files):
+        """
+        Args:
+            commit: The commit the index was built at, None if not in a git repository
+            files: A dictionary of file path: {"urls": [...], "tickets": [...]}
+        """
+        self.commit = commit
+        self.files = files
+        self.urls = {}
+        self.tickets = {}
+        for path in sorted(files):
+            location = (path, version_of(path))
+            for url in files[path]["urls"]:
+                self.urls.setdefault(url, []).append(location)
+            for number in files[path]["tickets"]:
+                self.tickets.setdefault(number, []).append(location)
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    def url_locations(self, url):
+        """The (file, version) the issue URL is linked from."""
+        return self.urls.get(url, [])
+
+    def ticket_locations(self, number):
+        """The (file, version) the ticket number is mentioned in."""
+        return self.tickets.get(number, [])
+
+    def save(self, path):
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {"format": INDEX_FORMAT, "commit": self.commit, "files": self.files}, f
+            )
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def read(path):
+        """Read a saved index, None if there isn't a usable one."""
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get("format") != INDEX_FORMAT:
+            return None
+        return ReleaseNotesIndex(saved["commit"], saved["files"])
+
+
+def _index_files(repo_path, paths):
+    files = {}
+    for path in paths:
+        with open(
+            os.path.join(repo_path, path), "r", encoding="utf-8", errors="replace"
+        ) as f:
+            files[path] = index_text(f.read())
+    return files
+
+
+def _notes_files(repo_path, folder, extension):
+    return sorted(
+        os.path.relpath(name, repo_path).replace(os.sep, "/")
+        for name in glob.glob(os.path.join(repo_path, folder, f"*.{extension}"))
+    )
+
+
+def _changed_files(repository, since, folder):
+    """The files in the folder changed between a commit and HEAD, None if it can't be told."""
+    try:
+        diff = repository.git.diff(
+            "--name-only", "--no-renames", since, "HEAD", "--", folder
+        )
+    except GitCommandError:
+        return None
+    return set(diff.splitlines())
+
+
+def load_index(repo_path, folder, extension="md", index_file=None):
+    """
+    Get the index of a release notes folder, re-indexing only what changed since it was saved.
+    Args:
+        repo_path: The checkout of the release notes repository
+        folder: The release notes folder within the repository
+        extension: The extension of release notes files
+        index_file: Where to save the index, by default INDEX_FILE in the checkout's parent
+    Return:
+        The ReleaseNotesIndex
+    """
+    if index_file is None:
+        index_file = os.path.join(
+            os.path.dirname(os.path.abspath(repo_path)), INDEX_FILE
+        )
+    try:
+        commit = Repo(repo_path).head.commit.hexsha
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError):
+        # not a checkout, so there is nothing to key a saved index by
+        return ReleaseNotesIndex(
+            None, _index_files(repo_path, _notes_files(repo_path, folder, extension))
+        )
+
+    saved = ReleaseNotesIndex.read(index_file)
+    if saved is not None and saved.commit == commit:
+        return saved
+
+    paths = _notes_files(repo_path, folder, extension)
+    changed = None
+    if saved is not None and saved.commit is not None:
+        changed = _changed_files(Repo(repo_path), saved.commit, folder)
+    if changed is None:
+        files = _index_files(repo_path, paths)
+    else:
+        files = {path: saved.files[path] for path in paths if path in saved.files}
+        files.update(
+            _index_files(
+                repo_path, [p for p in paths if p in changed or p not in files]
+            )
+        )
+
+    index = ReleaseNotesIndex(commit, files)
+    index.save(index_file)
+    return index
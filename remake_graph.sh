@@ -13,9 +13,9 @@ day=`date +%d`
 daily_dir=/isis/www/ibex/daily/$year/$month/$day
 mkdir -p ${daily_dir}
 
-## make burndown graph
-python3 /home/isissupport/card/make_fig.py
+## make burndown dashboard, the daily pages sharing the plotly.js in /isis/www/ibex
+python3 /home/isissupport/card/make_fig.py --dashboard /isis/www/ibex ${daily_dir}
 
 ## update web files
-cp -f tickets.csv burndown-tickets.csv burndown-points.csv burndown-points.html /isis/www/ibex
-cp tickets.csv burndown-tickets.csv burndown-points.csv burndown-points.html ${daily_dir}
+cp -f tickets.csv burndown-tickets.csv burndown-points.csv /isis/www/ibex
+cp tickets.csv burndown-tickets.csv burndown-points.csv ${daily_dir}
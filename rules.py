@@ -0,0 +1,457 @@
+"""
+The checks run on each card of a project board.
+
+Each check is registered as a rule together with the columns it applies to and the
+issue data it needs. The data a run needs can then be planned before anything is
+fetched, so that, for example, issue histories are only fetched for issues that an
+active rule will look at, and every rule is then evaluated in a single pass over the board.
+"""
+
+import datetime
+import io
+import sys
+import threading
+from collections import namedtuple
+
+import metrics
+from board import snapshot_of
+from utils import COLUMNS, is_issue
+
+ZERO_POINT_LABELS = {
+    "Good First Issue",
+    "HLM",
+    "Cryomagnet",
+    "Friday",
+    "Datastreaming",
+    "standdown",
+    "support",
+}
+NO_POINT_LABELS = {"support", "duplicate", "sub-ticket", "umbrella", "wontfix"}
+COLUMN_LABELS = {
+    COLUMNS.BUCKET: "bucket",
+    COLUMNS.READY: "ready",
+    COLUMNS.IN_PROGRESS: "in progress",
+    COLUMNS.REVIEW: "review",
+    COLUMNS.IMPEDED: "impeded",
+}
+# column: list of (label, warning days, error days, only if the issue has the label)
+STALE_LABELS = {
+    COLUMNS.READY: [("rework", 7, 28, False)],
+    COLUMNS.IN_PROGRESS: [("in progress", 14, 2800, False)],
+    COLUMNS.REVIEW: [("review", 7, 28, False), ("under review", 7, 28, True)],
+}
+IMPEDED_DAYS_ALLOWED = 28
+
+# the data a rule can need about an issue
+NEEDS = {"labels", "assignees", "milestone", "history"}
+
+
+class Report:
+    """
+    Prints the messages of a check and counts the errors and warnings.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.num_errors = 0
+        self.num_warnings = 0
+        self.lock = threading.Lock()
+
+    def info(self, message=""):
+        with self.lock:
+            print(message, file=self.stream or sys.stdout)
+
+    def error(self, message):
+        with self.lock:
+            print(message, file=self.stream or sys.stdout)
+            self.num_errors += 1
+
+    def warning(self, message):
+        with self.lock:
+            print(message, file=self.stream or sys.stdout)
+            self.num_warnings += 1
+
+    def add(self, checked):
+        """Print the messages of an issue checked before, counting its errors and warnings."""
+        with self.lock:
+            (self.stream or sys.stdout).write(checked.text)
+            self.num_errors += checked.num_errors
+            self.num_warnings += checked.num_warnings
+
+
+class IssueFacts:
+    """
+    An issue with the column and history it is checked against. What the rules need of
+    the issue's labels and assignees is already worked out in its IssueSnapshot.
+    """
+
+    __slots__ = ("column", "history", "is_bucket", "issue")
+
+    def __init__(self, issue, column, history=None):
+        self.issue = issue
+        self.column = column
+        self.is_bucket = column in (COLUMNS.BUCKET, COLUMNS.UNKNOWN)
+        self.history = history
+
+
+Rule = namedtuple("Rule", ["name", "check", "columns", "needs"])
+
+# what checking an issue reported; key is what the result depends on, so that the result
+# can be reused until the issue, its column or history, or the day changes
+CheckedIssue = namedtuple("CheckedIssue", ["key", "text", "num_errors", "num_warnings"])
+
+RULES = []
+
+
+def rule(columns=None, needs=("labels",)):
+    """
+    Register a check as a rule.
+    Args:
+        columns: The columns the rule applies to, None for all columns
+        needs: The issue data the rule reads, from NEEDS
+    """
+    assert set(needs) <= NEEDS, needs
+
+    def decorator(check):
+        RULES.append(
+            Rule(
+                check.__name__,
+                check,
+                None if columns is None else frozenset(columns),
+                frozenset(needs),
+            )
+        )
+        return check
+
+    return decorator
+
+
+def check_labels(report, facts, check, present):
+    issue = facts.issue
+    if present:
+        diff = set(check).difference(issue.label_names)
+        if len(diff) > 0:
+            report.error(
+                "ERROR: issue {} ({}) does NOT have the following required labels: {} "
+                "(assigned: {})".format(
+                    issue.number, issue.title, ",".join(diff), issue.assigned
+                )
+            )
+    if not present:
+        diff = issue.label_names.intersection(set(check))
+        if len(diff) > 0:
+            report.error(
+                "ERROR: issue {} ({}) has the following INVALID labels: {} (assigned: {})".format(
+                    issue.number, issue.title, ",".join(diff), issue.assigned
+                )
+            )
+
+
+def check_if_stale(report, facts, label_name, warn_days_allowed, error_days_allowed):
+    issue = facts.issue
+    created = facts.history.last_labeled.get(label_name)
+    if created is not None:
+        dur = datetime.datetime.now(datetime.UTC) - created
+        if dur > datetime.timedelta(error_days_allowed):
+            report.warning(
+                f'ERROR: Issue {issue.number} ({issue.title}) has been in "{label_name}" for '
+                f"{dur.days} days (assigned: {issue.assigned})"
+            )
+        elif dur > datetime.timedelta(warn_days_allowed):
+            report.warning(
+                f'WARNING: Issue {issue.number} ({issue.title}) has been in "{label_name}" for '
+                f"{dur.days} days (assigned: {issue.assigned})"
+            )
+
+
+@rule(needs=["labels", "assignees"])
+def multiple_sizes(report, facts):
+    for _ in facts.issue.size_labels[1:]:
+        report.error(
+            f"ERROR: issue {facts.issue.number} ({facts.issue.title}) has multiple sizes "
+            f"(assigned: {facts.issue.assigned})"
+        )
+
+
+@rule(needs=["labels", "assignees"])
+def size(report, facts):
+    """all columns except Bucket should have sizes on tickets and this size should not be 0"""
+    issue = facts.issue
+    if issue.size is None:
+        no_labels = NO_POINT_LABELS.intersection(issue.label_names)
+        if len(no_labels) > 0:
+            report.info(
+                "INFO: no size {} issue {} ({})".format(
+                    ",".join(no_labels), issue.number, issue.title
+                )
+            )
+        elif not facts.is_bucket:
+            report.error(
+                f"ERROR: no size for issue {issue.number} ({issue.title}) in {facts.column} "
+                f"(assigned: {issue.assigned})"
+            )
+    elif issue.size == 0:
+        zero_labels = ZERO_POINT_LABELS.intersection(issue.label_names)
+        if len(zero_labels) > 0:
+            report.info(
+                "INFO: size 0 {} issue {}".format(",".join(zero_labels), issue.number)
+            )
+        else:
+            report.error(
+                f"ERROR: size 0 not allowed for issue {issue.number} ({issue.title}) (assigned: "
+                f"{issue.assigned})"
+            )
+
+
+@rule(needs=["milestone", "assignees"])
+def bucket_milestone(report, facts):
+    issue = facts.issue
+    if facts.is_bucket and issue.milestone is not None:
+        report.error(
+            f"ERROR: issue {issue.number} ({issue.title}) has milestone {issue.milestone.title} "
+            f"(assigned: {issue.assigned})"
+        )
+
+
+@rule(needs=["milestone", "assignees"])
+def no_milestone(report, facts):
+    issue = facts.issue
+    if not facts.is_bucket and issue.milestone is None:
+        report.error(
+            f"ERROR: issue {issue.number} ({issue.title}) has no milestone (assigned: "
+            f"{issue.assigned})"
+        )
+
+
+@rule(needs=["milestone", "assignees"])
+def closed_milestone(report, facts):
+    issue = facts.issue
+    if (issue.milestone is not None) and (issue.milestone.state == "closed"):
+        report.error(
+            f"ERROR: issue {issue.number} ({issue.title}) has a closed milestone (assigned: "
+            f"{issue.assigned})"
+        )
+
+
+@rule(columns=[COLUMNS.UNKNOWN], needs=["labels", "assignees"])
+def unknown_column_rework(report, facts):
+    check_labels(report, facts, ["rework"], False)
+
+
+@rule(columns=COLUMN_LABELS.keys(), needs=["labels", "assignees"])
+def column_label(report, facts):
+    label = COLUMN_LABELS[facts.column]
+    check_labels(report, facts, [label], True)
+    check_labels(report, facts, facts.issue.workflow_labels - {label}, False)
+
+
+@rule(columns=[COLUMNS.READY], needs=["labels", "assignees"])
+def ready_proposal(report, facts):
+    check_labels(report, facts, ["proposal"], False)
+
+
+@rule(columns=STALE_LABELS.keys(), needs=["labels", "assignees", "history"])
+def stale(report, facts):
+    for (
+        label_name,
+        warn_days_allowed,
+        error_days_allowed,
+        only_if_labelled,
+    ) in STALE_LABELS[facts.column]:
+        if not only_if_labelled or label_name in facts.issue.label_names:
+            check_if_stale(
+                report, facts, label_name, warn_days_allowed, error_days_allowed
+            )
+
+
+@rule(columns=[COLUMNS.IMPEDED], needs=["assignees", "history"])
+def impeded_comments(report, facts):
+    last_activity = facts.history.last_activity
+    # time ago comment was made
+    if last_activity is None or (
+        (datetime.datetime.now(datetime.UTC) - last_activity).days
+        > IMPEDED_DAYS_ALLOWED
+    ):
+        check_if_stale(
+            report, facts, "impeded", IMPEDED_DAYS_ALLOWED, IMPEDED_DAYS_ALLOWED
+        )
+
+
+@rule(
+    columns=[COLUMNS.IN_PROGRESS, COLUMNS.REVIEW, COLUMNS.COMPLETE], needs=["assignees"]
+)
+def unassigned(report, facts):
+    if facts.issue.assigned == "None":
+        report.error(
+            f"ERROR: issue {facts.issue.number} ({facts.issue.title}) must be assigned to somebody"
+        )
+
+
+def active_rules(skip=()):
+    """The registered rules, in evaluation order, except those named in skip."""
+    unknown = set(skip).difference(r.name for r in RULES)
+    if unknown:
+        raise KeyError(f"unknown rules: {','.join(sorted(unknown))}")
+    return [r for r in RULES if r.name not in skip]
+
+
+def rules_for_column(rules, column):
+    return [r for r in rules if r.columns is None or column in r.columns]
+
+
+def plan(board, rules):
+    """
+    Work out which issues need which data for the given rules.
+    Return:
+        A dictionary of need: list of issues, in board order
+    """
+    needs = {}
+    for column_name, contents in board.items():
+        column = COLUMNS.from_value(column_name)
+        if column is COLUMNS.IGNORED:
+            continue
+        column_needs = set()
+        for r in rules_for_column(rules, column):
+            column_needs |= r.needs
+        for need in column_needs:
+            needs.setdefault(need, []).extend(c for c in contents if is_issue(c))
+    return needs
+
+
+class BoardStats:
+    """Totals gathered while checking a board."""
+
+    def __init__(self):
+        self.issues = {}
+        self.issue_size = {}
+        self.issue_column = {}
+        self.column_tickets = {}
+        self.column_points = {}
+        self.milestones = []
+        self.tickets_under_review = 0
+        self.points_under_review = 0
+        self.current_rework = 0
+        self.completed_rework = 0
+        self.tickets_added_during_sprint = 0
+        self.points_added_during_sprint = 0
+
+    def add_issue(self, facts):
+        """Add an issue to the totals, returning the points it adds to its column."""
+        issue, column = facts.issue, facts.column
+        points = 0
+        if issue.under_review:
+            self.tickets_under_review += 1
+        if issue.size:
+            if issue.added_during_sprint:
+                self.points_added_during_sprint += issue.size
+                self.tickets_added_during_sprint += 1
+            if issue.under_review:
+                self.points_under_review += issue.size
+            points = issue.size
+        if issue.size is not None:
+            self.issue_size[issue.number] = issue.size
+        self.issues[issue.number] = issue
+        self.issue_column[issue.number] = column
+        if (
+            not facts.is_bucket
+            and issue.milestone is not None
+            and issue.milestone.state == "open"
+        ):
+            self.milestones.append(issue.milestone.title)
+        if issue.in_rework and column in [
+            COLUMNS.READY,
+            COLUMNS.IN_PROGRESS,
+            COLUMNS.IMPEDED,
+        ]:
+            self.current_rework += 1
+        if issue.in_rework and column in [
+            COLUMNS.REVIEW,
+            COLUMNS.COMPLETE,
+            COLUMNS.DONE,
+        ]:
+            self.completed_rework += 1
+        return points
+
+
+def check_issue(report, facts, rules):
+    for r in rules:
+        with metrics.phase(f"rule {r.name}"):
+            r.check(report, facts)
+
+
+def check_issue_once(report, facts, rules, checked):
+    """
+    Check an issue, reusing what it reported last time if nothing it depends on has changed.
+    Args:
+        checked: A dictionary of issue number: CheckedIssue, updated with the result
+    """
+    key = (facts.issue, facts.column, facts.history, datetime.date.today())
+    result = checked.get(facts.issue.number)
+    if result is None or result.key != key:
+        issue_report = Report(io.StringIO())
+        check_issue(issue_report, facts, rules)
+        result = CheckedIssue(
+            key,
+            issue_report.stream.getvalue(),
+            issue_report.num_errors,
+            issue_report.num_warnings,
+        )
+        checked[facts.issue.number] = result
+    report.add(result)
+
+
+def check_board(board, histories, report, rules, checked=None):
+    """
+    Check every card on a board against the rules, in board order.
+    Args:
+        board: A dictionary of column name: list of card contents
+        histories: A dictionary of issue number: IssueHistory for the issues planned to need it
+        report: The Report to print to
+        rules: The rules to check
+        checked: A dictionary of issue number: CheckedIssue kept between checks of the same
+            board with the same rules, so that only the issues that changed are checked again
+    Return:
+        BoardStats for the board
+    """
+    stats = BoardStats()
+    for column_name, contents in board.items():
+        report.info(f'** Checking column "{column_name}"')
+        column = COLUMNS.from_value(column_name)
+
+        if column is COLUMNS.IGNORED:
+            report.info(f"Ignoring column {column_name}")
+            continue
+
+        with metrics.phase(f"column {column_name}"):
+            total = 0
+            stats.column_tickets[column] = len(contents)
+            column_rules = rules_for_column(rules, column)
+
+            if column is COLUMNS.UNKNOWN:
+                report.info(
+                    f'INFO: unknown column "{column_name}" - assuming like Bucket'
+                )
+
+            for content in contents:
+                if is_issue(content):
+                    facts = IssueFacts(
+                        snapshot_of(content), column, histories.get(content.number)
+                    )
+                    if checked is None:
+                        check_issue(report, facts, column_rules)
+                    else:
+                        check_issue_once(report, facts, column_rules, checked)
+                    total += stats.add_issue(facts)
+                else:
+                    try:
+                        report.error(f"ERROR: pullrequest {content.number} not allowed")
+                    except AttributeError:
+                        report.warning(
+                            "WARNING: Card is present on board instead of IBEX issue"
+                        )
+            report.info(
+                f'INFO: column "{column}" contains {len(contents)} cards and {total} points\n'
+            )
+            stats.column_points[column] = total
+    return stats
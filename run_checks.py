@@ -0,0 +1,109 @@
+"""
+Run the board checks of card.py and the release notes checks from one fetch of the
+board, the open PRs and the release notes.
+
+The release notes clone is updated in the background while the boards and PRs are read
+from the API. The output of each set of checks is written to its own file, with one
+board checks file per board. The release notes are checked against the first board.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from git import GitError
+
+import card
+import cassette
+import metrics
+import rate_limit
+import release_notes_checker
+from utils import HTTP_CACHE_DIR, get_all_info_for_PRs_async, get_IBEX_repo
+
+
+def open_output(path):
+    """Open an output file for writing, "-" for standard output."""
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="board and release notes checks")
+    card.add_arguments(parser)
+    parser.add_argument(
+        "--summary",
+        default="summary.txt",
+        help="where to write the board checks, - for stdout; boards after the first get a "
+        "file name prefixed with the board name",
+    )
+    parser.add_argument(
+        "--release-notes-output",
+        default="release_notes_check.txt",
+        help="where to write the release notes checks, - for stdout",
+    )
+    metrics.add_arguments(parser)
+    cassette.add_arguments(parser)
+    rate_limit.add_arguments(parser)
+    args = parser.parse_args(argv)
+    card.check_arguments(parser, args)
+    cassette.check_arguments(parser, args)
+
+    cassette.start(args)
+    rate_limit.start(args)
+    repo = get_IBEX_repo(None if args.no_cache else HTTP_CACHE_DIR)
+    metrics.start("run_checks", args, repo)
+
+    try:
+        with ThreadPoolExecutor(1) as executor:
+            release_notes = executor.submit(
+                release_notes_checker.update_release_notes, not cassette.replaying()
+            )
+            # what is printed while finding a board heads its outputs, as when run separately
+            boards = card.load_boards(repo, args)
+            with metrics.phase("open PRs"):
+                prs = asyncio.run(
+                    get_all_info_for_PRs_async(
+                        repo, release_notes_checker.UPCOMING_CHANGES_FILE, args.workers
+                    )
+                )
+            try:
+                release_notes = release_notes.result()
+                release_notes_error = None
+            except (GitError, OSError) as e:
+                # the board checks do not need the release notes, so they are still written
+                release_notes = None
+                release_notes_error = e
+
+        results = card.check_boards(repo, boards, args)
+    except rate_limit.RateLimitExhausted as e:
+        print(f"ERROR: {e}")
+        return 1
+    for board, (output, _) in zip(boards, results):
+        summary = (
+            args.summary
+            if args.summary == "-"
+            else card.output_path(args.summary, board.prefix)
+        )
+        with open_output(summary) as f:
+            f.write(board.preamble + output)
+
+    with open_output(args.release_notes_output) as f, contextlib.redirect_stdout(f):
+        print(boards[0].preamble, end="")
+        if release_notes_error is None:
+            in_error = release_notes_checker.check(
+                repo, boards[0].contents, prs, release_notes, args.store
+            )
+        else:
+            print(f"ERROR: cannot update the release notes: {release_notes_error}")
+            in_error = True
+
+    # as when the checks were run one after the other, the exit code is that of the release
+    # notes checks; board check errors are reported in the summary
+    return int(in_error)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
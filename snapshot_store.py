@@ -0,0 +1,352 @@
+"""
+A local SQLite snapshot of the project board.
+
+Each sync only fetches issues updated since the previous sync, plus a light-weight pass
+over the board to pick up cards that have moved column, so the cost of a run scales with
+the day's changes rather than the size of the board.
+"""
+
+import datetime
+import sqlite3
+
+from board import (
+    DraftCard,
+    IssueSnapshot,
+    Label,
+    Milestone,
+    PullRequestCard,
+    User,
+    find_project,
+    issue_from_rest,
+    iter_items,
+    load_issues,
+    parse_datetime,
+)
+
+# the issue fields needed to place a card in a column
+ITEM_ISSUE_FIELDS = "number"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    number INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    html_url TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at TEXT,
+    milestone INTEGER REFERENCES milestones(number)
+);
+CREATE TABLE IF NOT EXISTS labels (
+    issue INTEGER NOT NULL REFERENCES issues(number) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (issue, position)
+);
+CREATE TABLE IF NOT EXISTS assignees (
+    issue INTEGER NOT NULL REFERENCES issues(number) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    login TEXT NOT NULL,
+    PRIMARY KEY (issue, position)
+);
+CREATE TABLE IF NOT EXISTS milestones (
+    number INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    state TEXT NOT NULL,
+    due_on TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS columns (
+    project TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (project, position)
+);
+CREATE TABLE IF NOT EXISTS cards (
+    project TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    column_name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    number INTEGER,
+    title TEXT,
+    PRIMARY KEY (project, position)
+);
+CREATE INDEX IF NOT EXISTS cards_by_issue ON cards (number);
+CREATE TABLE IF NOT EXISTS syncs (
+    project TEXT PRIMARY KEY,
+    synced_at TEXT NOT NULL
+);
+"""
+
+
+def _isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+class SnapshotStore:
+    """Issues, labels, assignees, milestones and column membership of project boards."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def last_sync(self, project):
+        """The time the project was last synced, None if never synced."""
+        row = self.connection.execute(
+            "SELECT synced_at FROM syncs WHERE project = ?", (project,)
+        ).fetchone()
+        return None if row is None else parse_datetime(row[0])
+
+    def issue_numbers(self):
+        return {row[0] for row in self.connection.execute("SELECT number FROM issues")}
+
+    def issue_states(self, numbers):
+        """Get a dictionary of number: state for those of the issues that are stored."""
+        numbers = list(numbers)
+        states = {}
+        # keep well under SQLite's limit on the number of query parameters
+        for start in range(0, len(numbers), 500):
+            batch = numbers[start : start + 500]
+            states.update(
+                self.connection.execute(
+                    "SELECT number, state FROM issues WHERE number IN ({})".format(
+                        ",".join("?" * len(batch))
+                    ),
+                    batch,
+                )
+            )
+        return states
+
+    def _save_milestone(self, milestone):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO milestones VALUES (?, ?, ?, ?, ?)",
+            (
+                milestone.number,
+                milestone.title,
+                milestone.state,
+                _isoformat(milestone.due_on),
+                milestone.description,
+            ),
+        )
+
+    def save_milestones(self, milestones):
+        """Insert or replace Milestones."""
+        with self.connection:
+            for milestone in milestones:
+                self._save_milestone(milestone)
+
+    def save_issues(self, issues):
+        """Insert or replace IssueSnapshots with their labels, assignees and milestone."""
+        with self.connection:
+            for issue in issues:
+                milestone = issue.milestone
+                if milestone is not None:
+                    self._save_milestone(milestone)
+                self.connection.execute(
+                    "DELETE FROM labels WHERE issue = ?", (issue.number,)
+                )
+                self.connection.execute(
+                    "DELETE FROM assignees WHERE issue = ?", (issue.number,)
+                )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        issue.number,
+                        issue.title,
+                        issue.html_url,
+                        issue.state,
+                        _isoformat(issue.updated_at),
+                        None if milestone is None else milestone.number,
+                    ),
+                )
+                self.connection.executemany(
+                    "INSERT INTO labels VALUES (?, ?, ?)",
+                    [
+                        (issue.number, i, label.name)
+                        for i, label in enumerate(issue.labels)
+                    ],
+                )
+                self.connection.executemany(
+                    "INSERT INTO assignees VALUES (?, ?, ?)",
+                    [
+                        (issue.number, i, user.login)
+                        for i, user in enumerate(issue.assignees)
+                    ],
+                )
+
+    def save_board(self, project, column_names, cards, synced_at):
+        """
+        Replace the column membership of a project.
+        Args:
+            project: The project name
+            column_names: The column names in board order
+            cards: list of (column name, kind, number, title) in board order, where kind is
+                "Issue", "PullRequest" or "DraftIssue"
+            synced_at: The time the board was read
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM columns WHERE project = ?", (project,))
+            self.connection.execute("DELETE FROM cards WHERE project = ?", (project,))
+            self.connection.executemany(
+                "INSERT INTO columns VALUES (?, ?, ?)",
+                [(project, i, name) for i, name in enumerate(column_names)],
+            )
+            self.connection.executemany(
+                "INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?)",
+                [(project, i) + tuple(card) for i, card in enumerate(cards)],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?)",
+                (project, synced_at.isoformat()),
+            )
+
+    def load_issues(self, numbers=None):
+        """Get stored issues as a dictionary of number: IssueSnapshot."""
+        labels = {}
+        for issue, name in self.connection.execute(
+            "SELECT issue, name FROM labels ORDER BY issue, position"
+        ):
+            labels.setdefault(issue, []).append(Label(name))
+        assignees = {}
+        for issue, login in self.connection.execute(
+            "SELECT issue, login FROM assignees ORDER BY issue, position"
+        ):
+            assignees.setdefault(issue, []).append(User(login))
+        milestones = {
+            row[0]: Milestone(row[0], row[1], row[2], parse_datetime(row[3]), row[4])
+            for row in self.connection.execute("SELECT * FROM milestones")
+        }
+
+        issues = {}
+        for (
+            number,
+            title,
+            html_url,
+            state,
+            updated_at,
+            milestone,
+        ) in self.connection.execute("SELECT * FROM issues"):
+            if numbers is not None and number not in numbers:
+                continue
+            issues[number] = IssueSnapshot(
+                number=number,
+                title=title,
+                html_url=html_url,
+                state=state,
+                labels=tuple(labels.get(number, ())),
+                assignees=tuple(assignees.get(number, ())),
+                milestone=milestones.get(milestone),
+                updated_at=parse_datetime(updated_at),
+            )
+        return issues
+
+    def load_board(self, project):
+        """
+        Get a project board in the same form as board.load_board.
+        Issue cards whose issue is not stored are left out.
+        """
+        board = {
+            name: []
+            for (name,) in self.connection.execute(
+                "SELECT name FROM columns WHERE project = ? ORDER BY position",
+                (project,),
+            )
+        }
+        cards = self.connection.execute(
+            "SELECT column_name, kind, number, title FROM cards WHERE project = ? "
+            "ORDER BY position",
+            (project,),
+        ).fetchall()
+        issues = self.load_issues(
+            {number for _, kind, number, _ in cards if kind == "Issue"}
+        )
+        for column_name, kind, number, title in cards:
+            if kind == "Issue":
+                if number in issues:
+                    board.setdefault(column_name, []).append(issues[number])
+            elif kind == "PullRequest":
+                board.setdefault(column_name, []).append(PullRequestCard(number, title))
+            else:
+                board.setdefault(column_name, []).append(DraftCard(title))
+        return board
+
+
+def milestones_updated_since(repo, since):
+    """
+    The milestones updated since a time, newest first, as Milestones. Closing a milestone or
+    changing its due date does not change the updated_at of its issues, so they are not in
+    the issue listing.
+    """
+    milestones = []
+    for milestone in repo.get_milestones(state="all", sort="updated", direction="desc"):
+        if milestone.updated_at is not None and milestone.updated_at < since:
+            break
+        milestones.append(
+            Milestone(
+                milestone.number,
+                milestone.title,
+                milestone.state,
+                milestone.due_on,
+                milestone.description,
+            )
+        )
+    return milestones
+
+
+def sync_board(repo, project_board_name, path, workers=1):
+    """
+    Bring the snapshot of a project board up to date and load it.
+    Issues and milestones updated since the last sync are read from the REST listings,
+    issues new to the store are fetched in batched GraphQL queries and column membership
+    is re-read from the board with only the issue numbers.
+    Args:
+        repo: The repository the project is linked to
+        project_board_name: The name of the project
+        path: The SQLite database file
+        workers: The number of GraphQL queries for new issues to make concurrently
+    Return:
+        The board in the same form as board.load_board
+    """
+    with SnapshotStore(path) as store:
+        synced_at = datetime.datetime.now(datetime.UTC)
+        since = store.last_sync(project_board_name)
+
+        project_id, column_names = find_project(repo, project_board_name)
+        cards = []
+        for status, content in iter_items(repo, project_id, ITEM_ISSUE_FIELDS):
+            if content is None:
+                cards.append((status, "DraftIssue", None, None))
+            else:
+                cards.append(
+                    (
+                        status,
+                        content["__typename"],
+                        content.get("number"),
+                        content.get("title"),
+                    )
+                )
+
+        if since is not None:
+            store.save_issues(
+                issue_from_rest(issue)
+                for issue in repo.get_issues(state="all", since=since)
+                # the listing includes pull requests, reading pull_request would need a request
+                if "/pull/" not in issue.html_url
+            )
+            store.save_milestones(milestones_updated_since(repo, since))
+
+        board_numbers = {number for _, kind, number, _ in cards if kind == "Issue"}
+        store.save_issues(
+            load_issues(repo, board_numbers - store.issue_numbers(), workers).values()
+        )
+
+        store.save_board(project_board_name, column_names, cards, synced_at)
+        return store.load_board(project_board_name)
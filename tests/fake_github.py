@@ -0,0 +1,93 @@
+"""
+A local stand-in for the GitHub REST and GraphQL APIs for use in tests.
+"""
+
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from github import Github
+
+
+class FakeGithub:
+    """
+    Serves canned REST responses by path and answers GraphQL queries with a handler.
+
+    rest: dictionary of path: JSON-able response body for GET requests
+    graphql: callable taking (query, variables) and returning the "data" of the response,
+        or a tuple of (data, errors) to also return errors
+    """
+
+    def __init__(self, rest=None, graphql=None):
+        self.rest = {} if rest is None else rest
+        self.graphql = graphql
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, body, headers=None):
+                payload = b"" if body is None else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                fake.requests.append(("GET", self.path, dict(self.headers)))
+                response = fake.get(self.path, self.headers)
+                if response is None:
+                    self.send_json(404, {"message": "Not Found"})
+                else:
+                    self.send_json(*response)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests.append(("POST", self.path, body))
+                response = fake.graphql(body["query"], body["variables"])
+                if isinstance(response, tuple):
+                    self.send_json(200, {"data": response[0], "errors": response[1]})
+                else:
+                    self.send_json(200, {"data": response})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def get(self, path, headers):
+        """
+        Return (status, body, headers) for a GET request or None if not found.
+        Paths are matched with their query string first, then without it.
+        Responses have an ETag and a matching If-None-Match gets 304 Not Modified.
+        """
+        if path not in self.rest:
+            path = path.split("?")[0]
+            if path not in self.rest:
+                return None
+        body = self.rest[path]
+        etag = f'"{hashlib.sha1(json.dumps(body).encode()).hexdigest()}"'
+        if headers.get("If-None-Match") == etag:
+            return 304, None, {"ETag": etag}
+        return 200, body, {"ETag": etag}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def github(self, **kwargs):
+        kwargs.setdefault("seconds_between_requests", None)
+        kwargs.setdefault("seconds_between_writes", None)
+        return Github(base_url=self.base_url, retry=None, **kwargs)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,253 @@
+import pickle
+import re
+import unittest
+
+from fake_github import FakeGithub
+from github import GithubException
+
+from board import (
+    PAGE_SIZE,
+    DraftCard,
+    IssueSnapshot,
+    Label,
+    Milestone,
+    PullRequestCard,
+    User,
+    issue_from_graphql,
+    load_board,
+    load_issue_states,
+)
+
+REPO = {
+    "full_name": "ISISComputingGroup/IBEX",
+    "name": "IBEX",
+    "url": "/repos/ISISComputingGroup/IBEX",
+}
+
+
+def make_issue_node(number, column, labels=(), assignees=(), milestone=None):
+    return {
+        "status": {"name": column},
+        "content": {
+            "__typename": "Issue",
+            "number": number,
+            "title": f"Issue {number}",
+            "url": f"https://github.com/ISISComputingGroup/IBEX/issues/{number}",
+            "state": "OPEN",
+            "updatedAt": "2024-01-02T03:04:05Z",
+            "labels": {"nodes": [{"name": name} for name in labels]},
+            "assignees": {"nodes": [{"login": login} for login in assignees]},
+            "milestone": milestone,
+        },
+    }
+
+
+class FakeBoard:
+    def __init__(self, items, project_title="IBEX Project Board"):
+        self.items = items
+        self.project_title = project_title
+
+    def __call__(self, query, variables):
+        if "projectsV2" in query:
+            return {
+                "repository": {
+                    "projectsV2": {
+                        "nodes": [
+                            {
+                                "id": "PROJECT",
+                                "title": self.project_title,
+                                "field": {
+                                    "options": [{"name": "Bucket"}, {"name": "Review"}]
+                                },
+                            }
+                        ]
+                    }
+                }
+            }
+        start = int(variables["cursor"] or 0)
+        end = start + PAGE_SIZE
+        return {
+            "node": {
+                "items": {
+                    "pageInfo": {
+                        "hasNextPage": end < len(self.items),
+                        "endCursor": str(end),
+                    },
+                    "nodes": self.items[start:end],
+                }
+            }
+        }
+
+
+class BoardLoaderTests(unittest.TestCase):
+    def load(self, fake_board, project="IBEX Project Board"):
+        with FakeGithub({"/repos/ISISComputingGroup/IBEX": REPO}, fake_board) as fake:
+            repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+            board = load_board(repo, project)
+        return board, fake.requests
+
+    def test_GIVEN_items_WHEN_board_loaded_THEN_issue_fields_populated(self):
+        milestone = {
+            "number": 7,
+            "title": "SPRINT_2024_01_04",
+            "state": "OPEN",
+            "dueOn": "2024-02-01T00:00:00Z",
+            "description": '{"SP": 40}',
+        }
+        node = make_issue_node(
+            1000, "Review", ["review", "3"], ["alice", "bob"], milestone
+        )
+
+        board, _ = self.load(FakeBoard([node]))
+
+        issue = board["Review"][0]
+        self.assertEqual(1000, issue.number)
+        self.assertEqual("open", issue.state)
+        self.assertEqual(["review", "3"], [label.name for label in issue.labels])
+        self.assertEqual("alice", issue.assignee.login)
+        self.assertEqual(["alice", "bob"], [user.login for user in issue.assignees])
+        self.assertEqual(
+            ("SPRINT_2024_01_04", "open"),
+            (issue.milestone.title, issue.milestone.state),
+        )
+        self.assertEqual(2024, issue.milestone.due_on.year)
+
+    def test_GIVEN_more_items_than_a_page_WHEN_board_loaded_THEN_all_pages_fetched(
+        self,
+    ):
+        nodes = [
+            make_issue_node(number, "Bucket") for number in range(2 * PAGE_SIZE + 1)
+        ]
+
+        board, requests = self.load(FakeBoard(nodes))
+
+        self.assertEqual(
+            list(range(2 * PAGE_SIZE + 1)), [issue.number for issue in board["Bucket"]]
+        )
+        self.assertEqual(
+            3, len([r for r in requests if r[0] == "POST" and "items" in r[2]["query"]])
+        )
+
+    def test_GIVEN_board_WHEN_loaded_THEN_columns_in_board_order_including_empty(self):
+        board, _ = self.load(FakeBoard([make_issue_node(1, "Review")]))
+
+        self.assertEqual(["Bucket", "Review"], list(board.keys()))
+        self.assertEqual([], board["Bucket"])
+
+    def test_GIVEN_pull_request_and_draft_WHEN_board_loaded_THEN_returned_as_cards(
+        self,
+    ):
+        nodes = [
+            {
+                "status": None,
+                "content": {"__typename": "PullRequest", "number": 5, "title": "PR"},
+            },
+            {
+                "status": {"name": "Bucket"},
+                "content": {"__typename": "DraftIssue", "title": "Note"},
+            },
+        ]
+
+        board, _ = self.load(FakeBoard(nodes))
+
+        self.assertEqual([PullRequestCard(5, "PR")], board["No Status"])
+        self.assertEqual([DraftCard("Note")], board["Bucket"])
+
+    def test_GIVEN_no_matching_project_WHEN_board_loaded_THEN_key_error(self):
+        with self.assertRaises(KeyError):
+            self.load(FakeBoard([], project_title="IBEX Project Board (old)"))
+
+
+def fake_states(query, variables):
+    states = {1: "OPEN", 2: "CLOSED", 3: "MERGED"}
+    repository = {}
+    errors = []
+    for number in map(int, re.findall(r"issueOrPullRequest\(number: (\d+)\)", query)):
+        if number in states:
+            repository[f"i{number}"] = {"number": number, "state": states[number]}
+        else:
+            repository[f"i{number}"] = None
+            errors.append({"type": "NOT_FOUND", "path": [f"i{number}"]})
+    return {"repository": repository}, errors
+
+
+class IssueStateTests(unittest.TestCase):
+    def test_GIVEN_issues_prs_and_unknown_numbers_WHEN_states_loaded_THEN_unknown_left_out(
+        self,
+    ):
+        with FakeGithub({"/repos/ISISComputingGroup/IBEX": REPO}, fake_states) as fake:
+            repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+            states = load_issue_states(repo, [1, 2, 3, 4])
+
+        self.assertEqual({1: "open", 2: "closed", 3: "closed"}, states)
+        self.assertEqual(1, len([r for r in fake.requests if r[0] == "POST"]))
+
+    def test_GIVEN_query_error_WHEN_states_loaded_THEN_raised(self):
+        def broken(query, variables):
+            return None, [{"type": "RATE_LIMITED", "message": "slow down"}]
+
+        with FakeGithub({"/repos/ISISComputingGroup/IBEX": REPO}, broken) as fake:
+            repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+            with self.assertRaises(GithubException):
+                load_issue_states(repo, [1])
+
+
+class IssueSnapshotTests(unittest.TestCase):
+    def snapshot(self, labels=(), assignees=(), milestone=None):
+        return IssueSnapshot(
+            1,
+            "Issue 1",
+            "",
+            "open",
+            tuple(Label(name) for name in labels),
+            tuple(User(login) for login in assignees),
+            milestone,
+            None,
+        )
+
+    def test_GIVEN_labels_WHEN_snapshot_built_THEN_flags_worked_out(self):
+        issue = self.snapshot(
+            ["review", "under review", "rework", "5", "3", "added during sprint"]
+        )
+
+        self.assertEqual(("5", "3"), issue.size_labels)
+        self.assertEqual(5, issue.size)
+        self.assertTrue(
+            issue.in_rework and issue.under_review and issue.added_during_sprint
+        )
+        self.assertEqual({"review"}, issue.workflow_labels)
+
+    def test_GIVEN_no_assignees_WHEN_snapshot_built_THEN_assigned_is_none_string(self):
+        issue = self.snapshot()
+
+        self.assertEqual("None", issue.assigned)
+        self.assertIsNone(issue.assignee)
+        self.assertIsNone(issue.size)
+
+    def test_GIVEN_snapshot_WHEN_attribute_set_THEN_error(self):
+        issue = self.snapshot()
+
+        with self.assertRaises(AttributeError):
+            issue.title = "changed"
+        with self.assertRaises(AttributeError):
+            issue.extra = 1
+
+    def test_GIVEN_issues_in_same_milestone_WHEN_built_THEN_milestone_and_assigned_shared(
+        self,
+    ):
+        first = self.snapshot(
+            assignees=["al"], milestone=Milestone(7, "S", "open", None, None)
+        )
+        second = self.snapshot(
+            assignees=["al"], milestone=Milestone(7, "S", "open", None, None)
+        )
+
+        self.assertIs(first.milestone, second.milestone)
+        self.assertIs(first.assigned, second.assigned)
+
+    def test_GIVEN_snapshot_WHEN_pickled_THEN_equal_copy(self):
+        issue = issue_from_graphql(
+            make_issue_node(3, "Review", ["review"], ["al"])["content"]
+        )
+
+        self.assertEqual(issue, pickle.loads(pickle.dumps(issue)))
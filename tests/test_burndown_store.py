@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+
+from burndown_store import BurndownStore, DailyTotals, Sprint
+
+TOTALS = DailyTotals(
+    points_sum=10,
+    points_added=2,
+    tickets_sum=4,
+    tickets_added=1,
+    tickets_under_review=1,
+    current_rework=0,
+    completed_rework=1,
+)
+
+
+class BurndownStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = BurndownStore(os.path.join(self.directory.name, "burndown.sqlite"))
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def record(self, date, complete=3):
+        self.store.record_day(
+            date,
+            {"Complete": complete, "Review": 5, "Unknown": 1},
+            {"Complete": 1, "Review": 2, "Unknown": 1},
+            TOTALS,
+        )
+
+    def test_GIVEN_days_WHEN_exported_THEN_csvs_as_written_by_card(self):
+        self.record("2024-01-02")
+
+        self.store.export_csv(self.path("points.csv"), self.path("tickets.csv"))
+
+        with open(self.path("points.csv")) as f:
+            self.assertEqual(
+                "Date,Complete,Review,Points Sum,Points Added,Burndown\n2024-01-02,3,5,10,2,5\n",
+                f.read(),
+            )
+        with open(self.path("tickets.csv")) as f:
+            self.assertEqual(
+                "Date,Complete,Review,Under Review,Current Rework,Completed Rework,"
+                "Tickets Sum,Tickets Added,Burndown\n2024-01-02,1,2,1,0,1,4,1,2\n",
+                f.read(),
+            )
+
+    def test_GIVEN_day_recorded_twice_WHEN_read_THEN_latest_figures_once(self):
+        self.record("2024-01-02", complete=3)
+        self.record("2024-01-02", complete=4)
+
+        _, rows = self.store.read_points()
+
+        self.assertEqual([["2024-01-02", 4, 5, 10, 2, 4]], rows)
+
+    def test_GIVEN_column_added_later_WHEN_read_THEN_header_has_all_columns_and_zeros(
+        self,
+    ):
+        self.store.record_day("2024-01-01", {"Review": 5}, {"Review": 2}, TOTALS)
+        self.store.record_day("2024-01-02", {"Impeded": 1, "Review": 5}, {}, TOTALS)
+
+        header, rows = self.store.read_points()
+
+        self.assertEqual(["Date", "Impeded", "Review"], header[:3])
+        self.assertEqual(
+            [["2024-01-01", 0, 5], ["2024-01-02", 1, 5]], [r[:3] for r in rows]
+        )
+
+    def test_GIVEN_history_WHEN_range_read_THEN_only_days_in_range(self):
+        for day in range(1, 10):
+            self.record(f"2024-01-0{day}")
+
+        _, rows = self.store.read_points("2024-01-04", "2024-01-06")
+
+        self.assertEqual(
+            ["2024-01-04", "2024-01-05", "2024-01-06"], [r[0] for r in rows]
+        )
+
+    def test_GIVEN_sprints_WHEN_looked_up_by_date_THEN_latest_started_sprint(self):
+        self.store.save_sprint(
+            Sprint("SPRINT_2024_01_04", "2024-01-04", "2024-02-01", 40)
+        )
+        self.store.save_sprint(
+            Sprint("SPRINT_2024_02_01", "2024-02-01", "2024-03-01", 35)
+        )
+
+        self.assertEqual("SPRINT_2024_01_04", self.store.sprint_on("2024-01-20").title)
+        self.assertIsNone(self.store.sprint_on("2023-12-01"))
+
+    def test_GIVEN_old_csvs_WHEN_imported_THEN_exported_csvs_the_same(self):
+        points = (
+            "Date,Complete,Review,Points Sum,Points Added,Burndown\n"
+            "2024-01-01,1,5,10,2,7\n"
+            "2024-01-02,3,5,10,2,5\n"
+        )
+        tickets = (
+            "Date,Complete,Review,Under Review,Current Rework,Completed Rework,"
+            "Tickets Sum,Tickets Added,Burndown\n"
+            "2024-01-01,1,2,1,0,1,4,1,2\n"
+            "2024-01-02,1,2,1,0,1,4,1,2\n"
+        )
+        for name, text in (("points.csv", points), ("tickets.csv", tickets)):
+            with open(self.path(name), "w") as f:
+                f.write(text)
+
+        self.store.import_csv(self.path("points.csv"), self.path("tickets.csv"))
+        self.store.export_csv(self.path("points2.csv"), self.path("tickets2.csv"))
+
+        with open(self.path("points2.csv")) as f:
+            self.assertEqual(points, f.read())
+        with open(self.path("tickets2.csv")) as f:
+            self.assertEqual(tickets, f.read())
@@ -0,0 +1,175 @@
+import datetime
+import io
+import os
+import tempfile
+import unittest
+from collections import namedtuple
+from contextlib import redirect_stderr
+from unittest.mock import MagicMock, patch
+
+import card
+import rules
+from board import IssueSnapshot, Milestone, User
+
+RepoMilestone = namedtuple(
+    "RepoMilestone",
+    [
+        "number",
+        "title",
+        "state",
+        "description",
+        "due_on",
+        "updated_at",
+        "open_issues",
+        "closed_issues",
+    ],
+)
+CURRENT = RepoMilestone(
+    7,
+    "SPRINT_2024_01_04",
+    "open",
+    '{"SP": 40}',
+    datetime.datetime(2024, 2, 1),
+    None,
+    1,
+    0,
+)
+OLD = RepoMilestone(
+    6, "SPRINT_2023_12_01", "open", None, datetime.datetime(2024, 1, 1), None, 1, 0
+)
+
+
+def repo_issue(number):
+    return MagicMock(
+        number=number, title=f"T{number}", state="open", assignees=[User("al")]
+    )
+
+
+def board_issue(number, milestone):
+    return IssueSnapshot(
+        number,
+        f"T{number}",
+        "",
+        "open",
+        [],
+        [User("al")],
+        Milestone(milestone.number, milestone.title, "open", None, None),
+        None,
+    )
+
+
+def fake_get_board(repo, project, *args):
+    print(f"## Checking project {project} ##\n")
+    return {project: []}
+
+
+def fake_check(repo, board, args, report, milestones, prefix):
+    report.error(f"ERROR: on {next(iter(board))} written to {prefix}milestone.json")
+    return report.num_errors
+
+
+class CardTests(unittest.TestCase):
+    def test_GIVEN_board_names_WHEN_prefixed_THEN_first_board_keeps_plain_names(self):
+        self.assertEqual("", card.output_prefix("IBEX Project Board", 0))
+        self.assertEqual("hrpd-ibex-", card.output_prefix("HRPD / IBEX", 1))
+        self.assertEqual(
+            "data/x-burndown.sqlite", card.output_path("data/burndown.sqlite", "x-")
+        )
+
+    def test_GIVEN_two_boards_WHEN_checked_THEN_each_output_whole_in_order(self):
+        stdout = io.StringIO()
+        with (
+            patch.object(card, "get_IBEX_repo"),
+            patch.object(card.metrics, "start"),
+            patch.object(card.rate_limit, "start"),
+            patch.object(card, "get_board", side_effect=fake_get_board),
+            patch.object(card, "check", side_effect=fake_check),
+            patch("sys.stdout", stdout),
+        ):
+            exit_code = card.main(["--project", "IBEX", "--project", "Reflectometry"])
+
+        self.assertEqual(2, exit_code)
+        self.assertEqual(
+            "## Checking project IBEX ##\n\n"
+            "ERROR: on IBEX written to milestone.json\n"
+            "## Checking project Reflectometry ##\n\n"
+            "ERROR: on Reflectometry written to reflectometry-milestone.json\n",
+            stdout.getvalue(),
+        )
+
+    def test_GIVEN_milestone_cache_WHEN_read_twice_THEN_milestones_listed_once(self):
+        repo = MagicMock()
+        repo.get_milestones.return_value = iter(["SPRINT_2024_01_04"])
+        milestones = card.MilestoneCache(repo)
+
+        milestones.get_open_milestones()
+
+        self.assertEqual(["SPRINT_2024_01_04"], milestones.get_open_milestones())
+        self.assertEqual(1, repo.get_milestones.call_count)
+
+    def test_GIVEN_milestone_cache_WHEN_issues_read_twice_THEN_fetched_once(self):
+        repo = MagicMock()
+        repo.get_issues.side_effect = lambda **kwargs: iter([repo_issue(10)])
+        milestones = card.MilestoneCache(repo)
+        milestones.get_issues(CURRENT)
+
+        issues = milestones.get_issues(CURRENT)
+
+        self.assertEqual([10], [issue.number for issue in issues])
+        self.assertEqual(1, repo.get_issues.call_count)
+
+    def test_GIVEN_store_WHEN_rest_backend_THEN_rejected(self):
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()) as stderr:
+            card.parse_args(["--store", "board.sqlite", "--backend", "rest"])
+
+        self.assertIn("--store cannot be used with --backend rest", stderr.getvalue())
+
+    def test_GIVEN_board_to_check_WHEN_requests_estimated_THEN_batches_and_pages_counted(
+        self,
+    ):
+        repo = MagicMock()
+        repo.requester.per_page = 2
+        issues = [board_issue(number, CURRENT) for number in range(120)]
+        board = {"Ready": issues[:100], "Review": issues[100:]}
+        args = card.parse_args(["--milestone"])
+
+        costs = card.estimate_requests(
+            repo, board, issues[:60], args, card.MilestoneCache(repo)
+        )
+
+        self.assertEqual({"core": 1 + 60, "graphql": 2}, costs)
+
+    def test_GIVEN_issue_with_old_milestone_WHEN_audited_THEN_found_from_board_alone(
+        self,
+    ):
+        repo = MagicMock()
+        repo.get_milestones.return_value = [CURRENT, OLD]
+        repo.get_issues.side_effect = lambda **kwargs: iter(
+            [repo_issue(10), repo_issue(11)]
+        )
+        stats = rules.BoardStats()
+        for number, milestone in ((10, CURRENT), (12, CURRENT), (21, OLD)):
+            stats.issues[number] = board_issue(number, milestone)
+            stats.issue_column[number] = card.COLUMNS.READY
+            stats.milestones.append(milestone.title)
+        report = rules.Report(io.StringIO())
+
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            patch.object(
+                card, "MILESTONE_JSON", os.path.join(directory, "milestone.json")
+            ),
+        ):
+            milestone, _ = card.audit_milestones(repo, report, stats, True)
+
+        self.assertIs(CURRENT, milestone)
+        self.assertEqual(2, report.num_errors)
+        self.assertIn(
+            "issue 21 (T21) (open, assigned: al) has old milestone",
+            report.stream.getvalue(),
+        )
+        self.assertIn(
+            "issue 11 (T11) (open, assigned: al) has current milestone but is not on board",
+            report.stream.getvalue(),
+        )
+        repo.get_issues.assert_called_once_with(milestone=CURRENT, state="all")
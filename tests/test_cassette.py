@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from fake_github import FakeGithub
+from github import Github
+
+import card
+import cassette
+import client
+
+REPO_PATH = "/repos/ISISComputingGroup/IBEX"
+
+
+class CassetteTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.cassette.gz")
+        client.install()
+
+    def tearDown(self):
+        client.reset_layers()
+        self.directory.cleanup()
+
+    def record(self, rest, graphql=None):
+        """Record getting the repository, and a GraphQL query if graphql is given."""
+        recorder = client.add_layer(cassette.RecordingAdapter(self.path))
+        with FakeGithub(rest, graphql) as fake:
+            repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+            if graphql is not None:
+                repo.requester.graphql_query("query { viewer { login } }", {})
+        recorder.save()
+        client.reset_layers()
+        return fake.base_url
+
+    def replay(self, base_url):
+        client.add_layer(cassette.ReplayAdapter(self.path))
+        return Github(base_url=base_url, retry=None, seconds_between_requests=None)
+
+    def test_GIVEN_recorded_run_WHEN_replayed_without_server_THEN_same_responses(self):
+        base_url = self.record(
+            {REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}},
+            lambda query, variables: {"viewer": {"login": "al"}},
+        )
+
+        github = self.replay(base_url)
+        repo = github.get_repo("ISISComputingGroup/IBEX")
+        _, data = repo.requester.graphql_query("query { viewer { login } }", {})
+
+        self.assertEqual("ISISComputingGroup/IBEX", repo.full_name)
+        self.assertEqual({"viewer": {"login": "al"}}, data["data"])
+        self.assertTrue(cassette.replaying())
+
+    def test_GIVEN_request_not_recorded_WHEN_replayed_THEN_error(self):
+        base_url = self.record({REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}})
+
+        github = self.replay(base_url)
+
+        with self.assertRaises(cassette.UnrecordedRequest):
+            github.get_repo("ISISComputingGroup/other")
+
+    def test_GIVEN_request_recorded_twice_WHEN_replayed_THEN_responses_in_order_then_last(
+        self,
+    ):
+        recorder = client.add_layer(cassette.RecordingAdapter(self.path))
+        with FakeGithub({REPO_PATH: {"full_name": "first"}}) as fake:
+            github = fake.github()
+            github.get_repo("ISISComputingGroup/IBEX")
+            fake.rest[REPO_PATH] = {"full_name": "second"}
+            github.get_repo("ISISComputingGroup/IBEX")
+        recorder.save()
+        client.reset_layers()
+
+        github = self.replay(fake.base_url)
+
+        self.assertEqual(
+            ["first", "second", "second"],
+            [github.get_repo("ISISComputingGroup/IBEX").full_name for _ in range(3)],
+        )
+
+    def test_GIVEN_store_WHEN_recording_or_replaying_THEN_rejected(self):
+        for option in ("--record", "--replay"):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                card.parse_args(["--store", "board.sqlite", option, self.path])
@@ -0,0 +1,319 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests
+from fake_github import FakeGithub
+from git import Git, Repo
+from github import GithubException
+
+import checker_service
+import client
+import utils
+from release_notes_index import ReleaseNotesIndex, index_text
+from snapshot_store import SnapshotStore
+
+REPO_PATH = "/repos/ISISComputingGroup/IBEX"
+CURRENT = {
+    "number": 7,
+    "title": "SPRINT_2024_01_04",
+    "state": "OPEN",
+    "dueOn": "2024-02-01T00:00:00Z",
+    "description": '{"SP": 40}',
+}
+URL = "https://github.com/ISISComputingGroup/IBEX/issues/{}"
+
+
+def issue_node(number, labels):
+    return {
+        "__typename": "Issue",
+        "number": number,
+        "title": f"T{number}",
+        "url": URL.format(number),
+        "state": "OPEN",
+        "updatedAt": "2024-01-01T00:00:00Z",
+        "labels": {"nodes": [{"name": label} for label in labels]},
+        "assignees": {"nodes": [{"login": "al"}]},
+        "milestone": CURRENT,
+    }
+
+
+class FakeRepository:
+    """The GitHub API of a board with an issue in Ready and one in Review."""
+
+    def __init__(self):
+        self.issues = {
+            10: issue_node(10, ["ready"]),
+            30: issue_node(30, ["review", "3"]),
+        }
+        self.columns = {10: "Ready", 30: "Review"}
+        self.issue_queries = []
+        self.history_queries = []
+        self.pull_files = {}
+        self.comments = {}
+
+    def graphql(self, query, variables):
+        if "projectsV2" in query:
+            options = [{"name": name} for name in ["Ready", "Review", "Complete"]]
+            project = {
+                "id": "P",
+                "title": "IBEX Project Board",
+                "field": {"options": options},
+            }
+            return {"repository": {"projectsV2": {"nodes": [project]}}}
+        if "items(" in query:
+            nodes = [
+                {"status": {"name": self.columns[number]}, "content": issue}
+                for number, issue in self.issues.items()
+            ]
+            page_info = {"hasNextPage": False, "endCursor": None}
+            return {"node": {"items": {"pageInfo": page_info, "nodes": nodes}}}
+        if "ProjectV2Item" in query:
+            number = int(variables["id"].removeprefix("item"))
+            return {
+                "node": {
+                    "project": {"title": "IBEX Project Board"},
+                    "status": {"name": self.columns[number]},
+                    "content": self.issues[number],
+                }
+            }
+        numbers = [int(n) for n in re.findall(r"issue\w*\(number: (\d+)\)", query)]
+        if "timelineItems" in query:
+            self.history_queries.append(numbers)
+            return {
+                "repository": {
+                    f"i{n}": {
+                        "number": n,
+                        "timelineItems": {"nodes": []},
+                        "comments": {"nodes": self.comments.get(n, [])},
+                    }
+                    for n in numbers
+                }
+            }
+        self.issue_queries.append(numbers)
+        return {"repository": {f"i{n}": self.issues.get(n) for n in numbers}}
+
+    def rest(self, base_url):
+        milestone = {
+            "number": 7,
+            "title": CURRENT["title"],
+            "state": "open",
+            "description": CURRENT["description"],
+            "due_on": CURRENT["dueOn"],
+            "open_issues": 2,
+            "closed_issues": 0,
+            "updated_at": "2024-01-02T00:00:00Z",
+        }
+        rest = {
+            REPO_PATH: {
+                "url": base_url + REPO_PATH,
+                "full_name": "ISISComputingGroup/IBEX",
+            },
+            REPO_PATH + "/milestones": [milestone],
+            REPO_PATH + "/issues": [],
+            REPO_PATH + "/pulls": [],
+        }
+        for number, files in self.pull_files.items():
+            rest[f"{REPO_PATH}/pulls/{number}"] = {
+                "url": f"{base_url}{REPO_PATH}/pulls/{number}",
+                "number": number,
+                "title": f"Ticket{30}: change",
+                "body": "",
+            }
+            rest[f"{REPO_PATH}/pulls/{number}/files"] = files
+        return rest
+
+
+class CheckerServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        self.addCleanup(os.chdir, cwd)
+        client.install()
+        self.addCleanup(client.reset_layers)
+
+        self.repository = FakeRepository()
+        self.fake = FakeGithub(graphql=self.repository.graphql)
+        self.fake.__enter__()
+        self.addCleanup(self.fake.__exit__)
+        self.fake.rest = self.repository.rest(self.fake.base_url)
+
+        release_notes = ReleaseNotesIndex(
+            None, {"ReleaseNotes_Upcoming.md": index_text("")}
+        )
+        update = patch.object(
+            checker_service.release_notes_checker,
+            "update_release_notes",
+            return_value=release_notes,
+        )
+        update.start()
+        self.addCleanup(update.stop)
+        self.update = update
+
+        args = checker_service.make_parser().parse_args(
+            ["serve", "--no-cache", "--workers", "1"]
+        )
+        repo = self.fake.github().get_repo("ISISComputingGroup/IBEX")
+        self.service = checker_service.CheckerService(repo, args)
+
+    def read(self, name):
+        with open(name) as f:
+            return f.read()
+
+    def test_GIVEN_service_WHEN_started_THEN_outputs_written(self):
+        self.assertIn("ERROR: no size for issue 10", self.read("summary.txt"))
+        self.assertIn("issue 30 has no PR", self.read("release_notes_check.txt"))
+
+    def test_GIVEN_issue_labelled_WHEN_delivered_THEN_only_that_issue_fetched_and_rechecked(
+        self,
+    ):
+        self.repository.issues[10] = issue_node(10, ["ready", "2"])
+        self.repository.issue_queries.clear()
+        self.repository.history_queries.clear()
+
+        handled = self.service.handle(
+            "issues",
+            {"action": "labeled", "issue": {"number": 10}, "label": {"name": "2"}},
+        )
+
+        self.assertTrue(handled)
+        self.assertNotIn("ERROR: no size for issue 10", self.read("summary.txt"))
+        self.assertEqual([[10]], self.repository.issue_queries)
+        self.assertEqual([[10]], self.repository.history_queries)
+
+    def test_GIVEN_issue_unchanged_WHEN_other_issue_delivered_THEN_rules_not_run_for_it(
+        self,
+    ):
+        self.repository.comments[30] = [{"updatedAt": "2024-01-05T00:00:00Z"}]
+
+        with patch.object(checker_service.rules, "check_issue") as check_issue:
+            self.service.handle(
+                "issue_comment", {"action": "created", "issue": {"number": 30}}
+            )
+
+        self.assertEqual(
+            [30], [call.args[1].issue.number for call in check_issue.call_args_list]
+        )
+
+    def test_GIVEN_item_moved_WHEN_delivered_THEN_card_in_new_column(self):
+        self.repository.columns[10] = "Review"
+
+        self.service.handle(
+            "projects_v2_item",
+            {"action": "edited", "projects_v2_item": {"node_id": "item10"}},
+        )
+
+        self.assertEqual([], self.service.boards[0].contents["Ready"])
+        self.assertEqual(
+            [30, 10], [c.number for c in self.service.boards[0].contents["Review"]]
+        )
+        self.assertIn('column "Review" contains 2 cards', self.read("summary.txt"))
+
+    def test_GIVEN_pull_request_opened_WHEN_delivered_THEN_release_notes_checks_updated(
+        self,
+    ):
+        patch_text = f"+- [Ticket 30]({URL.format(30)}): T30"
+        self.repository.pull_files[5] = [
+            {"filename": "release_notes/ReleaseNotes_Upcoming.md", "patch": patch_text}
+        ]
+        self.fake.rest = self.repository.rest(self.fake.base_url)
+
+        self.service.handle(
+            "pull_request", {"action": "opened", "pull_request": {"number": 5}}
+        )
+
+        self.assertNotIn("issue 30 has no PR", self.read("release_notes_check.txt"))
+
+    def test_GIVEN_store_WHEN_issue_closed_THEN_state_in_store_updated(self):
+        args = checker_service.make_parser().parse_args(
+            ["serve", "--no-cache", "--workers", "1", "--store", "snapshot.db"]
+        )
+        service = checker_service.CheckerService(self.service.repo, args)
+        self.repository.issues[10] = dict(issue_node(10, ["ready"]), state="CLOSED")
+
+        service.handle("issues", {"action": "closed", "issue": {"number": 10}})
+
+        with SnapshotStore("snapshot.db") as store:
+            self.assertEqual({10: "closed"}, store.issue_states([10]))
+
+    def test_GIVEN_release_notes_pushed_WHEN_delivered_THEN_checkout_pulled_again(self):
+        self.update.stop()
+        remote_path = os.path.join(self.directory.name, "remote.git")
+        Git().init("--bare", "--initial-branch", "master", remote_path)
+        work = Repo.clone_from(remote_path, os.path.join(self.directory.name, "work"))
+        with work.config_writer() as config:
+            config.set_value("user", "name", "test")
+            config.set_value("user", "email", "test@example.com")
+
+        def push(text):
+            notes = os.path.join(
+                work.working_dir, "release_notes", "ReleaseNotes_Upcoming.md"
+            )
+            os.makedirs(os.path.dirname(notes), exist_ok=True)
+            with open(notes, "w") as f:
+                f.write(text)
+            work.git.add("-A")
+            work.git.commit("-m", "change")
+            work.git.push("origin", "HEAD:master")
+            return work.head.commit.hexsha
+
+        push("")
+        checkout = checker_service.release_notes_checker.RELEASE_NOTES_REPO_PATH
+        Repo.clone_from(remote_path, checkout)
+        # as if brought up to date when the service started
+        updated = patch.object(
+            utils, "UPDATED_REPOSITORIES", {os.path.abspath(checkout)}
+        )
+        updated.start()
+        self.addCleanup(updated.stop)
+        head = push(f"- [Ticket 30]({URL.format(30)}): T30")
+
+        self.service.handle("push", {"ref": "refs/heads/master"})
+
+        self.assertEqual(head, Repo(checkout).head.commit.hexsha)
+        self.assertEqual(head, self.service.release_notes.commit)
+
+    def test_GIVEN_other_event_WHEN_delivered_THEN_not_handled(self):
+        self.assertFalse(self.service.handle("star", {"action": "created"}))
+
+    def test_GIVEN_server_with_secret_WHEN_deliveries_posted_THEN_only_signed_ones_handled(
+        self,
+    ):
+        server = checker_service.make_server(self.service, "127.0.0.1", 0, "secret")
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        delivery = os.path.join(self.directory.name, "delivery.json")
+        with open(delivery, "w") as f:
+            json.dump({"event": "star", "payload": {"action": "created"}}, f)
+        url = f"http://127.0.0.1:{server.server_port}"
+
+        self.assertEqual(0, checker_service.post_deliveries(url, [delivery], "secret"))
+        self.assertEqual(1, checker_service.post_deliveries(url, [delivery], "wrong"))
+
+    def test_GIVEN_server_WHEN_delivery_fails_THEN_bad_payload_and_github_errors_told_apart(
+        self,
+    ):
+        server = checker_service.make_server(self.service, "127.0.0.1", 0, None)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}"
+        headers = {"X-GitHub-Event": "issues"}
+
+        bad_payload = requests.post(url, json={"action": "opened"}, headers=headers)
+        with patch.object(
+            self.service, "handle", side_effect=GithubException(502, None, None)
+        ):
+            github_down = requests.post(url, json={"action": "opened"}, headers=headers)
+
+        self.assertEqual(400, bad_payload.status_code)
+        self.assertEqual(500, github_down.status_code)
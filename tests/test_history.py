@@ -0,0 +1,102 @@
+import datetime
+import re
+import unittest
+from unittest.mock import MagicMock
+
+from fake_github import FakeGithub
+
+from history import get_histories, history_from_issue, load_histories
+
+REPO = {"full_name": "ISISComputingGroup/IBEX"}
+
+
+def make_event(event, label_name, created_at):
+    mock = MagicMock()
+    mock.event = event
+    mock.label.name = label_name
+    mock.created_at = created_at
+    return mock
+
+
+def make_comment(updated_at):
+    mock = MagicMock()
+    mock.updated_at = updated_at
+    return mock
+
+
+def fake_timelines(query, variables):
+    repository = {}
+    for number in re.findall(r"issue\(number: (\d+)\)", query):
+        repository["i" + number] = {
+            "number": int(number),
+            "timelineItems": {
+                "nodes": [
+                    {"createdAt": "2024-01-01T00:00:00Z", "label": {"name": "review"}},
+                    {"createdAt": "2024-01-05T00:00:00Z", "label": {"name": "review"}},
+                ]
+            },
+            "comments": {"nodes": [{"updatedAt": "2024-01-03T00:00:00Z"}]},
+        }
+    return {"repository": repository}
+
+
+class HistoryTests(unittest.TestCase):
+    def test_GIVEN_label_added_twice_WHEN_history_read_THEN_last_time_used(self):
+        first = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+        second = datetime.datetime(2024, 1, 5, tzinfo=datetime.UTC)
+        issue = MagicMock()
+        issue.get_events.return_value = [
+            make_event("labeled", "review", first),
+            make_event("unlabeled", "review", first),
+            make_event("labeled", "review", second),
+        ]
+        issue.get_comments.return_value = []
+
+        history = history_from_issue(issue)
+
+        self.assertEqual({"review": second}, history.last_labeled)
+        self.assertIsNone(history.last_activity)
+
+    def test_GIVEN_comments_WHEN_history_read_THEN_last_activity_is_latest_update(self):
+        times = [
+            datetime.datetime(2024, 1, day, tzinfo=datetime.UTC) for day in (3, 9, 5)
+        ]
+        issue = MagicMock()
+        issue.get_events.return_value = []
+        issue.get_comments.return_value = [make_comment(time) for time in times]
+
+        self.assertEqual(times[1], history_from_issue(issue).last_activity)
+
+    def test_GIVEN_many_issues_WHEN_histories_loaded_THEN_one_query_per_batch(self):
+        with FakeGithub(
+            {"/repos/ISISComputingGroup/IBEX": REPO}, fake_timelines
+        ) as fake:
+            repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+            histories = load_histories(repo, range(1, 6), batch_size=2)
+
+        self.assertEqual([1, 2, 3, 4, 5], sorted(histories))
+        self.assertEqual(3, len([r for r in fake.requests if r[0] == "POST"]))
+        self.assertEqual(5, histories[3].last_labeled["review"].day)
+        self.assertEqual(3, histories[3].last_activity.day)
+
+    def test_GIVEN_rest_backend_WHEN_histories_fetched_concurrently_THEN_keyed_by_issue(
+        self,
+    ):
+        issues = []
+        for number in range(1, 6):
+            issue = MagicMock()
+            issue.number = number
+            labeled_at = datetime.datetime(2024, 1, number, tzinfo=datetime.UTC)
+            issue.get_events.return_value = [make_event("labeled", "ready", labeled_at)]
+            issue.get_comments.return_value = []
+            issues.append(issue)
+
+        histories = get_histories(None, issues, "rest", workers=3)
+
+        self.assertEqual(
+            {number: number for number in range(1, 6)},
+            {
+                number: history.last_labeled["ready"].day
+                for number, history in histories.items()
+            },
+        )
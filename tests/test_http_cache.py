@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+import unittest
+
+from fake_github import FakeGithub
+
+import client
+from http_cache import CachingAdapter, ResponseCache
+
+REPO_PATH = "/repos/ISISComputingGroup/IBEX"
+
+
+class HttpCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        client.install()
+
+    def tearDown(self):
+        client.reset_layers()
+        self.cache_dir.cleanup()
+
+    def get_full_name(self, fake):
+        return fake.github().get_repo("ISISComputingGroup/IBEX").full_name
+
+    def test_GIVEN_cached_response_WHEN_requested_again_THEN_conditional_request_served_from_cache(
+        self,
+    ):
+        adapter = client.add_layer(CachingAdapter(ResponseCache(self.cache_dir.name)))
+        with FakeGithub({REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}}) as fake:
+            self.assertEqual("ISISComputingGroup/IBEX", self.get_full_name(fake))
+            self.assertEqual("ISISComputingGroup/IBEX", self.get_full_name(fake))
+
+        self.assertNotIn("If-None-Match", fake.requests[0][2])
+        self.assertIn("If-None-Match", fake.requests[1][2])
+        self.assertEqual((1, 1), (adapter.hits, adapter.misses))
+
+    def test_GIVEN_cache_from_previous_run_WHEN_requested_THEN_served_from_cache(self):
+        with FakeGithub({REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}}) as fake:
+            client.add_layer(CachingAdapter(ResponseCache(self.cache_dir.name)))
+            self.get_full_name(fake)
+            client.reset_layers()
+            adapter = client.add_layer(
+                CachingAdapter(ResponseCache(self.cache_dir.name))
+            )
+            self.assertEqual("ISISComputingGroup/IBEX", self.get_full_name(fake))
+
+        self.assertEqual(1, adapter.hits)
+
+    def test_GIVEN_changed_content_WHEN_requested_again_THEN_new_content_returned(self):
+        adapter = client.add_layer(CachingAdapter(ResponseCache(self.cache_dir.name)))
+        with FakeGithub({REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}}) as fake:
+            self.get_full_name(fake)
+            fake.rest[REPO_PATH] = {"full_name": "ISISComputingGroup/IBEX-renamed"}
+            self.assertEqual(
+                "ISISComputingGroup/IBEX-renamed", self.get_full_name(fake)
+            )
+
+        self.assertEqual(0, adapter.hits)
+
+    def test_GIVEN_cache_over_size_WHEN_response_stored_THEN_least_recently_used_evicted(
+        self,
+    ):
+        rest = {
+            f"/repos/ISISComputingGroup/repo{i}": {"full_name": f"repo{i}"}
+            for i in range(3)
+        }
+        with FakeGithub(rest) as fake:
+            cache = ResponseCache(self.cache_dir.name)
+            client.add_layer(CachingAdapter(cache))
+            self.assertEqual(
+                "repo0", fake.github().get_repo("ISISComputingGroup/repo0").full_name
+            )
+            ((first_key, entry_size),) = cache.sizes.items()
+            cache.max_bytes = int(entry_size * 2.5)
+            for i in (1, 2):
+                time.sleep(0.01)
+                self.assertEqual(
+                    f"repo{i}",
+                    fake.github().get_repo(f"ISISComputingGroup/repo{i}").full_name,
+                )
+
+        self.assertEqual(2, len(cache.sizes))
+        self.assertNotIn(first_key, cache.sizes)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.cache_dir.name, first_key + ".json"))
+        )
+
+    def test_GIVEN_old_entries_WHEN_cache_opened_THEN_entries_removed(self):
+        client.add_layer(CachingAdapter(ResponseCache(self.cache_dir.name)))
+        with FakeGithub({REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}}) as fake:
+            self.get_full_name(fake)
+        for name in os.listdir(self.cache_dir.name):
+            os.utime(os.path.join(self.cache_dir.name, name), (0, 0))
+
+        cache = ResponseCache(self.cache_dir.name, max_age=60)
+
+        self.assertEqual({}, cache.sizes)
+        self.assertEqual([], os.listdir(self.cache_dir.name))
@@ -0,0 +1,74 @@
+import datetime
+import json
+import os
+import tempfile
+import unittest
+
+from issue_archive import IssueArchive, ingest_daily_folders
+
+DAY1 = datetime.date(2024, 1, 1)
+DAY2 = datetime.date(2024, 1, 2)
+DAY3 = datetime.date(2024, 1, 3)
+
+
+class IssueArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "archive")
+        self.archive = IssueArchive(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_GIVEN_days_WHEN_board_read_THEN_columns_and_sizes_of_that_day(self):
+        self.archive.add_day(DAY1, {"2": "Backlog", "1": "Review"}, {"1": 3})
+        self.archive.add_day(DAY2, {"1": "Done"}, {"1": 3})
+
+        self.assertEqual(
+            {1: ("Review", 3), 2: ("Backlog", None)}, self.archive.board_on(DAY1)
+        )
+        self.assertEqual({1: ("Done", 3)}, self.archive.board_on(DAY2))
+        self.assertIsNone(self.archive.board_on(DAY3))
+
+    def test_GIVEN_issue_moving_WHEN_column_changes_read_THEN_first_day_in_each_column(
+        self,
+    ):
+        self.archive.add_day(DAY1, {"1": "In Progress"}, {})
+        self.archive.add_day(DAY2, {"1": "Review"}, {})
+        self.archive.add_day(DAY3, {"1": "Review"}, {})
+
+        self.assertEqual(
+            [(DAY1, "In Progress"), (DAY2, "Review")], self.archive.column_changes(1)
+        )
+
+    def test_GIVEN_unchanged_day_WHEN_added_THEN_records_shared(self):
+        self.archive.add_day(DAY1, {"1": "Review", "2": "Backlog"}, {})
+        self.archive.add_day(DAY2, {"2": "Backlog", "1": "Review"}, {})
+
+        self.assertEqual(2, len(self.archive.records))
+        self.assertEqual(self.archive.board_on(DAY1), self.archive.board_on(DAY2))
+
+    def test_GIVEN_archived_day_WHEN_added_again_THEN_ignored(self):
+        self.archive.add_day(DAY2, {"1": "Review"}, {})
+
+        self.assertFalse(self.archive.add_day(DAY1, {"1": "Backlog"}, {}))
+        self.assertEqual([DAY2], self.archive.dates())
+
+    def test_GIVEN_archive_WHEN_reopened_THEN_same_days(self):
+        self.archive.add_day(DAY1, {"1": "Review"}, {"1": 5})
+
+        self.assertEqual({1: ("Review", 5)}, IssueArchive(self.path).board_on(DAY1))
+
+    def test_GIVEN_daily_folders_WHEN_ingested_twice_THEN_new_days_added_once(self):
+        root = os.path.join(self.directory.name, "daily")
+        for day, column in ((DAY1, "Backlog"), (DAY2, "Review")):
+            folder = os.path.join(
+                root, f"{day.year}", f"{day.month:02d}", f"{day.day:02d}"
+            )
+            os.makedirs(folder)
+            with open(os.path.join(folder, "issue-column.json"), "w") as f:
+                json.dump({"7": column}, f)
+
+        self.assertEqual(2, ingest_daily_folders(self.archive, root))
+        self.assertEqual(0, ingest_daily_folders(self.archive, root))
+        self.assertEqual([(DAY2, "Review", None)], self.archive.issue_history(7)[1:])
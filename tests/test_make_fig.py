@@ -0,0 +1,231 @@
+import base64
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import dashboard
+import make_fig
+from burndown_store import BurndownStore, DailyTotals, Sprint
+from make_fig import compute_burndown
+
+TOTALS = DailyTotals(20, 0, 5, 0, 0, 0, 0)
+
+
+def make_days(dates, complete, review):
+    return pd.DataFrame(
+        {
+            "Date": dates,
+            "Complete": complete,
+            "Review": review,
+            "Points Sum": [20] * len(dates),
+        }
+    )
+
+
+class BurndownTests(unittest.TestCase):
+    def test_GIVEN_sprint_part_way_through_WHEN_computed_THEN_last_day_held_to_due_date(
+        self,
+    ):
+        df = make_days(["2024-01-04", "2024-01-05"], [0, 5], [3, 2])
+
+        burndown = compute_burndown(df, 40, datetime.date(2024, 1, 7))
+
+        self.assertEqual(
+            ["2024-01-04", "2024-01-05", "2024-01-06", "2024-01-07"],
+            list(burndown.dates),
+        )
+        self.assertEqual([40, 35, 35, 35], list(burndown.completed))
+        self.assertEqual([37, 33, 33, 33], list(burndown.review_completed))
+
+    def test_GIVEN_no_target_WHEN_computed_THEN_ideal_from_first_day_points_to_zero(
+        self,
+    ):
+        df = make_days(["2024-01-04"], [0], [0])
+
+        burndown = compute_burndown(df, 0, datetime.date(2024, 1, 8))
+
+        self.assertEqual([20, 15, 10, 5, 0], list(burndown.ideal))
+
+    def test_GIVEN_no_tickets_on_first_day_WHEN_tickets_computed_THEN_burn_down_from_zero(
+        self,
+    ):
+        df = pd.DataFrame(
+            {"Date": ["2024-01-04"], "Complete": [0], "Review": [0], "Tickets Sum": [0]}
+        )
+
+        burndown = make_fig.tickets_burndown(df, datetime.date(2024, 1, 6))
+
+        self.assertEqual([0, 0, 0], list(burndown.ideal))
+
+    def test_GIVEN_steady_past_days_WHEN_forecast_THEN_completed_on_due_date(self):
+        df = make_days(["2024-01-04", "2024-01-05"], [0, 5], [0, 0])
+
+        forecast = make_fig.forecast_sprint(
+            df, 25, datetime.date(2024, 1, 9), np.array([5]), trials=100
+        )
+
+        self.assertEqual(
+            ["2024-01-05", "2024-01-09"], [forecast.dates[0], forecast.dates[-1]]
+        )
+        self.assertEqual([20, 15, 10, 5, 0], list(forecast.median))
+        self.assertEqual((1.0, "2024-01-09", "2024-01-09"), forecast[6:9])
+        self.assertEqual(["2024-01-09"], list(forecast.completion_dates))
+
+    def test_GIVEN_past_days_completing_little_WHEN_forecast_THEN_bands_and_chance_spread(
+        self,
+    ):
+        df = make_days(["2024-01-04"], [0], [0])
+        deltas = np.array([0, 0, 5, 10])
+
+        forecast = make_fig.forecast_sprint(df, 20, datetime.date(2024, 1, 8), deltas)
+
+        self.assertTrue(all(forecast.low <= forecast.median))
+        self.assertTrue(all(forecast.median <= forecast.high))
+        self.assertLess(0.2, forecast.chance_by_due)
+        self.assertLess(forecast.chance_by_due, 0.8)
+        # some trials do not complete within a sprint length past the due date
+        self.assertLess(forecast.chance_by_due, sum(forecast.completion_chances))
+        self.assertLessEqual(sum(forecast.completion_chances), 1.0)
+        self.assertLessEqual(forecast.p50, forecast.p90)
+
+    def test_GIVEN_nothing_ever_completed_WHEN_forecast_THEN_never_completes(self):
+        df = make_days(["2024-01-04", "2024-01-05"], [0, 0], [0, 0])
+
+        forecast = make_fig.forecast_sprint(
+            df, 20, datetime.date(2024, 1, 8), np.array([])
+        )
+
+        self.assertEqual((0.0, None, None), forecast[6:9])
+
+    def test_GIVEN_no_target_WHEN_forecast_THEN_starts_where_completed_line_ends(self):
+        df = make_days(
+            ["2024-01-04", "2024-01-05", "2024-01-06"], [0, 5, 10], [0, 0, 0]
+        )
+
+        burndown = compute_burndown(df, 0, datetime.date(2024, 1, 8))
+        forecast = make_fig.forecast_sprint(
+            df, 0, datetime.date(2024, 1, 8), np.array([5])
+        )
+
+        self.assertEqual([20, 15, 10, 10, 10], list(burndown.completed))
+        self.assertEqual([10, 5, 0], list(forecast.median))
+
+    def test_GIVEN_milestone_WHEN_forecast_written_THEN_added_to_it(self):
+        df = make_days(["2024-01-04"], [0], [0])
+        forecast = make_fig.forecast_sprint(
+            df, 10, datetime.date(2024, 1, 5), np.array([10])
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "milestone.json")
+            with open(path, "w") as f:
+                json.dump({"SP": 10, "DUE": "2024-01-05", "START": "2024-01-04"}, f)
+
+            make_fig.write_forecast(forecast, path)
+
+            with open(path) as f:
+                ms_dict = json.load(f)
+        self.assertEqual(10, ms_dict["SP"])
+        self.assertEqual(
+            {
+                "TRIALS": make_fig.TRIALS,
+                "CHANCE_BY_DUE": 1.0,
+                "P50": "2024-01-05",
+                "P90": "2024-01-05",
+            },
+            ms_dict["FORECAST"],
+        )
+
+    def test_GIVEN_history_of_sprints_WHEN_all_sprints_rendered_THEN_figure_per_sprint(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as directory:
+            history = os.path.join(directory, "burndown.sqlite")
+            with BurndownStore(history) as store:
+                for day in range(1, 29):
+                    date = f"2024-02-{day:02d}"
+                    store.record_day(date, {"Complete": day, "Review": 1}, {}, TOTALS)
+                store.save_sprint(
+                    Sprint("SPRINT_2024_02_01", "2024-02-01", "2024-02-14", 20)
+                )
+                store.save_sprint(
+                    Sprint("SPRINT_2024_02_15", "2024-02-15", "2024-02-28", 20)
+                )
+                store.save_sprint(
+                    Sprint("SPRINT_2023_01_01", "2023-01-01", "2023-01-14", 20)
+                )
+            output = os.path.join(directory, "sprints")
+
+            with patch.object(make_fig.metrics, "start"):
+                make_fig.main(
+                    ["--history", history, "--all-sprints", output, "--workers", "2"]
+                )
+
+            self.assertEqual(
+                [
+                    "burndown-points-SPRINT_2024_02_01.html",
+                    "burndown-points-SPRINT_2024_02_15.html",
+                ],
+                sorted(os.listdir(output)),
+            )
+
+    def test_GIVEN_two_directories_WHEN_dashboard_written_THEN_plotly_js_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history = os.path.join(directory, "burndown.sqlite")
+            with BurndownStore(history) as store:
+                for day in range(1, 3):
+                    store.record_day(
+                        f"2024-02-{day:02d}",
+                        {"Complete": day, "Review": 1},
+                        {"Complete": day, "Review": 2},
+                        TOTALS._replace(tickets_sum=6),
+                    )
+            with open(os.path.join(directory, "milestone.json"), "w") as f:
+                json.dump({"SP": 20, "DUE": "2024-02-03", "START": "2024-02-01"}, f)
+            web = os.path.join(directory, "web")
+            daily = os.path.join(web, "daily", "2024", "02", "02")
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                with patch.object(make_fig.metrics, "start"):
+                    make_fig.main(["--history", history, "--dashboard", web, daily])
+            finally:
+                os.chdir(cwd)
+
+            self.assertFalse(
+                os.path.exists(os.path.join(directory, "burndown-points.html"))
+            )
+            with open(os.path.join(web, "burndown-points.html")) as f:
+                self.assertIn('url=burndown.html"', f.read())
+            self.assertTrue(
+                os.path.exists(os.path.join(web, dashboard.PLOTLY_JS + ".gz"))
+            )
+            self.assertEqual(
+                [
+                    "burndown-points.html",
+                    "burndown-points.html.gz",
+                    "burndown-points.json",
+                    "burndown-points.json.gz",
+                    "burndown-tickets.json",
+                    "burndown-tickets.json.gz",
+                    "burndown.html",
+                    "burndown.html.gz",
+                ],
+                sorted(os.listdir(daily)),
+            )
+            with open(os.path.join(daily, "burndown.html")) as f:
+                self.assertIn(f'src="../../../../{dashboard.PLOTLY_JS}"', f.read())
+            with gzip.open(os.path.join(daily, "burndown-tickets.json.gz")) as f:
+                tickets = json.load(f)
+            completed = tickets["data"][0]["y"]
+            self.assertEqual(
+                [5, 4, 4],
+                list(np.frombuffer(base64.b64decode(completed["bdata"]), "i1")),
+            )
+            self.assertEqual("Tickets", tickets["layout"]["yaxis"]["title"]["text"])
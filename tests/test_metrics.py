@@ -0,0 +1,64 @@
+import unittest
+
+from fake_github import FakeGithub
+
+import client
+import metrics
+
+REPO_PATH = "/repos/ISISComputingGroup/IBEX"
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        client.install()
+        metrics.RUN = metrics.RunMetrics("test")
+
+    def tearDown(self):
+        metrics.RUN = None
+        client.reset_layers()
+
+    def test_GIVEN_requests_in_phase_WHEN_phase_ends_THEN_time_and_requests_recorded(
+        self,
+    ):
+        with FakeGithub({REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}}) as fake:
+            with metrics.phase("lookup"):
+                repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+                self.assertEqual("ISISComputingGroup/IBEX", repo.full_name)
+            with metrics.phase("lookup"):
+                pass
+
+        phase = metrics.RUN.report()["phases"]["lookup"]
+        self.assertEqual((2, 1), (phase["calls"], phase["requests"]))
+        self.assertGreaterEqual(phase["seconds"], 0)
+
+    def test_GIVEN_lazy_object_WHEN_attribute_read_THEN_completion_counted(self):
+        metrics.CompletableGithubObject._complete = metrics._counting_complete
+        try:
+            with FakeGithub(
+                {REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"}}
+            ) as fake:
+                repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+                self.assertEqual("ISISComputingGroup/IBEX", repo.full_name)
+        finally:
+            metrics.CompletableGithubObject._complete = metrics._original_complete
+
+        self.assertEqual({"Repository": 1}, metrics.RUN.report()["lazy_completions"])
+
+    def test_GIVEN_timed_function_WHEN_called_THEN_prometheus_textfile_has_phase(self):
+        @metrics.timed("rule check")
+        def check():
+            return True
+
+        self.assertTrue(check())
+        metrics.RUN.rate_limit["before"] = {"core": 4999}
+
+        text = metrics.RUN.prometheus()
+
+        self.assertIn(
+            'project_board_phase_requests{script="test",phase="rule check"} 0', text
+        )
+        self.assertIn(
+            'project_board_rate_limit_remaining{script="test",when="before",resource="core"} 4999',
+            text,
+        )
+        self.assertIn("# TYPE project_board_run_seconds gauge", text)
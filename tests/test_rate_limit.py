@@ -0,0 +1,168 @@
+import threading
+import unittest
+
+import requests
+
+import rate_limit
+
+RESET = 1_000_000
+
+
+def response(
+    status=200, remaining=100, reset=RESET, resource="core", headers=(), body=b"{}"
+):
+    result = requests.Response()
+    result.status_code = status
+    result.headers.update(
+        {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset),
+            "X-RateLimit-Resource": resource,
+        }
+    )
+    result.headers.update(dict(headers))
+    result._content = body
+    return result
+
+
+def request(path="/repos/ISISComputingGroup/IBEX"):
+    return requests.Request("GET", "https://api.github.com" + path).prepare()
+
+
+class ScriptedAdapter(requests.adapters.BaseAdapter):
+    """Answers with the responses it is given, in order, noting the requests sent."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request.url)
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+class RateLimitSchedulerTests(unittest.TestCase):
+    def scheduler(self, responses, **kwargs):
+        scheduler = rate_limit.RateLimitScheduler(**kwargs)
+        scheduler.inner = ScriptedAdapter(responses)
+        self.now = RESET - 1000
+        self.slept = []
+        scheduler.clock = lambda: self.now
+        scheduler.sleep = self.sleep
+        return scheduler
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+    def test_GIVEN_retry_after_WHEN_sent_THEN_waited_and_retried(self):
+        scheduler = self.scheduler(
+            [response(403, headers={"Retry-After": "30"}), response()]
+        )
+
+        result = scheduler.send(request())
+
+        self.assertEqual(200, result.status_code)
+        self.assertEqual(2, len(scheduler.inner.sent))
+        self.assertEqual([30], self.slept)
+
+    def test_GIVEN_secondary_limit_without_retry_after_WHEN_sent_THEN_waited_a_minute(
+        self,
+    ):
+        body = b'{"message": "You have exceeded a secondary rate limit."}'
+        scheduler = self.scheduler([response(403, body=body), response()])
+
+        scheduler.send(request())
+
+        self.assertEqual([rate_limit.SECONDARY_LIMIT_WAIT], self.slept)
+
+    def test_GIVEN_limit_run_out_and_reset_near_WHEN_sent_THEN_waits_for_reset(self):
+        scheduler = self.scheduler([response(remaining=0), response()], max_wait=2000)
+
+        scheduler.send(request())
+        scheduler.send(request())
+
+        self.assertEqual([1000], self.slept)
+        self.assertEqual(2, len(scheduler.inner.sent))
+
+    def test_GIVEN_limit_run_out_and_reset_far_WHEN_sent_THEN_exhausted(self):
+        scheduler = self.scheduler([response(remaining=0)], max_wait=300)
+        scheduler.send(request())
+
+        with self.assertRaises(rate_limit.RateLimitExhausted):
+            scheduler.send(request())
+        self.assertEqual(1, len(scheduler.inner.sent))
+
+    def test_GIVEN_reserve_WHEN_remaining_reaches_it_THEN_exhausted(self):
+        scheduler = self.scheduler([response(remaining=10)], reserve=10)
+        scheduler.send(request())
+
+        with self.assertRaises(rate_limit.RateLimitExhausted):
+            scheduler.send(request())
+
+    def test_GIVEN_rate_limit_request_WHEN_sent_THEN_not_counted(self):
+        scheduler = self.scheduler([response(remaining=5), response(remaining=5)])
+        scheduler.send(request())
+
+        scheduler.send(request("/rate_limit"))
+
+        self.assertEqual(5, scheduler.budgets["core"].remaining)
+
+    def test_GIVEN_planned_requests_over_budget_WHEN_checked_THEN_fails_with_report(
+        self,
+    ):
+        scheduler = self.scheduler([response(remaining=50)])
+        scheduler.send(request())
+
+        scheduler.check_budget({"core": 40}, "the board checks")
+        with self.assertRaisesRegex(
+            rate_limit.RateLimitExhausted, "the board checks: 60 core"
+        ):
+            scheduler.check_budget({"core": 60, "graphql": 1}, "the board checks")
+
+    def test_GIVEN_budget_resets_soon_WHEN_checked_THEN_passes(self):
+        scheduler = self.scheduler([response(remaining=0, reset=RESET - 900)])
+        scheduler.send(request())
+
+        scheduler.check_budget({"core": 60}, "the board checks")
+
+    def test_GIVEN_one_slot_WHEN_requests_wait_THEN_sent_in_priority_order(self):
+        scheduler = self.scheduler([response() for _ in range(4)], max_concurrency=1)
+        sending = threading.Event()
+        release = threading.Event()
+        sent = scheduler.inner.send
+
+        def blocking_send(request, **kwargs):
+            if not scheduler.inner.sent:
+                sending.set()
+                release.wait(5)
+            return sent(request, **kwargs)
+
+        scheduler.inner.send = blocking_send
+
+        def send(path, level):
+            with rate_limit.priority(level):
+                scheduler.send(request(path))
+
+        threads = [threading.Thread(target=send, args=("/first", rate_limit.NORMAL))]
+        threads[0].start()
+        sending.wait(5)
+        for path, level in [("/low", rate_limit.LOW), ("/high", rate_limit.HIGH)]:
+            thread = threading.Thread(target=send, args=(path, level))
+            thread.start()
+            threads.append(thread)
+            while len(scheduler.queue) < len(threads) - 1:
+                release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(
+            ["/first", "/high", "/low"],
+            [url.rsplit(".com", 1)[1] for url in scheduler.inner.sent],
+        )
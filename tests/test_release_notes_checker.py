@@ -0,0 +1,73 @@
+import io
+import re
+import unittest
+from contextlib import redirect_stdout
+
+from fake_github import FakeGithub
+
+from board import IssueSnapshot
+from release_notes_checker import check_for_dangling_release_notes, ticket_of_pr
+
+REPO = {"full_name": "ISISComputingGroup/IBEX"}
+
+
+def make_issue(number, state):
+    return IssueSnapshot(number, f"Issue {number}", "", state, (), (), None, None)
+
+
+class DanglingReleaseNotesTests(unittest.TestCase):
+    def test_GIVEN_ticket_in_title_WHEN_ticket_read_THEN_title_used(self):
+        self.assertEqual(1234, ticket_of_pr(("Ticket1234: motor", "see #99", "")))
+
+    def test_GIVEN_no_ticket_in_title_WHEN_ticket_read_THEN_number_after_last_slash_of_body(
+        self,
+    ):
+        body = "Fixes https://github.com/ISISComputingGroup/IBEX/issues/1234"
+        self.assertEqual(1234, ticket_of_pr(("Release notes", body, "")))
+        self.assertIsNone(ticket_of_pr(("Release notes", "", "")))
+
+    def test_GIVEN_prs_WHEN_checked_THEN_board_issues_not_queried_and_others_queried_once(
+        self,
+    ):
+        queried = []
+
+        def states(query, variables):
+            numbers = [
+                int(n)
+                for n in re.findall(r"issueOrPullRequest\(number: (\d+)\)", query)
+            ]
+            queried.extend(numbers)
+            return {
+                "repository": {
+                    f"i{n}": {"number": n, "state": "CLOSED"} if n == 20 else None
+                    for n in numbers
+                }
+            }
+
+        prs = [
+            ("Ticket 10: open on board", "", ""),
+            ("Ticket 11: closed on board", "", ""),
+            ("Ticket 20: closed elsewhere", "", ""),
+            ("Ticket 30: no such issue", "", ""),
+            ("Typo fix", "", ""),
+        ]
+        board = {"Review": [make_issue(10, "open")], "Done": [make_issue(11, "closed")]}
+        output = io.StringIO()
+        with FakeGithub({"/repos/ISISComputingGroup/IBEX": REPO}, states) as fake:
+            repo = fake.github().get_repo("ISISComputingGroup/IBEX")
+            with redirect_stdout(output):
+                in_error = check_for_dangling_release_notes(repo, prs, board)
+
+        self.assertTrue(in_error)
+        self.assertEqual([20, 30], sorted(queried))
+        self.assertEqual(1, len([r for r in fake.requests if r[0] == "POST"]))
+        self.assertEqual(
+            [
+                "ERROR: issue 11 is closed but its associated Release note PR titled "
+                + '"Ticket 11: closed on board" is open',
+                "ERROR: issue 20 is closed but its associated Release note PR titled "
+                + '"Ticket 20: closed elsewhere" is open',
+                "INFO: cannot find issue 30",
+            ],
+            output.getvalue().splitlines(),
+        )
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from git import Repo
+
+import release_notes_index
+from release_notes_index import index_text, load_index, version_of
+
+URL = "https://github.com/ISISComputingGroup/IBEX/issues/{}"
+
+
+class ReleaseNotesIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.directory.name, "notes_repo")
+        self.index_file = os.path.join(self.directory.name, "index.json")
+        self.repo = Repo.init(self.repo_path)
+        with self.repo.config_writer() as config:
+            config.set_value("user", "name", "test")
+            config.set_value("user", "email", "test@example.com")
+        os.makedirs(os.path.join(self.repo_path, "release_notes"))
+
+    def tearDown(self):
+        self.repo.close()
+        self.directory.cleanup()
+
+    def commit(self, files):
+        for name, text in files.items():
+            with open(os.path.join(self.repo_path, "release_notes", name), "w") as f:
+                f.write(text)
+        self.repo.git.add("-A")
+        self.repo.git.commit("-m", "notes")
+
+    def load(self):
+        return load_index(self.repo_path, "release_notes", index_file=self.index_file)
+
+    def test_GIVEN_notes_WHEN_text_indexed_THEN_urls_and_ticket_numbers_found(self):
+        text = f"- [Ticket 12]({URL.format(1234)}) and #56\n"
+
+        self.assertEqual(
+            {"urls": [URL.format(1234)], "tickets": [12, 56, 1234]}, index_text(text)
+        )
+
+    def test_GIVEN_release_notes_file_WHEN_version_read_THEN_suffix_of_name(self):
+        self.assertEqual("v12.0.1", version_of("release_notes/ReleaseNotes_v12.0.1.md"))
+        self.assertEqual("Upcoming", version_of("ReleaseNotes_Upcoming.md"))
+
+    def test_GIVEN_url_is_prefix_of_indexed_url_WHEN_looked_up_THEN_not_found(self):
+        self.commit({"ReleaseNotes_v1.md": f"- {URL.format(1234)}\n"})
+
+        index = self.load()
+
+        self.assertIn(URL.format(1234), index)
+        self.assertNotIn(URL.format(123), index)
+        self.assertEqual(
+            [("release_notes/ReleaseNotes_v1.md", "v1")],
+            index.url_locations(URL.format(1234)),
+        )
+
+    def test_GIVEN_saved_index_at_head_WHEN_loaded_THEN_no_files_read(self):
+        self.commit({"ReleaseNotes_v1.md": URL.format(1)})
+        self.load()
+
+        with patch.object(release_notes_index, "_index_files") as index_files:
+            index = self.load()
+
+        index_files.assert_not_called()
+        self.assertIn(URL.format(1), index)
+
+    def test_GIVEN_new_commit_WHEN_loaded_THEN_only_changed_files_reindexed(self):
+        self.commit(
+            {"ReleaseNotes_v1.md": URL.format(1), "ReleaseNotes_v2.md": URL.format(2)}
+        )
+        self.load()
+        self.commit(
+            {"ReleaseNotes_v2.md": URL.format(3), "ReleaseNotes_v3.md": URL.format(4)}
+        )
+
+        with patch.object(
+            release_notes_index, "_index_files", wraps=release_notes_index._index_files
+        ) as index_files:
+            index = self.load()
+
+        self.assertEqual(
+            ["release_notes/ReleaseNotes_v2.md", "release_notes/ReleaseNotes_v3.md"],
+            sorted(index_files.call_args.args[1]),
+        )
+        self.assertEqual(
+            [URL.format(n) for n in (1, 3, 4)],
+            sorted(index.urls),
+            "v2 link should be replaced",
+        )
+        self.assertEqual(self.repo.head.commit.hexsha, index.commit)
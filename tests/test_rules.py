@@ -0,0 +1,104 @@
+import datetime
+import io
+import unittest
+
+from board import IssueSnapshot, Label, Milestone, PullRequestCard, User
+from history import IssueHistory
+from rules import Report, active_rules, check_board, plan
+
+SPRINT = Milestone(7, "SPRINT_2024_01_04", "open", None, None)
+
+
+def make_issue(number, labels=(), assignees=("al",), milestone=SPRINT):
+    return IssueSnapshot(
+        number=number,
+        title=f"Issue {number}",
+        html_url=f"https://github.com/ISISComputingGroup/IBEX/issues/{number}",
+        state="open",
+        labels=tuple(Label(name) for name in labels),
+        assignees=tuple(User(login) for login in assignees),
+        milestone=milestone,
+        updated_at=None,
+    )
+
+
+def days_ago(days):
+    return datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=days)
+
+
+class RulesTests(unittest.TestCase):
+    def check(self, board, histories=None, skip=()):
+        report = Report(io.StringIO())
+        stats = check_board(board, histories or {}, report, active_rules(skip))
+        return report, stats
+
+    def test_GIVEN_board_WHEN_planned_THEN_history_only_needed_for_stale_checked_columns(
+        self,
+    ):
+        board = {
+            "Bucket": [make_issue(1, ["bucket"], milestone=None)],
+            "Ready": [make_issue(2, ["ready", "3"]), PullRequestCard(5, "PR")],
+            "Complete": [make_issue(3, ["3"])],
+            "Impeded": [make_issue(4, ["impeded", "1"])],
+            "Sprint 1": [make_issue(6)],
+        }
+
+        needs = plan(board, active_rules())
+
+        self.assertEqual([2, 4], [issue.number for issue in needs["history"]])
+
+    def test_GIVEN_stale_rules_skipped_WHEN_planned_THEN_no_histories_needed(self):
+        board = {"Ready": [make_issue(2, ["ready", "3"])]}
+
+        needs = plan(board, active_rules(["stale", "impeded_comments"]))
+
+        self.assertNotIn("history", needs)
+
+    def test_GIVEN_unknown_rule_WHEN_skipped_THEN_error(self):
+        with self.assertRaises(KeyError):
+            active_rules(["no such rule"])
+
+    def test_GIVEN_ticket_in_review_for_too_long_WHEN_checked_THEN_error_counted_as_warning(
+        self,
+    ):
+        board = {"Review": [make_issue(30, ["review", "5"])]}
+        histories = {30: IssueHistory({"review": days_ago(40)}, None)}
+
+        report, _ = self.check(board, histories)
+
+        self.assertIn(
+            'ERROR: Issue 30 (Issue 30) has been in "review" for 40 days',
+            report.stream.getvalue(),
+        )
+        self.assertEqual((0, 1), (report.num_errors, report.num_warnings))
+
+    def test_GIVEN_unsized_ticket_WHEN_size_rule_skipped_THEN_no_error(self):
+        board = {"Ready": [make_issue(2, ["ready"])]}
+        histories = {2: IssueHistory({}, None)}
+
+        report, _ = self.check(board, histories)
+        skipped_report, _ = self.check(board, histories, skip=["size"])
+
+        self.assertEqual(1, report.num_errors)
+        self.assertEqual(0, skipped_report.num_errors)
+
+    def test_GIVEN_board_WHEN_checked_THEN_points_and_tickets_totalled_per_column(self):
+        board = {
+            "Review": [
+                make_issue(30, ["review", "under review", "5"]),
+                make_issue(31, ["review", "3", "rework", "added during sprint"]),
+            ],
+        }
+        histories = {30: IssueHistory({}, None), 31: IssueHistory({}, None)}
+
+        _, stats = self.check(board, histories)
+
+        self.assertEqual(8, sum(stats.column_points.values()))
+        self.assertEqual(2, sum(stats.column_tickets.values()))
+        self.assertEqual({30: 5, 31: 3}, stats.issue_size)
+        self.assertEqual(
+            (1, 5), (stats.tickets_under_review, stats.points_under_review)
+        )
+        self.assertEqual(1, stats.completed_rework)
+        self.assertEqual(3, stats.points_added_during_sprint)
+        self.assertEqual([SPRINT.title] * 2, stats.milestones)
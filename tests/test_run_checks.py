@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from git import GitCommandError
+
+import run_checks
+
+BOARD = {"Review": []}
+OTHER_BOARD = {"Ready": []}
+PRS = [("Ticket 1", "", "")]
+
+
+async def fake_prs(repo, file_changed, max_concurrency):
+    return PRS
+
+
+def fake_get_board(repo, project, *args):
+    print(f"## Checking project {project} ##\n")
+    return BOARD if project == "IBEX Project Board" else OTHER_BOARD
+
+
+def fake_card_check(repo, board, args, report, milestones, prefix):
+    report.error("ERROR: from the board checks")
+    return report.num_errors
+
+
+def fake_release_notes_check(repo, board, prs, release_notes, store):
+    print("ERROR: from the release notes checks")
+    return True
+
+
+class RunChecksTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.summary = os.path.join(self.directory.name, "summary.txt")
+        self.release_notes_output = os.path.join(
+            self.directory.name, "release_notes.txt"
+        )
+        self.release_notes = MagicMock()
+        patches = [
+            patch.object(run_checks, "get_IBEX_repo"),
+            patch.object(run_checks.metrics, "start"),
+            patch.object(run_checks.rate_limit, "start"),
+            patch.object(run_checks.card, "get_board", side_effect=fake_get_board),
+            patch.object(
+                run_checks, "get_all_info_for_PRs_async", side_effect=fake_prs
+            ),
+            patch.object(
+                run_checks.release_notes_checker,
+                "update_release_notes",
+                return_value=self.release_notes,
+            ),
+            patch.object(run_checks.card, "check", side_effect=fake_card_check),
+            patch.object(
+                run_checks.release_notes_checker,
+                "check",
+                side_effect=fake_release_notes_check,
+            ),
+        ]
+        self.mocks = [p.start() for p in patches]
+        for p in patches:
+            self.addCleanup(p.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def run_checks(self, *argv):
+        return run_checks.main(
+            [
+                "--summary",
+                self.summary,
+                "--release-notes-output",
+                self.release_notes_output,
+            ]
+            + list(argv)
+        )
+
+    def test_GIVEN_both_checks_WHEN_run_THEN_board_prs_and_release_notes_fetched_once(
+        self,
+    ):
+        self.run_checks()
+
+        _, _, _, get_board, get_prs, update_release_notes, card_check, notes_check = (
+            self.mocks
+        )
+        self.assertEqual(1, get_board.call_count)
+        self.assertEqual(1, get_prs.call_count)
+        self.assertEqual(1, update_release_notes.call_count)
+        self.assertIs(BOARD, card_check.call_args.args[1])
+        self.assertEqual(
+            (BOARD, PRS, self.release_notes, None), notes_check.call_args.args[1:]
+        )
+
+    def test_GIVEN_both_checks_WHEN_run_THEN_outputs_written_separately_with_project_header(
+        self,
+    ):
+        exit_code = self.run_checks()
+
+        with open(self.summary) as f:
+            summary = f.read()
+        with open(self.release_notes_output) as f:
+            release_notes = f.read()
+        self.assertEqual(1, exit_code)
+        self.assertTrue(summary.startswith("## Checking project IBEX Project Board ##"))
+        self.assertTrue(
+            release_notes.startswith("## Checking project IBEX Project Board ##")
+        )
+        self.assertIn("from the board checks", summary)
+        self.assertNotIn("from the release notes checks", summary)
+        self.assertIn("from the release notes checks", release_notes)
+
+    def test_GIVEN_two_boards_WHEN_run_THEN_summary_per_board_and_release_notes_on_first(
+        self,
+    ):
+        exit_code = self.run_checks(
+            "--project", "IBEX Project Board", "--project", "Reflectometry"
+        )
+
+        with open(self.summary) as f:
+            summary = f.read()
+        with open(os.path.join(self.directory.name, "reflectometry-summary.txt")) as f:
+            other_summary = f.read()
+        _, _, _, get_board, _, _, card_check, notes_check = self.mocks
+        self.assertEqual(1, exit_code)
+        self.assertEqual(2, get_board.call_count)
+        self.assertTrue(summary.startswith("## Checking project IBEX Project Board ##"))
+        self.assertTrue(
+            other_summary.startswith("## Checking project Reflectometry ##")
+        )
+        self.assertIs(BOARD, notes_check.call_args.args[1])
+        shared = {call.args[4] for call in card_check.call_args_list}
+        self.assertEqual(1, len(shared))
+
+    def test_GIVEN_board_errors_only_WHEN_run_THEN_exit_code_of_release_notes_checks(
+        self,
+    ):
+        self.mocks[-1].side_effect = lambda *args: False
+
+        self.assertEqual(0, self.run_checks())
+
+    def test_GIVEN_release_notes_update_fails_WHEN_run_THEN_summary_written_and_failure_reported(
+        self,
+    ):
+        self.mocks[5].side_effect = GitCommandError("pull", 128)
+
+        exit_code = self.run_checks()
+
+        with open(self.summary) as f:
+            summary = f.read()
+        with open(self.release_notes_output) as f:
+            release_notes = f.read()
+        self.assertEqual(1, exit_code)
+        self.assertIn("from the board checks", summary)
+        self.assertTrue(
+            release_notes.startswith("## Checking project IBEX Project Board ##")
+        )
+        self.assertIn(
+            "ERROR: cannot update the release notes: Cmd('pull')", release_notes
+        )
+        self.mocks[-1].assert_not_called()
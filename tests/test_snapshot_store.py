@@ -0,0 +1,177 @@
+import datetime
+import io
+import os
+import re
+import tempfile
+import unittest
+
+from fake_github import FakeGithub
+
+from rules import Report, active_rules, check_board
+from snapshot_store import sync_board
+
+REPO_PATH = "/repos/ISISComputingGroup/IBEX"
+PROJECT = "IBEX Project Board"
+
+
+def make_issue_node(number, labels=()):
+    return {
+        "number": number,
+        "title": f"Issue {number}",
+        "url": f"https://github.com/ISISComputingGroup/IBEX/issues/{number}",
+        "state": "OPEN",
+        "updatedAt": "2024-01-02T03:04:05Z",
+        "labels": {"nodes": [{"name": name} for name in labels]},
+        "assignees": {"nodes": [{"login": "alice"}]},
+        "milestone": {
+            "number": 7,
+            "title": "SPRINT_2024_01_04",
+            "state": "OPEN",
+            "dueOn": None,
+            "description": None,
+        },
+    }
+
+
+def make_rest_issue(number, labels=()):
+    return {
+        "number": number,
+        "title": f"Issue {number} renamed",
+        "html_url": f"https://github.com/ISISComputingGroup/IBEX/issues/{number}",
+        "state": "open",
+        "updated_at": "2024-01-03T00:00:00Z",
+        "labels": [{"name": name} for name in labels],
+        "assignees": [],
+        "assignee": None,
+        "milestone": None,
+    }
+
+
+class FakeProject:
+    def __init__(self):
+        self.items = []
+        self.issues = {}
+        self.issue_queries = []
+
+    def __call__(self, query, variables):
+        if "projectsV2" in query:
+            project = {
+                "id": "PROJECT",
+                "title": PROJECT,
+                "field": {"options": [{"name": "Bucket"}, {"name": "Review"}]},
+            }
+            return {"repository": {"projectsV2": {"nodes": [project]}}}
+        if "items(" in query:
+            nodes = [
+                {
+                    "status": {"name": column},
+                    "content": {"__typename": "Issue", "number": number},
+                }
+                for column, number in self.items
+            ]
+            return {
+                "node": {
+                    "items": {
+                        "pageInfo": {"hasNextPage": False, "endCursor": None},
+                        "nodes": nodes,
+                    }
+                }
+            }
+        numbers = [int(n) for n in re.findall(r"issue\(number: (\d+)\)", query)]
+        self.issue_queries.append(numbers)
+        return {"repository": {f"i{n}": self.issues[n] for n in numbers}}
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "board.sqlite")
+        self.project = FakeProject()
+        self.rest = {
+            REPO_PATH: {"full_name": "ISISComputingGroup/IBEX"},
+            REPO_PATH + "/issues": [],
+            REPO_PATH + "/milestones": [],
+        }
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def sync(self):
+        with FakeGithub(self.rest, self.project) as fake:
+            return sync_board(
+                fake.github().get_repo("ISISComputingGroup/IBEX"), PROJECT, self.path
+            )
+
+    def test_GIVEN_empty_store_WHEN_synced_THEN_board_loaded_from_store(self):
+        self.project.items = [("Bucket", 1), ("Review", 2)]
+        self.project.issues = {
+            1: make_issue_node(1, ["bucket"]),
+            2: make_issue_node(2, ["review"]),
+        }
+
+        board = self.sync()
+
+        self.assertEqual(["Bucket", "Review"], list(board))
+        self.assertEqual([1], [issue.number for issue in board["Bucket"]])
+        review = board["Review"][0]
+        self.assertEqual(["review"], [label.name for label in review.labels])
+        self.assertEqual("alice", review.assignee.login)
+        self.assertEqual(("SPRINT_2024_01_04", "open"), review.milestone[1:3])
+
+    def test_GIVEN_synced_store_WHEN_synced_again_THEN_only_changes_fetched(self):
+        self.project.items = [("Bucket", 1), ("Review", 2)]
+        self.project.issues = {
+            1: make_issue_node(1, ["bucket"]),
+            2: make_issue_node(2, ["review"]),
+        }
+        self.sync()
+
+        self.project.items = [("Bucket", 1), ("Bucket", 2), ("Review", 3)]
+        self.project.issues[3] = make_issue_node(3, ["review"])
+        self.rest[REPO_PATH + "/issues"] = [make_rest_issue(1, ["bucket", "3"])]
+        board = self.sync()
+
+        self.assertEqual([[1, 2], [3]], self.project.issue_queries)
+        self.assertEqual([1, 2], [issue.number for issue in board["Bucket"]])
+        self.assertEqual([3], [issue.number for issue in board["Review"]])
+        updated = board["Bucket"][0]
+        self.assertEqual("Issue 1 renamed", updated.title)
+        self.assertEqual(["bucket", "3"], [label.name for label in updated.labels])
+        self.assertIsNone(updated.milestone)
+
+    def test_GIVEN_milestone_closed_between_syncs_WHEN_synced_THEN_closed_milestone_reported(
+        self,
+    ):
+        self.project.items = [("Bucket", 2)]
+        self.project.issues = {2: make_issue_node(2, ["bucket"])}
+        self.sync()
+
+        closed_at = datetime.datetime.now(datetime.UTC) + datetime.timedelta(minutes=1)
+        self.rest[REPO_PATH + "/milestones"] = [
+            {
+                "number": 7,
+                "title": "SPRINT_2024_01_04",
+                "state": "closed",
+                "due_on": "2024-01-18T00:00:00Z",
+                "description": None,
+                "updated_at": closed_at.isoformat().replace("+00:00", "Z"),
+            },
+            {
+                "number": 6,
+                "title": "SPRINT_2023_12_01",
+                "state": "closed",
+                "updated_at": "2024-01-01T00:00:00Z",
+            },
+        ]
+        board = self.sync()
+
+        milestone = board["Bucket"][0].milestone
+        self.assertEqual(
+            ("closed", datetime.date(2024, 1, 18)),
+            (milestone.state, milestone.due_on.date()),
+        )
+        output = io.StringIO()
+        check_board(board, {}, Report(output), active_rules())
+        self.assertIn(
+            "ERROR: issue 2 (Issue 2) has a closed milestone", output.getvalue()
+        )
@@ -0,0 +1,96 @@
+import datetime
+import unittest
+
+from benchmarks.run_benchmarks import compare
+from benchmarks.synthetic_board import PROJECT, REPO, SyntheticBoard, SyntheticGithub
+from board import DraftCard, PullRequestCard, load_board
+from utils import get_all_info_for_PRs
+
+NOW = datetime.datetime(2024, 1, 10, tzinfo=datetime.UTC)
+
+
+def result(seconds=1.0, requests=10):
+    return {
+        "seconds": seconds,
+        "peak_mib": 10.0,
+        "requests": requests,
+        "graphql_requests": 0,
+        "phases": {"project lookup": {"seconds": seconds, "requests": requests}},
+    }
+
+
+class SyntheticBoardTests(unittest.TestCase):
+    def test_GIVEN_same_size_and_seed_WHEN_built_twice_THEN_same_board(self):
+        first = SyntheticBoard(300, now=NOW)
+        second = SyntheticBoard(300, now=NOW)
+
+        self.assertEqual(first.items, second.items)
+        self.assertEqual(first.pulls, second.pulls)
+        self.assertEqual(first.release_notes, second.release_notes)
+
+    def test_GIVEN_served_board_WHEN_loaded_THEN_every_card_is_loaded_in_pages(self):
+        synthetic = SyntheticBoard(250, now=NOW)
+
+        with SyntheticGithub(synthetic) as fake:
+            board = load_board(fake.github().get_repo(REPO), PROJECT)
+
+        cards = [card for contents in board.values() for card in contents]
+        self.assertEqual(250, len(cards))
+        self.assertEqual(
+            len(synthetic.issues),
+            sum(not isinstance(card, (DraftCard, PullRequestCard)) for card in cards),
+        )
+        self.assertEqual(3, sum(method == "POST" for method, _, _ in fake.requests) - 1)
+
+    def test_GIVEN_served_board_WHEN_listing_milestone_issues_THEN_all_are_listed(self):
+        synthetic = SyntheticBoard(400, now=NOW)
+        current = synthetic.current_milestone["number"]
+
+        with SyntheticGithub(synthetic) as fake:
+            repo = fake.github().get_repo(REPO)
+            (milestone,) = [
+                m for m in repo.get_milestones(state="open") if m.number == current
+            ]
+            issues = list(repo.get_issues(milestone=milestone, state="all"))
+
+        self.assertEqual(
+            [issue["number"] for issue in synthetic.milestone_issues[current]],
+            [issue.number for issue in issues],
+        )
+
+    def test_GIVEN_served_pull_requests_WHEN_got_THEN_release_notes_changes_found(self):
+        synthetic = SyntheticBoard(300, now=NOW)
+
+        with SyntheticGithub(synthetic) as fake:
+            prs = get_all_info_for_PRs(
+                fake.github().get_repo(REPO), "ReleaseNotes_Upcoming.md"
+            )
+
+        self.assertEqual(
+            [pull["title"] for pull in synthetic.pulls], [pr[0] for pr in prs]
+        )
+        self.assertTrue(any("/issues/" in pr[2] for pr in prs))
+
+
+class CompareTests(unittest.TestCase):
+    def test_GIVEN_more_requests_than_baseline_WHEN_compared_THEN_regression(self):
+        regressions = compare({"card 500": result(requests=11)}, {"card 500": result()})
+
+        self.assertEqual(["card 500: 11 requests, baseline 10"], regressions)
+
+    def test_GIVEN_time_within_tolerance_WHEN_compared_THEN_no_regression(self):
+        regressions = compare(
+            {"card 500": result(seconds=1.2)}, {"card 500": result()}, 0.25
+        )
+
+        self.assertEqual([], regressions)
+
+    def test_GIVEN_time_over_tolerance_WHEN_compared_THEN_regression(self):
+        regressions = compare(
+            {"card 500": result(seconds=1.5)}, {"card 500": result()}, 0.25
+        )
+
+        self.assertEqual(["card 500: 1.50s seconds, baseline 1.00s"], regressions)
+
+    def test_GIVEN_case_without_baseline_WHEN_compared_THEN_no_regression(self):
+        self.assertEqual([], compare({"card 500": result()}, {}))
@@ -1,7 +1,23 @@
+import asyncio
+import functools
+import os
+import tempfile
+import time
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
-from utils import get_all_info_for_PRs, ticket_mentioned_in_pr
+from git import Git, GitCommandError, Repo
+
+import utils
+from utils import (
+    PRReference,
+    TicketReferences,
+    get_all_info_for_PRs,
+    get_all_info_for_PRs_async,
+    get_column_contents,
+    pull_or_clone_repository,
+    ticket_mentioned_in_pr,
+)
 
 
 def make_pr_mock(title, content, file_changes):
@@ -18,6 +34,27 @@ def make_pr_mock(title, content, file_changes):
     return pr
 
 
+def delayed(content, delay):
+    time.sleep(delay)
+    return content
+
+
+def make_column_mock(name, contents):
+    column = MagicMock()
+    column.name = name
+    cards = []
+    for index, content in enumerate(contents):
+        card = MagicMock()
+
+        # later cards finish first to check results are kept in board order
+        card.get_content.side_effect = functools.partial(
+            delayed, content, 0.01 * (len(contents) - index)
+        )
+        cards.append(card)
+    column.get_cards.return_value = cards
+    return column
+
+
 class GithubUtilsTests(unittest.TestCase):
     def setUp(self):
         self.repository = MagicMock()
@@ -44,7 +81,9 @@ class GithubUtilsTests(unittest.TestCase):
         filename = "my_file"
         file_changes = "test_changes"
 
-        self.pulls.append(make_pr_mock(expected_title, expected_content, {filename: file_changes}))
+        self.pulls.append(
+            make_pr_mock(expected_title, expected_content, {filename: file_changes})
+        )
 
         pr_info = get_all_info_for_PRs(self.repository, filename)
 
@@ -58,17 +97,23 @@ class GithubUtilsTests(unittest.TestCase):
         filename = "my_file"
         file_changes = "test_changes"
 
-        self.pulls.append(make_pr_mock(expected_title, expected_content, {filename: file_changes}))
+        self.pulls.append(
+            make_pr_mock(expected_title, expected_content, {filename: file_changes})
+        )
 
         pr_info = get_all_info_for_PRs(self.repository, "not_file")
 
         self.assertEqual((expected_title, expected_content, ""), pr_info[0])
 
-    def test_GIVEN_PR_with_ticket_number_in_title_WHEN_prs_checked_THEN_returns_true(self):
+    def test_GIVEN_PR_with_ticket_number_in_title_WHEN_prs_checked_THEN_returns_true(
+        self,
+    ):
         pr_infos = [("Ticket 1000", "Some body text", "Some code changes")]
         self.assertTrue(ticket_mentioned_in_pr(1000, pr_infos))
 
-    def test_GIVEN_PR_with_url_to_ticket_in_code_WHEN_prs_checked_THEN_returns_true(self):
+    def test_GIVEN_PR_with_url_to_ticket_in_code_WHEN_prs_checked_THEN_returns_true(
+        self,
+    ):
         pr_infos = [
             (
                 "Bad title",
@@ -78,20 +123,254 @@ class GithubUtilsTests(unittest.TestCase):
         ]
         self.assertTrue(ticket_mentioned_in_pr(1000, pr_infos))
 
-    def test_GIVEN_PR_with_ticket_not_mentioned_WHEN_prs_checked_THEN_returns_false(self):
+    def test_GIVEN_PR_with_ticket_not_mentioned_WHEN_prs_checked_THEN_returns_false(
+        self,
+    ):
         pr_infos = [("Bad title", "Some body text", "some code changes")]
         self.assertFalse(ticket_mentioned_in_pr(1000, pr_infos))
 
-    def test_GIVEN_two_PRs_with_ticket_mentioned_in_first_WHEN_prs_checked_THEN_returns_true(self):
+    def test_GIVEN_two_PRs_with_ticket_mentioned_in_first_WHEN_prs_checked_THEN_returns_true(
+        self,
+    ):
         pr_infos = [
             ("Ticket 1000", "Some body text", "some code changes"),
             ("Bad title", "Some body text", "some code changes"),
         ]
         self.assertTrue(ticket_mentioned_in_pr(1000, pr_infos))
 
-    def test_GIVEN_two_PRs_with_ticket_mentioned_in_second_WHEN_prs_checked_THEN_returns_true(self):
+    def test_GIVEN_two_PRs_with_ticket_mentioned_in_second_WHEN_prs_checked_THEN_returns_true(
+        self,
+    ):
         pr_infos = [
             ("Bad title", "Some body text", "some code changes"),
             ("Ticket 1000", "Some body text", "some code changes"),
         ]
         self.assertTrue(ticket_mentioned_in_pr(1000, pr_infos))
+
+    def test_GIVEN_PR_mentioning_longer_ticket_number_WHEN_prs_checked_THEN_returns_false(
+        self,
+    ):
+        pr_infos = [
+            (
+                "Ticket 1234",
+                "see #12345",
+                "https://github.com/ISISComputingGroup/IBEX/issues/1230",
+            )
+        ]
+        self.assertFalse(ticket_mentioned_in_pr(123, pr_infos))
+
+    def test_GIVEN_ticket_in_title_and_body_WHEN_prs_checked_THEN_in_title_and_anywhere(
+        self,
+    ):
+        pr_infos = [("Ticket1000_fix_motor", "", ""), ("Other", "Fixes #1000", "")]
+        self.assertEqual((True, True), ticket_mentioned_in_pr(1000, pr_infos))
+        self.assertEqual((False, False), ticket_mentioned_in_pr(999, pr_infos))
+
+    def test_GIVEN_PRs_WHEN_references_indexed_THEN_each_PR_flags_where_ticket_mentioned(
+        self,
+    ):
+        pr_infos = [
+            (
+                "Ticket 1000: motor",
+                "",
+                "+ [Ticket 1000](https://github.com/x/IBEX/issues/1000)",
+            ),
+            ("Ticket 2000", "Follows on from #1000", ""),
+        ]
+
+        references = TicketReferences(pr_infos)
+
+        self.assertEqual(
+            [PRReference(0, True, False, True), PRReference(1, False, True, False)],
+            references.prs_referring_to(1000),
+        )
+        self.assertEqual(
+            [PRReference(1, True, False, False)], references.prs_referring_to(2000)
+        )
+
+    def test_GIVEN_columns_WHEN_contents_fetched_concurrently_THEN_contents_in_board_order(
+        self,
+    ):
+        columns = [
+            make_column_mock("Bucket", [1, 2, 3]),
+            make_column_mock("Review", [4, 5]),
+        ]
+
+        board = get_column_contents(columns, workers=4)
+
+        self.assertEqual({"Bucket": [1, 2, 3], "Review": [4, 5]}, board)
+
+    def test_GIVEN_sprint_column_WHEN_contents_fetched_THEN_cards_not_fetched(self):
+        column = make_column_mock("Sprint 1", [1])
+
+        board = get_column_contents([column])
+
+        self.assertEqual({"Sprint 1": []}, board)
+        column.get_cards.assert_not_called()
+
+
+class FakePaginatedList:
+    def __init__(self, elements, per_page):
+        self.elements = elements
+        self.per_page = per_page
+        self.pages_fetched = []
+
+    @property
+    def totalCount(self):
+        return len(self.elements)
+
+    def get_page(self, page):
+        self.pages_fetched.append(page)
+        return self.elements[page * self.per_page : (page + 1) * self.per_page]
+
+
+class AsyncGithubUtilsTests(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.pulls = []
+        self.repository.get_pulls.return_value = self.pulls
+
+    def get_info(self, file_changed):
+        return asyncio.run(get_all_info_for_PRs_async(self.repository, file_changed, 2))
+
+    def test_GIVEN_PR_with_file_changed_WHEN_get_info_called_with_filename_THEN_same_as_sync(
+        self,
+    ):
+        self.pulls.append(
+            make_pr_mock("TEST_TITLE", "MY_CONTENT", {"my_file": "test_changes"})
+        )
+        self.pulls.append(make_pr_mock("OTHER", None, {"not_file": "other_changes"}))
+
+        self.assertEqual(
+            get_all_info_for_PRs(self.repository, "my_file"), self.get_info("my_file")
+        )
+        self.assertEqual(
+            [("TEST_TITLE", "MY_CONTENT", "test_changes"), ("OTHER", "", "")],
+            self.get_info("my_file"),
+        )
+
+    def test_GIVEN_paginated_PRs_WHEN_get_info_called_THEN_every_page_fetched_in_order(
+        self,
+    ):
+        prs = [make_pr_mock(f"Ticket {i}", "", {}) for i in range(7)]
+        pulls = FakePaginatedList(prs, per_page=3)
+        self.repository.get_pulls.return_value = pulls
+        self.repository.requester.per_page = 3
+
+        pr_info = self.get_info("my_file")
+
+        self.assertEqual(
+            [f"Ticket {i}" for i in range(7)], [info[0] for info in pr_info]
+        )
+        self.assertEqual([0, 1, 2], sorted(pulls.pages_fetched))
+
+
+class PullOrCloneTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.remote_path = os.path.join(self.directory.name, "remote.git")
+        self.work_path = os.path.join(self.directory.name, "work")
+        self.clone_path = os.path.join(self.directory.name, "clone")
+        Git().init("--bare", "--initial-branch", "master", self.remote_path)
+        # a filtered clone needs the server to allow filters
+        Repo(self.remote_path).git.config("uploadpack.allowFilter", "true")
+        self.work = Repo.clone_from(self.remote_path, self.work_path)
+        with self.work.config_writer() as config:
+            config.set_value("user", "name", "test")
+            config.set_value("user", "email", "test@example.com")
+        self.url = "file://" + self.remote_path
+        self.push({"release_notes/ReleaseNotes_v1.md": "v1", "src/big.bin": "x" * 1000})
+        self.patcher = patch.object(utils, "UPDATED_REPOSITORIES", set())
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.directory.cleanup()
+
+    def push(self, files):
+        for name, text in files.items():
+            path = os.path.join(self.work_path, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+        self.work.git.add("-A")
+        self.work.git.commit("-m", "change")
+        self.work.git.push("origin", "HEAD:master")
+
+    def test_GIVEN_sparse_paths_WHEN_cloned_THEN_only_those_folders_checked_out(self):
+        pull_or_clone_repository(
+            self.clone_path, self.url, sparse_paths=["release_notes"]
+        )
+
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.clone_path, "release_notes", "ReleaseNotes_v1.md")
+            )
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.clone_path, "src")))
+        self.assertEqual(
+            "blob:none",
+            Repo(self.clone_path).git.config("remote.origin.partialclonefilter"),
+        )
+
+    def test_GIVEN_remote_head_not_moved_WHEN_updated_THEN_no_pull(self):
+        pull_or_clone_repository(
+            self.clone_path, self.url, sparse_paths=["release_notes"]
+        )
+        utils.UPDATED_REPOSITORIES.clear()
+
+        with patch("git.remote.Remote.pull") as pull:
+            pull_or_clone_repository(
+                self.clone_path, self.url, sparse_paths=["release_notes"]
+            )
+
+        pull.assert_not_called()
+
+    def test_GIVEN_remote_head_moved_WHEN_updated_THEN_new_notes_pulled(self):
+        pull_or_clone_repository(
+            self.clone_path, self.url, sparse_paths=["release_notes"]
+        )
+        utils.UPDATED_REPOSITORIES.clear()
+        self.push({"release_notes/ReleaseNotes_v2.md": "v2"})
+
+        pull_or_clone_repository(
+            self.clone_path, self.url, sparse_paths=["release_notes"]
+        )
+
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.clone_path, "release_notes", "ReleaseNotes_v2.md")
+            )
+        )
+
+    def test_GIVEN_repository_updated_WHEN_updated_again_in_same_process_THEN_remote_not_read(
+        self,
+    ):
+        pull_or_clone_repository(
+            self.clone_path, self.url, sparse_paths=["release_notes"]
+        )
+        self.push({"release_notes/ReleaseNotes_v2.md": "v2"})
+
+        pull_or_clone_repository(
+            self.clone_path, self.url, sparse_paths=["release_notes"]
+        )
+
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.clone_path, "release_notes", "ReleaseNotes_v2.md")
+            )
+        )
+
+    def test_GIVEN_branch_missing_from_remote_WHEN_updated_THEN_error_names_branch(
+        self,
+    ):
+        pull_or_clone_repository(
+            self.clone_path, self.url, sparse_paths=["release_notes"]
+        )
+        utils.UPDATED_REPOSITORIES.clear()
+        Repo(self.remote_path).git.branch("-m", "master", "main")
+
+        with self.assertRaisesRegex(GitCommandError, "master"):
+            pull_or_clone_repository(
+                self.clone_path, self.url, sparse_paths=["release_notes"]
+            )
@@ -1,10 +1,26 @@
+import asyncio
+import contextlib
+import functools
 import glob
+import io
 import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 from git import Git, InvalidGitRepositoryError, NoSuchPathError, Repo
 from github import Github, Issue, Repository
-from local_defs import GITHUB_TOKEN
+
+import cassette
+import client
+import rate_limit
+from board import IssueSnapshot, load_board
+from http_cache import CachingAdapter, ResponseCache
+from snapshot_store import sync_board
+
+HTTP_CACHE_DIR = "http_cache"
 
 
 class COLUMNS(Enum):
@@ -39,8 +55,33 @@ class COLUMNS(Enum):
         return self.value
 
 
-def get_IBEX_repo():
-    github = Github(GITHUB_TOKEN)
+def github_token():
+    """
+    The token in local_defs.py, or in the GITHUB_TOKEN environment variable if there is no
+    local_defs.py. None if neither is set, which is enough to replay a recorded run.
+    """
+    try:
+        from local_defs import GITHUB_TOKEN
+    except ImportError:
+        return os.environ.get("GITHUB_TOKEN")
+    return GITHUB_TOKEN
+
+
+def get_IBEX_repo(cache_dir=HTTP_CACHE_DIR):
+    """
+    Gets the IBEX repository.
+    Args:
+        cache_dir: Directory to cache responses in between runs, None to not cache.
+            Responses are not cached while recording or replaying.
+    """
+    client.install()
+    if (
+        cache_dir is not None
+        and client.find_layer(CachingAdapter) is None
+        and not cassette.in_use()
+    ):
+        client.add_layer(CachingAdapter(ResponseCache(cache_dir)))
+    github = Github(github_token())
     return github.get_repo("ISISComputingGroup/IBEX")
 
 
@@ -79,6 +120,90 @@ def sort_cards_into_columns(columns):
     return columns_dict
 
 
+def _get_content(level, card):
+    with rate_limit.priority(level):
+        return card.get_content()
+
+
+def get_column_contents(columns, workers=1):
+    """
+    Get the content of every card on the board using the REST API.
+    Cards in ignored columns are not fetched.
+    Args:
+        columns: The project columns
+        workers: The number of card contents to fetch concurrently
+    Return:
+        A dictionary of column name: list of card contents, with columns and cards in board order
+    """
+    with ThreadPoolExecutor(workers) as executor:
+        pending = {}
+        for column in columns:
+            if COLUMNS.from_value(column.name) is COLUMNS.IGNORED:
+                pending[column.name] = []
+            else:
+                # the workflow columns are checked most, so Bucket waits for them
+                level = (
+                    rate_limit.LOW
+                    if COLUMNS.from_value(column.name)
+                    in (COLUMNS.BUCKET, COLUMNS.UNKNOWN)
+                    else rate_limit.NORMAL
+                )
+                pending[column.name] = executor.map(
+                    functools.partial(_get_content, level), column.get_cards()
+                )
+        return {name: list(contents) for name, contents in pending.items()}
+
+
+def get_board(repo, project_board_name, backend="graphql", store=None, workers=1):
+    """
+    Gets the content of every card on the specified project board.
+    Args:
+        repo: The repository to search
+        project_board_name: The name of the project to load
+        backend: "graphql" to bulk load a projects (v2) board, "rest" to load a classic board
+            card by card
+        store: SQLite snapshot file to sync incrementally and load the board from (graphql only)
+        workers: The number of requests to make concurrently
+    Return:
+        A dictionary of column name: list of card contents, with columns in board order
+    """
+    if store is not None and backend == "graphql":
+        return sync_board(repo, project_board_name, store, workers)
+    if backend == "rest":
+        return get_column_contents(
+            get_project_columns(repo, project_board_name), workers
+        )
+    return load_board(repo, project_board_name)
+
+
+def sort_board_into_columns(board):
+    """
+    Get a dictionary of column: issues for every column of a board from get_board.
+    """
+    columns_dict = {}
+    for name, contents in board.items():
+        columns_dict[COLUMNS.from_value(name)] = [
+            content for content in contents if is_issue(content)
+        ]
+    return columns_dict
+
+
+def is_issue(content):
+    """Whether the content of a card is an issue rather than a pull request or note."""
+    return isinstance(content, (Issue.Issue, IssueSnapshot))
+
+
+def get_pr_info(pr, file_changed):
+    """Get (title, PR body text, code changes in specified file) for a PR.
+    The files changed are only paged through until the specified file is found.
+    """
+    content = "" if pr.body is None else pr.body
+    for file in pr.get_files():
+        if os.path.basename(file.filename) == file_changed:
+            return pr.title, content, file.patch
+    return pr.title, content, ""
+
+
 def get_all_info_for_PRs(repository, file_changed):
     """Get the title, content and file changes for all PRs.
     Args:
@@ -87,32 +212,103 @@ def get_all_info_for_PRs(repository, file_changed):
     Return:
         A list of tuples of (title, PR body text, code changes in specified file)
     """
-    release_notes_prs = repository.get_pulls(state="open")
-    prs = []
-    for pr in release_notes_prs:
-        title, content, files_changed = pr.title, pr.body, pr.get_files()
-        if content is None:
-            content = ""
-        changes_made = [
-            file.patch for file in files_changed if os.path.basename(file.filename) == file_changed
-        ]
-        changes_made = "" if not changes_made else changes_made[0]
-        prs.append((title, content, changes_made))
+    return [get_pr_info(pr, file_changed) for pr in repository.get_pulls(state="open")]
 
-    return prs
+
+async def get_all_info_for_PRs_async(repository, file_changed, max_concurrency=8):
+    """Get the title, content and file changes for all PRs, making requests concurrently.
+    Args:
+        repository: The repository to check PRs for
+        file_changed: The filename to get changes for
+        max_concurrency: The maximum number of requests in flight at once
+    Return:
+        A list of tuples of (title, PR body text, code changes in specified file), in the
+        same order as get_all_info_for_PRs
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def limited(function, *args):
+        async with semaphore:
+            return await asyncio.to_thread(function, *args)
+
+    pulls = repository.get_pulls(state="open")
+    if hasattr(pulls, "get_page"):
+        # the count is a single request, after which every page can be fetched at once
+        total = await limited(lambda: pulls.totalCount)
+        per_page = repository.requester.per_page
+        pages = await asyncio.gather(
+            *(limited(pulls.get_page, page) for page in range(-(-total // per_page)))
+        )
+        pulls = [pr for page in pages for pr in page]
+    else:
+        pulls = await limited(list, pulls)
+
+    return list(
+        await asyncio.gather(*(limited(get_pr_info, pr, file_changed) for pr in pulls))
+    )
+
+
+# "#1234", "Ticket 1234", "Ticket1234_branch" or ".../issues/1234"
+TICKET_REFERENCE = re.compile(r"(?:(?i:ticket)[ _#:-]*|#|/issues/)(\d+)(?!\d)")
+
+
+class TicketMention(namedtuple("TicketMention", ["in_title", "anywhere"])):
+    """Whether a ticket is mentioned in the title of a PR and in the body or changes of a PR."""
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.in_title or self.anywhere
+
+
+# how a PR, by its position in the PR infos, refers to a ticket
+PRReference = namedtuple("PRReference", ["pr", "in_title", "in_body", "in_patch"])
+
+
+def ticket_references(text):
+    """The ticket numbers referred to in some text."""
+    return {int(number) for number in TICKET_REFERENCE.findall(text or "")}
+
+
+class TicketReferences:
+    """The PRs referring to each ticket, read in one pass over the text of the PRs."""
+
+    def __init__(self, pr_infos):
+        """
+        Args:
+            pr_infos: list of (title, PR body text, code changes) from get_all_info_for_PRs
+        """
+        self.references = {}
+        for pr, (title, body, patch) in enumerate(pr_infos):
+            in_title = ticket_references(title)
+            in_body = ticket_references(body)
+            in_patch = ticket_references(patch)
+            for number in in_title | in_body | in_patch:
+                self.references.setdefault(number, []).append(
+                    PRReference(
+                        pr, number in in_title, number in in_body, number in in_patch
+                    )
+                )
+
+    def prs_referring_to(self, ticket_number):
+        return self.references.get(ticket_number, [])
+
+    def mentioned(self, ticket_number):
+        references = self.prs_referring_to(ticket_number)
+        return TicketMention(
+            any(r.in_title for r in references),
+            any(r.in_body or r.in_patch for r in references),
+        )
 
 
 def ticket_mentioned_in_pr(ticket_number, pr_infos):
     """Returns a tuple of whether the ticket number is in a title
-    and whether the ticket number is mentioned in any of the specified PRs"""
-    contains_ticket_number_anywhere = []
-    contains_ticket_number_in_title = []
-    for pr_details in pr_infos:
-        contains_ticket_number_in_title.append(str(ticket_number) in pr_details[0])
-        contains_ticket_number_anywhere.extend(
-            [str(ticket_number) in info for info in pr_details[1:]]
-        )
-    return any(contains_ticket_number_in_title), any(contains_ticket_number_anywhere)
+    and whether the ticket number is mentioned in any of the specified PRs.
+    The tuple is true if the ticket is mentioned at all.
+    pr_infos can be TicketReferences to look up many tickets in the same PRs."""
+    if not isinstance(pr_infos, TicketReferences):
+        pr_infos = TicketReferences(pr_infos)
+    return pr_infos.mentioned(ticket_number)
 
 
 def get_issues_from_cards(cards):
@@ -122,37 +318,82 @@ def get_issues_from_cards(cards):
     content_list = []
     for card in cards:
         content = card.get_content()
-        if isinstance(content, Issue.Issue):
+        if is_issue(content):
             content_list.append(content)
     return content_list
 
 
-def pull_or_clone_repository(repo_path, repo_url):
+# checkouts already brought up to date by this process
+UPDATED_REPOSITORIES = set()
+
+
+def pull_or_clone_repository(
+    repo_path, repo_url, sparse_paths=None, branch="master", force=False
+):
+    """
+    Clone a repository, or bring an existing clone up to date with the remote branch.
+    The remote is only fetched from when its head has moved, and at most once per process.
+    Args:
+        repo_path: Where to clone the repository to
+        repo_url: The repository to clone
+        sparse_paths: Folders to check out, cloning without file contents so only the
+            contents of files in these folders are downloaded. None to check out everything.
+        branch: The branch to check out
+        force: True to check the remote even if this process has already brought it up to
+            date, as when told the branch has moved
+    """
+    key = os.path.abspath(repo_path)
+    if key in UPDATED_REPOSITORIES and not force:
+        return
     try:
         repository = Repo(repo_path)
     except (InvalidGitRepositoryError, NoSuchPathError):
         if not os.path.exists(repo_path):
             os.makedirs(repo_path)
-        Git().clone(repo_url, repo_path)
-        repository = Repo(repo_path)
-    repository.remote().fetch()
-    repository.git.checkout("master")
-    repository.remote().pull()
+        if sparse_paths is None:
+            Git().clone("--branch", branch, repo_url, repo_path)
+        else:
+            Git().clone(
+                "--filter=blob:none",
+                "--no-checkout",
+                "--branch",
+                branch,
+                repo_url,
+                repo_path,
+            )
+            repository = Repo(repo_path)
+            repository.git.sparse_checkout("set", *sparse_paths)
+            repository.git.checkout(branch)
+        UPDATED_REPOSITORIES.add(key)
+        return
+
+    if sparse_paths is not None:
+        repository.git.sparse_checkout("set", *sparse_paths)
+    remote = repository.remote()
+    remote_head = repository.git.ls_remote(remote.name, f"refs/heads/{branch}").split()
+    if repository.head.is_detached or repository.active_branch.name != branch:
+        repository.git.checkout(branch)
+    # a branch missing from the remote is pulled anyway, for git to report it by name
+    if not remote_head or repository.head.commit.hexsha != remote_head[0]:
+        remote.pull(branch)
+    UPDATED_REPOSITORIES.add(key)
 
 
 def get_text_with_extension(folder_path, file_extension):
     """Get all the text from files with the specified extension."""
-    contents = ""
+    contents = []
     files = glob.glob(os.path.join(folder_path, f"*.{file_extension}"), recursive=True)
     for file_name in files:
         with open(file_name, "r") as file:
-            contents += file.read()
-    return contents
+            contents.append(file.read())
+    return "".join(contents)
 
 
 # get names who are assigned to an issue
 # we use login rather than name attribute as name may not be set
 def get_assigned(issue):
+    if isinstance(issue, IssueSnapshot):
+        return issue.assigned
     assigned = [x.login for x in issue.assignees]
     if issue.assignee is not None:
         assigned.append(issue.assignee.login)
@@ -162,3 +403,29 @@ def get_assigned(issue):
         return ",".join(assigned)
     else:
         return "None"
+
+
+class ThreadOutput(io.TextIOBase):
+    """
+    A stand-in for standard output that each thread can capture separately.
+    Threads that are not capturing write to the wrapped stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        return getattr(self.local, "buffer", self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    @contextlib.contextmanager
+    def capture(self):
+        """Send what the current thread prints to a StringIO."""
+        self.local.buffer = io.StringIO()
+        try:
+            yield self.local.buffer
+        finally:
+            del self.local.buffer